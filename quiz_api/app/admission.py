@@ -0,0 +1,211 @@
+"""
+Control de admisión: límites de tasa por cliente y de escrituras simultáneas
+
+Cada request se clasifica en lectura, escritura o carga masiva
+(`POST /questions/bulk`). Cada (cliente, clase) tiene un token bucket: se
+recargan `tasa` tokens por segundo hasta `ráfaga`, y sin tokens la respuesta es
+429 con `Retry-After`. Además las escrituras en curso están acotadas por
+MAX_CONCURRENT_WRITES: la siguiente recibe 503 enseguida en vez de esperar,
+porque con SQLite hay un solo escritor y la cola de escrituras es lo que
+dispara la latencia de todos los demás.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .profiling import is_admin
+
+
+def _parse_rate(value: str) -> tuple[float, float]:
+    # "tasa/ráfaga" (tokens por segundo / máximo acumulado); "0" lo desactiva
+    rate, _, burst = value.partition("/")
+    return float(rate), float(burst or rate)
+
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in ("1", "true", "yes")
+RATE_LIMITS = {
+    "lectura": _parse_rate(os.getenv("RATE_LIMIT_READ", "20/40")),
+    "escritura": _parse_rate(os.getenv("RATE_LIMIT_WRITE", "10/30")),
+    "masiva": _parse_rate(os.getenv("RATE_LIMIT_BULK", "0.1/3")),
+}
+# Buckets en memoria; al pasarse se descartan los de los clientes menos recientes
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Detrás de un proxy la IP del cliente sale del primer valor de X-Forwarded-For
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "").lower() in ("1", "true", "yes")
+# Escrituras en curso por proceso; 0 lo desactiva
+MAX_CONCURRENT_WRITES = int(os.getenv("MAX_CONCURRENT_WRITES", "4"))
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+BULK_ROUTES = (("POST", "/questions/bulk"),)
+EXEMPT_PREFIXES = ("/health", "/docs", "/redoc", "/openapi.json")
+
+
+def route_class(method: str, path: str) -> str:
+    """Clase de límite de un request: "lectura", "escritura" o "masiva" """
+    if (method, path.rstrip("/")) in BULK_ROUTES:
+        return "masiva"
+    if method in WRITE_METHODS:
+        return "escritura"
+    return "lectura"
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated_at: float
+
+
+class RateLimiter:
+    """
+    Token buckets por (cliente, clase), con recarga perezosa al consultarlos.
+
+    Los buckets se guardan en un LRU acotado; uno descartado vuelve lleno, que
+    solo puede dejar pasar de más a un cliente que llevaba rato sin pedir nada.
+    """
+
+    def __init__(self, limits: dict[str, tuple[float, float]] = RATE_LIMITS,
+                 max_clients: int = RATE_LIMIT_MAX_CLIENTS) -> None:
+        self.limits = limits
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[tuple[str, str], _Bucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str, clase: str, now: Optional[float] = None) -> float:
+        """
+        Consumir un token.
+
+        Returns:
+            0 si se admite; si no, los segundos hasta que haya un token
+        """
+        rate, burst = self.limits.get(clase, (0.0, 0.0))
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        key = (client, clase)
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                bucket = _Bucket(tokens=burst, updated_at=now)
+            else:
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * rate)
+                bucket.updated_at = now
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionStats:
+    """Contadores por clase: admitidas, limitadas (429) y rechazadas por saturación (503)"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: dict[str, dict[str, int]] = {}
+        self.writes_in_flight = 0
+        self.max_writes_in_flight = 0
+
+    def count(self, clase: str, resultado: str) -> None:
+        with self._lock:
+            per_class = self.counts.setdefault(clase, {"admitidas": 0, "limitadas": 0, "saturadas": 0})
+            per_class[resultado] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "por_clase": {clase: dict(c) for clase, c in self.counts.items()},
+                "escrituras_en_curso": self.writes_in_flight,
+                "max_escrituras_en_curso": self.max_writes_in_flight,
+            }
+
+
+rate_limiter = RateLimiter()
+admission_stats = AdmissionStats()
+
+
+def _client_id(scope: dict[str, Any], headers: dict[str, str], trust_proxy: bool) -> str:
+    if trust_proxy and headers.get("x-forwarded-for"):
+        return headers["x-forwarded-for"].split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "desconocido"
+
+
+async def _reject(send: Any, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """
+    Rechaza enseguida lo que excede los límites, antes de tocar la BD.
+
+    /health y la documentación no se limitan; los requests con X-Admin-Token
+    válido tampoco. Las escrituras admitidas cuentan como "en curso" hasta que
+    termina de enviarse la respuesta.
+    """
+
+    def __init__(self, app: Any, enabled: bool = RATE_LIMIT_ENABLED, limiter: Optional[RateLimiter] = None,
+                 max_concurrent_writes: int = MAX_CONCURRENT_WRITES,
+                 trust_proxy: bool = RATE_LIMIT_TRUST_PROXY, stats: AdmissionStats = admission_stats) -> None:
+        self.app = app
+        self.enabled = enabled
+        self.limiter = limiter or rate_limiter
+        self.max_concurrent_writes = max_concurrent_writes
+        self.trust_proxy = trust_proxy
+        self.stats = stats
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not self.enabled or path.startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict((k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in scope.get("headers", []))
+        if is_admin(headers.get("x-admin-token")):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        clase = route_class(method, path)
+        wait = self.limiter.acquire(_client_id(scope, headers, self.trust_proxy), clase)
+        if wait > 0:
+            self.stats.count(clase, "limitadas")
+            await _reject(send, 429, "Demasiadas solicitudes, intenta de nuevo más tarde", wait)
+            return
+
+        if method not in WRITE_METHODS or self.max_concurrent_writes <= 0:
+            self.stats.count(clase, "admitidas")
+            await self.app(scope, receive, send)
+            return
+
+        # El middleware corre en el event loop, así que el contador no necesita lock
+        if self.stats.writes_in_flight >= self.max_concurrent_writes:
+            self.stats.count(clase, "saturadas")
+            await _reject(send, 503, "Servidor ocupado con otras escrituras, intenta de nuevo", 1)
+            return
+        self.stats.count(clase, "admitidas")
+        self.stats.writes_in_flight += 1
+        self.stats.max_writes_in_flight = max(self.stats.max_writes_in_flight, self.stats.writes_in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.stats.writes_in_flight -= 1
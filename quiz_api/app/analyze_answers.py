@@ -0,0 +1,85 @@
+"""Script para calcular el análisis de ítems (discriminación, distractores, tiempos) de todo el banco"""
+import sys
+import os
+import json
+
+if sys.platform == "win32":
+    os.environ["PYTHONIOENCODING"] = "utf-8"
+
+from app.database import SessionLocal, read_engine, archive_engine
+from app.models.question import Question
+from app.models.quiz_session import QuizSession  # noqa: F401  (registran las relaciones de Question)
+from app.models.answer import Answer  # noqa: F401
+from app.services import analytics_service
+from app.services.analytics_service import ANALYTICS_CHUNK_SIZE, compute_snapshot
+
+# Por debajo de esto la pregunta casi no separa a quienes saben de quienes no
+LOW_DISCRIMINATION = 0.2
+
+
+def analyze_answers(
+    chunk_size: int = ANALYTICS_CHUNK_SIZE,
+    min_respuestas: int = 20,
+    output: str | None = None,
+    limit: int = 20,
+) -> list[dict]:
+    # Una sola pasada sobre todas las respuestas; el informe ordena de peor a mejor discriminación
+    if not analytics_service.available():
+        print("Error: el análisis requiere numpy (pip install numpy)")
+        sys.exit(1)
+
+    snapshot = compute_snapshot([read_engine, archive_engine], chunk_size=chunk_size)
+    db = SessionLocal()
+    try:
+        preguntas = db.query(Question).order_by(Question.id).all()
+        resultados = []
+        for q in preguntas:
+            item = snapshot.question(int(q.id), int(q.respuesta_correcta), int(q.num_opciones))  # type: ignore
+            if item["respuestas"] < min_respuestas:
+                continue
+            resultados.append({"pregunta": q.pregunta, "activa": bool(q.is_active), **item})
+    finally:
+        db.close()
+
+    resumen = snapshot.summary()
+    print(f"[INFO] {resumen['respuestas_analizadas']} respuestas de {resumen['sesiones_analizadas']} sesiones "
+          f"en {resumen['duracion_ms']:.0f} ms; {len(resultados)} preguntas con al menos {min_respuestas} respuestas")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"analisis": resumen, "preguntas": resultados}, f, ensure_ascii=False, indent=2)
+        print(f"✓ Resultado completo en {output}")
+
+    ordenadas = sorted(
+        resultados,
+        key=lambda r: r["discriminacion"] if r["discriminacion"] is not None else float("inf"),
+    )
+    print(f"\n{'ID':>6}  {'resp.':>6}  {'acierto':>7}  {'discr.':>6}  {'biser.':>6}  {'p50 s':>6}  {'p90 s':>6}  distractor más elegido")
+    for r in ordenadas[:limit]:
+        distractores = [o for o in r["opciones"] if not o["es_correcta"] and o["veces"]]
+        top = max(distractores, key=lambda o: o["veces"]) if distractores else None
+        marca = " ⚠" if r["discriminacion"] is not None and r["discriminacion"] < LOW_DISCRIMINATION else ""
+
+        def fmt(value: float | None, spec: str) -> str:
+            return format("-", spec.split(".")[0]) if value is None else format(value, spec)
+
+        print(
+            f"{r['question_id']:>6}  {r['respuestas']:>6}  {fmt(r['tasa_acierto'], '>6.1f')}%  "
+            f"{fmt(r['discriminacion'], '>6.2f')}  {fmt(r['correlacion_biserial'], '>6.2f')}  "
+            f"{fmt(r['tiempo_respuesta']['p50'], '>6.0f')}  {fmt(r['tiempo_respuesta']['p90'], '>6.0f')}  "
+            f"{'opción ' + str(top['opcion']) + ' (' + str(top['porcentaje_de_errores']) + '% de los errores)' if top else '-'}{marca}"
+        )
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calcular el análisis de ítems sobre todas las respuestas")
+    parser.add_argument('--chunk-size', type=int, default=ANALYTICS_CHUNK_SIZE, help='Filas leídas por consulta')
+    parser.add_argument('--min-respuestas', type=int, default=20, help='Omitir preguntas con menos respuestas')
+    parser.add_argument('--output', help='Guardar el resultado completo como JSON en este archivo')
+    parser.add_argument('--limit', type=int, default=20, help='Preguntas a mostrar (las de menor discriminación)')
+    args = parser.parse_args()
+
+    analyze_answers(chunk_size=args.chunk_size, min_respuestas=args.min_respuestas, output=args.output, limit=args.limit)
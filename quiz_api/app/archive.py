@@ -0,0 +1,66 @@
+"""Script para archivar sesiones viejas y marcar como abandonadas las que quedaron en progreso"""
+import sys
+import os
+from datetime import timedelta
+
+if sys.platform == "win32":
+    os.environ["PYTHONIOENCODING"] = "utf-8"
+
+from app.database import SessionLocal, engine, ArchiveSessionLocal, archive_engine
+from app.models.question import Question  # noqa: F401  (registran las relaciones de QuizSession y Answer)
+from app.models.quiz_session import QuizSession  # noqa: F401
+from app.models.answer import Answer  # noqa: F401
+from app.services.archive_service import archive_sessions, reap_stale_sessions
+from app.services.schema_service import ensure_schema
+
+
+def archive(
+    retention_days: int = 90,
+    stale_hours: int = 24,
+    batch_size: int = 500,
+    max_batches: int | None = None,
+    skip_reaper: bool = False,
+) -> None:
+    # Pensado para correr periódicamente (cron); se puede correr con la API andando
+    ensure_schema(engine, archive_engine)
+
+    db = SessionLocal()
+    archive_db = ArchiveSessionLocal()
+    try:
+        if not skip_reaper:
+            abandonadas = reap_stale_sessions(db, timedelta(hours=stale_hours), batch_size=batch_size)
+            print(f"✓ Sesiones marcadas como abandonadas: {abandonadas}")
+
+        result = archive_sessions(
+            db, archive_db, timedelta(days=retention_days),
+            batch_size=batch_size, max_batches=max_batches
+        )
+        print(f"✓ Archivadas {result['sesiones']} sesiones y {result['respuestas']} respuestas")
+    except Exception as exc:
+        db.rollback()
+        archive_db.rollback()
+        print(f"Error archivando sesiones: {exc}")
+        raise
+    finally:
+        db.close()
+        archive_db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archivar sesiones viejas y sus respuestas")
+    parser.add_argument('--retention-days', type=int, default=90, help='Días que una sesión terminada se queda en la BD principal')
+    parser.add_argument('--stale-hours', type=int, default=24, help='Horas sin terminar para marcar una sesión como abandonada')
+    parser.add_argument('--batch-size', type=int, default=500, help='Sesiones movidas por transacción')
+    parser.add_argument('--max-batches', type=int, default=None, help='Cortar después de N lotes')
+    parser.add_argument('--skip-reaper', action='store_true', help='No marcar sesiones abandonadas')
+    args = parser.parse_args()
+
+    archive(
+        retention_days=args.retention_days,
+        stale_hours=args.stale_hours,
+        batch_size=args.batch_size,
+        max_batches=args.max_batches,
+        skip_reaper=args.skip_reaper,
+    )
@@ -0,0 +1,38 @@
+"""Script para recalcular los agregados por hora/día a partir de las respuestas existentes"""
+import sys
+import os
+
+if sys.platform == "win32":
+    os.environ["PYTHONIOENCODING"] = "utf-8"
+
+from app.database import SessionLocal, ArchiveSessionLocal, engine, archive_engine
+from app.services.timeseries_service import backfill_timeseries
+from app.services.schema_service import ensure_schema
+
+
+def backfill(batch_size: int = 5000) -> None:
+    # Conviene correrlo con la API detenida: reemplaza toda la tabla answer_buckets
+    ensure_schema(engine, archive_engine)
+
+    db = SessionLocal()
+    archive_db = ArchiveSessionLocal()
+    try:
+        procesadas = backfill_timeseries(db, archive_db, batch_size=batch_size)
+        print(f"✓ Agregados recalculados a partir de {procesadas} respuestas")
+    except Exception as exc:
+        db.rollback()
+        print(f"Error recalculando agregados: {exc}")
+        raise
+    finally:
+        db.close()
+        archive_db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recalcular la serie de tiempo de respuestas")
+    parser.add_argument('--batch-size', type=int, default=5000, help='Respuestas leídas por lote')
+    args = parser.parse_args()
+
+    backfill(batch_size=args.batch_size)
@@ -0,0 +1,187 @@
+"""
+Middleware de compresión (br/gzip) para las respuestas JSON de la API
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # brotli es opcional
+    brotli = None
+
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Niveles bajos: la mayor parte de la ganancia en JSON repetitivo con poco CPU (ver benchmarks/)
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def pick_encoding(accept_encoding: str) -> Optional[str]:
+    """Elegir br o gzip según Accept-Encoding (respetando q=0)"""
+    accepted: set[str] = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def varies_by_encoding(response_headers: dict[str, str]) -> bool:
+    """Si la respuesta se comprime o no según Accept-Encoding (JSON/texto sin codificar que no es streaming)"""
+    content_type = response_headers.get("content-type", "")
+    return (
+        "content-encoding" not in response_headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith("text/event-stream")
+    )
+
+
+def with_vary(headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+    """Headers con Accept-Encoding agregado a Vary (una sola vez)"""
+    vary = ", ".join(v.decode("latin-1") for k, v in headers if k.lower() == b"vary")
+    if "accept-encoding" in vary.lower() or vary.strip() == "*":
+        return headers
+    new_headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+    new_headers.append((b"vary", (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode("latin-1")))
+    return new_headers
+
+
+class CompressedCache:
+    """LRU acotado en bytes: (hash del cuerpo, codificación) -> cuerpo comprimido"""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple[str, str], value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._data[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """
+    Comprime las respuestas JSON/texto de al menos `minimum_size` bytes.
+
+    Las respuestas en streaming (más de un chunk, o text/event-stream) pasan sin
+    tocar. Para las respuestas GET de las rutas en `cache_prefixes` el resultado
+    comprimido se guarda por hash del contenido, así que los mismos bytes no se
+    comprimen dos veces.
+    """
+
+    def __init__(self, app: Any, minimum_size: int = MIN_SIZE, cache_prefixes: tuple[str, ...] = (),
+                 cache: Optional[CompressedCache] = None) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_prefixes = cache_prefixes
+        self.cache = cache or CompressedCache()
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict((k.decode("latin-1"), v.decode("latin-1")) for k, v in scope.get("headers", []))
+        encoding = pick_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            # Sin comprimir, pero un cache intermedio no debe servir esta versión a quien sí acepta br/gzip
+            async def send_with_vary(message: dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    response_headers = dict(
+                        (k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in message.get("headers", [])
+                    )
+                    if varies_by_encoding(response_headers):
+                        message = {**message, "headers": with_vary(list(message.get("headers", [])))}
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        cacheable = (
+            bool(self.cache_prefixes)
+            and scope.get("method") == "GET"
+            and scope.get("path", "").startswith(self.cache_prefixes)
+        )
+        start_message: Optional[dict[str, Any]] = None
+        passthrough = False
+
+        async def wrapped_send(message: dict[str, Any]) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            assert start_message is not None
+            body = message.get("body", b"")
+            response_headers = dict(
+                (k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in start_message.get("headers", [])
+            )
+            varies = varies_by_encoding(response_headers)
+            if not varies or message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                if varies:
+                    start_message = {**start_message, "headers": with_vary(list(start_message.get("headers", [])))}
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed: Optional[bytes] = None
+            key = (hashlib.sha1(body).hexdigest(), encoding) if cacheable else None
+            if key is not None:
+                compressed = self.cache.get(key)
+            if compressed is None:
+                compressed = compress(body, encoding)
+                if key is not None:
+                    self.cache.put(key, compressed)
+
+            new_headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"]
+            new_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            new_headers = with_vary(new_headers)
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, wrapped_send)
@@ -1,11 +1,20 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./quiz.db")
+ARCHIVE_DATABASE_URL = os.getenv("ARCHIVE_DATABASE_URL", "sqlite:///./quiz_archive.db")
+# Réplica de lectura (opcional). Sin réplica, con SQLite se abre el mismo archivo en modo solo lectura
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+# Segundos durante los que una sesión recién escrita se lee desde la BD principal
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
 
 engine = create_engine(
     DATABASE_URL,
@@ -16,9 +25,126 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def sqlite_file_path(url: str) -> str | None:
+    # "sqlite:///./quiz.db" -> "./quiz.db"; None para bases en memoria u otros motores
+    if not url.startswith("sqlite:///"):
+        return None
+    path = url[len("sqlite:///"):].split("?", 1)[0]
+    if not path or path == ":memory:" or path.startswith("file:"):
+        return None
+    return path
+
+
+if sqlite_file_path(DATABASE_URL):
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection: Any, connection_record: Any) -> None:
+        # Con WAL los lectores no bloquean al escritor (ni al revés)
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+def _make_read_engine():
+    if READ_DATABASE_URL:
+        return create_engine(
+            READ_DATABASE_URL,
+            connect_args={"check_same_thread": False} if READ_DATABASE_URL.startswith("sqlite") else {},
+        )
+    path = sqlite_file_path(DATABASE_URL)
+    if path is None:
+        return engine
+    ro_engine = create_engine(
+        f"sqlite:///file:{path}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(ro_engine, "connect")
+    def _query_only(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return ro_engine
+
+
+read_engine = _make_read_engine()
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Base de datos de archivo: sesiones viejas y sus respuestas (ver app/archive.py)
+archive_engine = create_engine(
+    ARCHIVE_DATABASE_URL,
+    connect_args={"check_same_thread": False} if ARCHIVE_DATABASE_URL.startswith("sqlite") else {},
+)
+
+ArchiveSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=archive_engine)
+
+ArchiveBase = declarative_base()
+
+
+_recent_writes: dict[int, float] = {}
+_recent_writes_lock = threading.Lock()
+
+
+def mark_session_written(session_id: int) -> None:
+    """Registrar que la sesión de quiz se acaba de escribir (para leer lo propio)"""
+    now = time.monotonic()
+    with _recent_writes_lock:
+        _recent_writes[session_id] = now
+        if len(_recent_writes) > 10000:
+            for key, ts in list(_recent_writes.items()):
+                if now - ts > READ_YOUR_WRITES_SECONDS:
+                    del _recent_writes[key]
+
+
+def recently_written(session_id: int) -> bool:
+    with _recent_writes_lock:
+        ts = _recent_writes.get(session_id)
+    return ts is not None and time.monotonic() - ts <= READ_YOUR_WRITES_SECONDS
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def consistent_read(request: Request) -> bool:
+    return request.headers.get("X-Consistent-Read", "").lower() in ("1", "true", "yes")
+
+
+def get_read_db(request: Request):
+    """
+    Sesión para rutas de solo lectura: usa la réplica (o la conexión solo lectura).
+
+    Con el header `X-Consistent-Read: 1` se lee de la BD principal.
+    """
+    db = SessionLocal() if consistent_read(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_session_read_db(session_id: int, request: Request):
+    """
+    Igual que get_read_db, pero si la sesión de quiz se escribió hace poco
+    (por ejemplo, se acaba de responder) se lee de la BD principal.
+    """
+    primary = consistent_read(request) or recently_written(session_id)
+    db = SessionLocal() if primary else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_archive_db():
+    db = ArchiveSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
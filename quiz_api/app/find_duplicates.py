@@ -0,0 +1,44 @@
+"""Script para encontrar grupos de preguntas casi duplicadas en la base de datos"""
+import sys
+import os
+import json
+
+if sys.platform == "win32":
+    os.environ["PYTHONIOENCODING"] = "utf-8"
+
+from app.database import SessionLocal
+from app.models.question import Question
+from app.services.dedup_service import DEFAULT_THRESHOLD, build_index, find_clusters
+
+
+def find_duplicates(threshold: float = DEFAULT_THRESHOLD, as_json: bool = False) -> list[list[int]]:
+    # Construye el índice LSH sobre todo el banco y agrupa los casi duplicados
+    db = SessionLocal()
+    try:
+        index = build_index(db)
+        clusters = find_clusters(index, threshold)
+
+        if as_json:
+            print(json.dumps(clusters))
+            return clusters
+
+        print(f"[INFO] {len(index)} preguntas analizadas, {len(clusters)} grupos de casi duplicados")
+        for cluster in clusters:
+            preguntas = db.query(Question.id, Question.pregunta).filter(Question.id.in_(cluster)).order_by(Question.id).all()
+            print(f"\n- Grupo de {len(cluster)} preguntas:")
+            for qid, texto in preguntas:
+                print(f"    [{qid}] {texto}")
+        return clusters
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Buscar preguntas casi duplicadas en el banco")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Similitud mínima (0-1) para agrupar')
+    parser.add_argument('--json', action='store_true', help='Imprimir los grupos como JSON (listas de IDs)')
+    args = parser.parse_args()
+
+    find_duplicates(threshold=args.threshold, as_json=args.json)
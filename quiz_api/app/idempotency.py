@@ -0,0 +1,157 @@
+"""
+Soporte del header Idempotency-Key para reintentos seguros de escrituras
+
+El cliente manda una clave única por operación. La primera vez se ejecuta la
+escritura y se guarda el resultado (incluidos los errores 4xx); los reintentos
+con la misma clave devuelven esa misma respuesta sin tocar la BD. Si el
+reintento llega mientras la primera petición sigue en curso, espera a que termine.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeVar
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# Cuánto espera un reintento a que termine la petición original
+IN_FLIGHT_WAIT_SECONDS = 10.0
+MAX_KEY_LENGTH = 255
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires_at: float
+    done: threading.Event = field(default_factory=threading.Event)
+    status_code: int = 0
+    body: Any = None
+
+
+class IdempotencyStore:
+    """Claves -> respuesta guardada, con TTL y un máximo de entradas (se descartan las más viejas)"""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS) -> None:
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.replays = 0
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.max_keys:
+                break
+            del self._entries[key]
+
+    def claim(self, key: tuple[str, str], fingerprint: str) -> tuple[_Entry, bool]:
+        """
+        Reservar la clave o devolver la entrada existente.
+
+        Returns:
+            (entrada, True si esta petición es la dueña y tiene que ejecutar la escritura)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                return entry, False
+            entry = _Entry(fingerprint=fingerprint, expires_at=now + self.ttl)
+            self._entries[key] = entry
+            self._evict(now)
+            return entry, True
+
+    def release(self, key: tuple[str, str], entry: _Entry) -> None:
+        """Olvidar una clave cuya escritura falló con un error no guardable (5xx)"""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotentCall:
+    """
+    Uso en un endpoint sincrónico:
+
+        with IdempotentCall(idempotency_key, "POST /answers/", payload.model_dump()) as call:
+            if call.replay is not None:
+                return call.replay
+            ...  # escritura
+            return call.save(AnswerRead.model_validate(answer))
+
+    Sin clave no hace nada. Las HTTPException 4xx que salen del bloque también se
+    guardan; cualquier otro error libera la clave para que el reintento vuelva a ejecutar.
+    """
+
+    def __init__(self, key: Optional[str], scope: str, payload: Any,
+                 store: IdempotencyStore = idempotency_store) -> None:
+        if key is not None and not (0 < len(key) <= MAX_KEY_LENGTH):
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key debe tener entre 1 y {MAX_KEY_LENGTH} caracteres")
+        self.store = store
+        self.key = (scope, key) if key is not None else None
+        self.fingerprint = _fingerprint(payload)
+        self.entry: Optional[_Entry] = None
+        self.replay: Optional[JSONResponse] = None
+
+    def __enter__(self) -> "IdempotentCall":
+        if self.key is None:
+            return self
+        entry, owner = self.store.claim(self.key, self.fingerprint)
+        if entry.fingerprint != self.fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key ya usada con otros datos")
+        if owner:
+            self.entry = entry
+            return self
+        if not entry.done.wait(IN_FLIGHT_WAIT_SECONDS) or not entry.status_code:
+            raise HTTPException(status_code=409, detail="Hay una petición con esta Idempotency-Key en curso")
+        self.store.replays += 1
+        self.replay = JSONResponse(
+            status_code=entry.status_code,
+            content=entry.body,
+            headers={"Idempotent-Replayed": "true"},
+        )
+        return self
+
+    def save(self, result: M) -> M:
+        """Guardar la respuesta exitosa (200) de la escritura y devolverla"""
+        if self.entry is not None:
+            self.entry.status_code = 200
+            self.entry.body = result.model_dump(mode="json")
+            self.entry.done.set()
+        return result
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        entry, self.entry = self.entry, None
+        if entry is None or self.key is None:
+            return
+        if isinstance(exc, HTTPException) and 400 <= exc.status_code < 500:
+            entry.status_code = exc.status_code
+            entry.body = {"detail": exc.detail}
+            entry.done.set()
+        elif not entry.done.is_set():
+            # Error inesperado (o el endpoint no llamó a save): el reintento vuelve a ejecutar
+            self.store.release(self.key, entry)
@@ -2,24 +2,45 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
-from .database import engine, Base
-from .routers import questions, quiz_sessions, answers, statistics
+from .admission import AdmissionMiddleware
+from .compression import CompressionMiddleware
+from .profiling import ProfilingMiddleware, install_query_hooks
+from .database import engine, read_engine, archive_engine
+from .routers import questions, quiz_sessions, answers, statistics, leaderboard, users, debug, health
+from .services.schema_service import ensure_schema
+from .services.response_time_service import response_times
+from .services.cardinality_service import unique_counts
+from .startup import WARMUP_VALIDATORS, startup, start_cache_warming, warm_validators
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-    print("✓ BD inicializada")
+    with startup.step("esquema"):
+        changed = ensure_schema(engine, archive_engine)
+    print("✓ BD inicializada" + (" (esquema creado/actualizado)" if changed else ""))
     
     if os.getenv("SEED_ON_STARTUP", "").lower() in ("1", "true", "yes"):
         force = os.getenv("SEED_FORCE", "").lower() in ("1", "true", "yes")
         try:
             from .seed_data import seed_data
-            seed_data(force=force)
+            with startup.step("seed"):
+                seed_data(force=force)
         except Exception as exc:
             print(f"[WARN] Error en siembra automática: {exc}")
     
+    if WARMUP_VALIDATORS:
+        with startup.step("validadores"):
+            warm_validators(app)
+    
+    startup.ready = True
+    # El ranking y el índice de duplicados se cargan sin bloquear el arranque
+    start_cache_warming()
+    response_times.start_flush()
+    unique_counts.start_flush()
+    
     yield
+    response_times.close()
+    unique_counts.close()
     print("✓ Aplicación detenida")
 
 
@@ -30,6 +51,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Límites por cliente y de escrituras simultáneas; queda dentro de CORS para
+# que los 429/503 lleguen al navegador con sus headers (ver app/admission.py)
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,7 +63,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Las preguntas cambian poco: se cachea su versión comprimida
+app.add_middleware(CompressionMiddleware, cache_prefixes=("/questions",))
+# Perfilado a pedido y consultas lentas (ver app/profiling.py)
+app.add_middleware(ProfilingMiddleware)
+for _engine in {engine, read_engine, archive_engine}:
+    install_query_hooks(_engine)
+
 app.include_router(questions.router, prefix="/questions", tags=["Questions"])
 app.include_router(quiz_sessions.router, prefix="/quiz-sessions", tags=["Quiz Sessions"])
 app.include_router(answers.router, prefix="/answers", tags=["Answers"])
 app.include_router(statistics.router, prefix="/statistics", tags=["Statistics"])
+app.include_router(leaderboard.router, prefix="/leaderboard", tags=["Leaderboard"])
+app.include_router(users.router, prefix="/users", tags=["Users"])
+app.include_router(debug.router, prefix="/debug", tags=["Debug"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
@@ -0,0 +1,60 @@
+"""Script para aplicar las migraciones pendientes del esquema (se puede correr con la API andando)"""
+import sys
+import os
+
+if sys.platform == "win32":
+    os.environ["PYTHONIOENCODING"] = "utf-8"
+
+from app.database import engine, archive_engine
+from app.services.migration_service import (
+    MIGRATION_BATCH_SIZE, MIGRATION_PAUSE_MS, MIGRATION_MAX_LOCK_MS,
+    get_schema_version, pending_migrations, run_migrations,
+)
+from app.services.schema_service import MIGRATIONS, ARCHIVE_MIGRATIONS
+
+
+def migrate(
+    status_only: bool = False,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    pause_ms: float = MIGRATION_PAUSE_MS,
+    max_lock_ms: float = MIGRATION_MAX_LOCK_MS,
+) -> None:
+    # Pensado para correrlo antes de desplegar una versión nueva, con la anterior
+    # atendiendo: las migraciones solo agregan (columnas, índices, datos).
+    # Primero el archivo, porque las migraciones de la BD principal pueden leerlo
+    targets = (
+        ("archivo", archive_engine, ARCHIVE_MIGRATIONS, None),
+        ("principal", engine, MIGRATIONS, archive_engine),
+    )
+    for label, target, migrations, archive in targets:
+        pending = pending_migrations(target, migrations)
+        print(f"[INFO] BD {label}: versión {get_schema_version(target) or 'sin versión'} (última: {migrations[-1].version})")
+        for migration in pending:
+            print(f"  pendiente {migration.version}: {migration.descripcion}")
+        if status_only:
+            continue
+        if not pending:
+            print("✓ El esquema está al día")
+            continue
+        try:
+            run_migrations(
+                target, migrations, batch_size=batch_size, pause_ms=pause_ms,
+                max_lock_ms=max_lock_ms, archive_engine=archive,
+            )
+        except Exception as exc:
+            print(f"Error aplicando migraciones: {exc} (al volver a correrlo sigue desde la última guardada)")
+            raise
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aplicar las migraciones pendientes del esquema")
+    parser.add_argument('--status', action='store_true', help='Solo mostrar la versión y las migraciones pendientes')
+    parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE, help='Filas máximas por lote de relleno')
+    parser.add_argument('--pause-ms', type=float, default=MIGRATION_PAUSE_MS, help='Pausa entre lotes')
+    parser.add_argument('--max-lock-ms', type=float, default=MIGRATION_MAX_LOCK_MS,
+                        help='Duración objetivo de cada escritura; si un lote tarda más se achica')
+    args = parser.parse_args()
+
+    migrate(status_only=args.status, batch_size=args.batch_size, pause_ms=args.pause_ms, max_lock_ms=args.max_lock_ms)
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from datetime import datetime, timezone
 from ..database import Base
 
@@ -9,11 +10,24 @@ class Answer(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     quiz_session_id = Column(Integer, ForeignKey("quiz_sessions.id", ondelete="CASCADE"), nullable=False)
-    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Categoría de la pregunta al responder: los agregados se descuentan de esta aunque la pregunta cambie de categoría
+    categoria_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     respuesta_seleccionada = Column(Integer, nullable=False)  # 0-based index
     es_correcta = Column(Boolean, default=False)
     tiempo_respuesta_segundos = Column(Integer, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), server_default=func.now(), index=True)
 
     quiz_session = relationship("QuizSession", back_populates="answers")
     question = relationship("Question", back_populates="answers")
+
+    __table_args__ = (
+        # Una sola respuesta por pregunta en cada sesión, también con peticiones concurrentes
+        Index("ux_answers_session_question", "quiz_session_id", "question_id", unique=True),
+    )
+
+
+def answer_category_id(answer: Answer) -> int:
+    """Categoría con la que se registró la respuesta (la actual de la pregunta si es anterior a la columna)"""
+    categoria_id = answer.categoria_id if answer.categoria_id is not None else answer.question.categoria_id
+    return int(categoria_id)  # type: ignore
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from ..database import Base
+
+
+class AnswerBucket(Base):
+    """Agregados de respuestas por hora/día y categoría (se actualizan al responder)"""
+    __tablename__ = "answer_buckets"
+
+    bucket = Column(String, primary_key=True)  # "hour", "day"
+    inicio = Column(DateTime, primary_key=True)  # Inicio del intervalo (UTC)
+    categoria = Column(String, primary_key=True)
+    num_respuestas = Column(Integer, nullable=False, default=0)
+    num_correctas = Column(Integer, nullable=False, default=0)
+    suma_tiempo_segundos = Column(Integer, nullable=False, default=0)
+    num_con_tiempo = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,60 @@
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, DateTime, String, Index
+from sqlalchemy.orm import relationship
+from ..database import ArchiveBase, Base
+
+
+class ArchivedQuizSession(ArchiveBase):
+    """Sesión archivada (vive en la base de datos de archivo)"""
+    __tablename__ = "quiz_sessions"
+
+    id = Column(Integer, primary_key=True)
+    usuario_nombre = Column(String, nullable=True)
+    usuario_key = Column(String, nullable=True)
+    fecha_inicio = Column(DateTime, nullable=True)
+    fecha_fin = Column(DateTime, nullable=True)
+    puntuacion_total = Column(Integer, default=0)
+    preguntas_respondidas = Column(Integer, default=0)
+    preguntas_correctas = Column(Integer, default=0)
+    estado = Column(String, nullable=False)
+    tiempo_total_segundos = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=True, index=True)
+    archived_at = Column(DateTime, nullable=False)
+
+    answers = relationship("ArchivedAnswer", back_populates="quiz_session", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_archived_sessions_usuario", "usuario_key", "id"),
+    )
+
+
+class ArchivedAnswer(ArchiveBase):
+    """Respuesta archivada; question_id apunta a la tabla de preguntas de la BD principal"""
+    __tablename__ = "answers"
+
+    id = Column(Integer, primary_key=True)
+    quiz_session_id = Column(Integer, ForeignKey("quiz_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    question_id = Column(Integer, nullable=False, index=True)
+    respuesta_seleccionada = Column(Integer, nullable=False)
+    es_correcta = Column(Boolean, default=False)
+    tiempo_respuesta_segundos = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+
+    quiz_session = relationship("ArchivedQuizSession", back_populates="answers")
+
+
+class ArchivedQuestionStats(Base):
+    """Respuestas por pregunta que ya se movieron al archivo (vive en la BD principal)"""
+    __tablename__ = "archived_question_stats"
+
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    num_respuestas = Column(Integer, nullable=False, default=0)
+    num_correctas = Column(Integer, nullable=False, default=0)
+
+
+class ArchivedSessionStats(Base):
+    """Totales de las sesiones completadas que ya se movieron al archivo (una sola fila, id=1)"""
+    __tablename__ = "archived_session_stats"
+
+    id = Column(Integer, primary_key=True)
+    num_sesiones_completadas = Column(Integer, nullable=False, default=0)
+    suma_puntuacion = Column(Integer, nullable=False, default=0)
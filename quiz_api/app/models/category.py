@@ -0,0 +1,80 @@
+import threading
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.ext.hybrid import Comparator
+from ..database import Base
+
+
+CANONICAL_CATEGORIES = ["Tecnología", "Historia", "Ciencia", "Geografía", "Literatura", "Deporte"]
+CANONICAL_DIFFICULTIES = ["fácil", "medio", "difícil"]
+
+
+class Category(Base):
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String, nullable=False, unique=True)
+
+
+class Difficulty(Base):
+    __tablename__ = "difficulties"
+
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String, nullable=False, unique=True)
+
+
+class Catalog:
+    """
+    Copia en memoria de una tabla de lookup (id <-> nombre canónico).
+
+    Arranca con los valores canónicos numerados desde 1 (los mismos IDs con los
+    que se siembra la tabla) y se recarga desde la BD al iniciar la aplicación.
+    """
+
+    def __init__(self, model: type, canonical: list[str]) -> None:
+        self.model = model
+        self.canonical = canonical
+        self._lock = threading.Lock()
+        self.load([(i, name) for i, name in enumerate(canonical, start=1)])
+
+    def load(self, rows: list[tuple[int, str]]) -> None:
+        with self._lock:
+            self._ids = {name: i for i, name in rows}
+            self._names = {i: name for i, name in rows}
+
+    def id_of(self, name: str) -> int:
+        try:
+            return self._ids[name]
+        except KeyError:
+            raise ValueError(f"Valor desconocido: {name}")
+
+    def get_id(self, name: str) -> int | None:
+        return self._ids.get(name)
+
+    def name_of(self, id_: int | None) -> str | None:
+        return self._names.get(id_) if id_ is not None else None
+
+    def items(self) -> list[tuple[int, str]]:
+        return sorted(self._names.items())
+
+
+categories = Catalog(Category, CANONICAL_CATEGORIES)
+difficulties = Catalog(Difficulty, CANONICAL_DIFFICULTIES)
+
+
+class CatalogComparator(Comparator):
+    """Permite filtrar por nombre (Question.categoria == "Historia") comparando el ID entero"""
+
+    def __init__(self, expression, catalog: Catalog) -> None:  # type: ignore
+        super().__init__(expression)
+        self.catalog = catalog
+
+    def _to_id(self, value):  # type: ignore
+        if isinstance(value, str):
+            found = self.catalog.get_id(value)
+            return found if found is not None else -1
+        if isinstance(value, (list, tuple, set)):
+            return [self._to_id(v) for v in value]
+        return value
+
+    def operate(self, op, *other, **kwargs):  # type: ignore
+        return op(self.expression, *[self._to_id(o) for o in other], **kwargs)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from ..database import Base
+
+
+class QuestionOptionStats(Base):
+    """Veces que se eligió cada opción de una pregunta (se actualiza al responder; incluye las archivadas)"""
+    __tablename__ = "question_option_stats"
+
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    opcion = Column(Integer, primary_key=True)  # Índice de respuesta_seleccionada
+    num_respuestas = Column(Integer, nullable=False, default=0)
+    num_correctas = Column(Integer, nullable=False, default=0)  # Según es_correcta al momento de responder
@@ -1,7 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Text
+import json
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql import func
 from datetime import datetime, timezone
 from ..database import Base
+from .category import CatalogComparator, categories, difficulties
+
+
+def encode_options(opciones: list[str]) -> str:
+    """JSON sin espacios ni escapes \\uXXXX (los acentos quedan como UTF-8)"""
+    return json.dumps(list(opciones), ensure_ascii=False, separators=(",", ":"))
 
 
 class Question(Base):
@@ -9,12 +18,53 @@ class Question(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     pregunta = Column(String, nullable=False)
-    opciones = Column(JSON, nullable=False)  # Array de strings: ["opción1", "opción2", ...]
+    # JSON compacto tal cual está en la BD: '["opción1","opción2",...]'. Se decodifica solo
+    # al leer `opciones`; para corregir alcanza con num_opciones
+    opciones_json = Column("opciones", Text, nullable=False)
+    num_opciones = Column(Integer, nullable=False)
     respuesta_correcta = Column(Integer, nullable=False)  # 0-based index
     explicacion = Column(Text, nullable=True)
-    categoria = Column(String, nullable=False)  # "Tecnología", "Historia", "Ciencia", etc.
-    dificultad = Column(String, nullable=False)  # "fácil", "medio", "difícil"
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    categoria_id = Column(Integer, ForeignKey("categories.id"), nullable=False, index=True)  # ver models/category.py
+    dificultad_id = Column(Integer, ForeignKey("difficulties.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), server_default=func.now())
     is_active = Column(Boolean, default=True)
 
     answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan")
+
+    @property
+    def opciones(self) -> list[str]:
+        """Lista de opciones (decodifica opciones_json)"""
+        return json.loads(self.opciones_json) if self.opciones_json else []  # type: ignore
+
+    @opciones.setter
+    def opciones(self, value: list[str]) -> None:
+        self.opciones_json = encode_options(value)  # type: ignore
+        self.num_opciones = len(value)  # type: ignore
+
+    @hybrid_property
+    def categoria(self) -> str | None:
+        """Nombre canónico de la categoría ("Tecnología", "Historia", ...)"""
+        return categories.name_of(self.categoria_id)  # type: ignore
+
+    @categoria.inplace.setter
+    def _categoria_setter(self, value: str) -> None:
+        self.categoria_id = categories.id_of(value)  # type: ignore
+
+    @categoria.inplace.comparator
+    @classmethod
+    def _categoria_comparator(cls) -> CatalogComparator:
+        return CatalogComparator(cls.categoria_id, categories)
+
+    @hybrid_property
+    def dificultad(self) -> str | None:
+        """Nombre canónico de la dificultad ("fácil", "medio", "difícil")"""
+        return difficulties.name_of(self.dificultad_id)  # type: ignore
+
+    @dificultad.inplace.setter
+    def _dificultad_setter(self, value: str) -> None:
+        self.dificultad_id = difficulties.id_of(value)  # type: ignore
+
+    @dificultad.inplace.comparator
+    @classmethod
+    def _dificultad_comparator(cls) -> CatalogComparator:
+        return CatalogComparator(cls.dificultad_id, difficulties)
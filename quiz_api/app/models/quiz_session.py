@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, DateTime, String
+from sqlalchemy import Column, Integer, DateTime, String, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from datetime import datetime, timezone
 from ..database import Base
 
@@ -9,13 +10,25 @@ class QuizSession(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_nombre = Column(String, nullable=True)
-    fecha_inicio = Column(DateTime, default=datetime.now(timezone.utc))
+    usuario_key = Column(String, nullable=True)  # Nombre normalizado (ver services/user_stats_service.py)
+    fecha_inicio = Column(DateTime, default=lambda: datetime.now(timezone.utc), server_default=func.now())
     fecha_fin = Column(DateTime, nullable=True)
     puntuacion_total = Column(Integer, default=0)
     preguntas_respondidas = Column(Integer, default=0)
     preguntas_correctas = Column(Integer, default=0)
     estado = Column(String, default="en_progreso")  # "en_progreso", "completado", "abandonado"
     tiempo_total_segundos = Column(Integer, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), server_default=func.now(), index=True)
 
     answers = relationship("Answer", back_populates="quiz_session", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Índice de cobertura para reconstruir el ranking sin leer la tabla
+        Index(
+            "ix_quiz_sessions_leaderboard",
+            "estado", "puntuacion_total", "preguntas_correctas",
+            "preguntas_respondidas", "fecha_fin", "usuario_nombre", "id",
+        ),
+        # Historial de un usuario paginado por id
+        Index("ix_quiz_sessions_usuario", "usuario_key", "id"),
+    )
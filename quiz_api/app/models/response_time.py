@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String
+from ..database import Base
+
+
+class ResponseTimeBucket(Base):
+    """Un bucket del sketch de tiempos de respuesta de una clave (ver services/response_time_service.py)"""
+    __tablename__ = "response_time_buckets"
+
+    clave = Column(String, primary_key=True)  # "global", "categoria:<id>" o "pregunta:<id>"
+    indice = Column(Integer, primary_key=True)  # -1 para las respuestas de 0 segundos
+    num_respuestas = Column(Integer, nullable=False, default=0)
+    suma_segundos = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
+from ..database import Base
+
+
+class ReviewItem(Base):
+    """Próximo repaso de una pregunta que el usuario falló alguna vez (SM-2, ver services/review_service.py)"""
+    __tablename__ = "review_items"
+
+    usuario_key = Column(String, primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    repeticiones = Column(Integer, nullable=False, default=0)  # Aciertos seguidos
+    intervalo_dias = Column(Float, nullable=False, default=0)
+    facilidad = Column(Float, nullable=False, default=2.5)
+    fallos = Column(Integer, nullable=False, default=0)
+    vence_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Las k preguntas más vencidas de un usuario salen de un rango del índice
+        Index("ix_review_items_usuario_vence", "usuario_key", "vence_at"),
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, Date, LargeBinary
+from ..database import Base
+
+
+class UniqueCountSketch(Base):
+    """HyperLogLog de usuarios o sesiones distintos por día y categoría (ver services/cardinality_service.py)"""
+    __tablename__ = "unique_count_sketches"
+
+    metrica = Column(String, primary_key=True)  # "usuarios" o "sesiones"
+    dia = Column(Date, primary_key=True)  # Día UTC
+    categoria_id = Column(Integer, primary_key=True)  # 0 = todas las categorías
+    registros = Column(LargeBinary, nullable=False)  # Registros del HLL comprimidos con zlib
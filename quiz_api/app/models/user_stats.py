@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from ..database import Base
+
+
+class UserStats(Base):
+    """Totales de las sesiones completadas de cada usuario (se actualizan al completar)"""
+    __tablename__ = "user_stats"
+
+    usuario_key = Column(String, primary_key=True)  # Ver services/user_stats_service.normalize_user
+    usuario_nombre = Column(String, nullable=False)  # Último nombre usado, para mostrar
+    num_sesiones = Column(Integer, nullable=False, default=0)
+    suma_puntuacion = Column(Integer, nullable=False, default=0)
+    mejor_puntuacion = Column(Integer, nullable=False, default=0)
+    preguntas_respondidas = Column(Integer, nullable=False, default=0)
+    preguntas_correctas = Column(Integer, nullable=False, default=0)
+    ultima_sesion_at = Column(DateTime, nullable=True)
+
+
+class UserCategoryStats(Base):
+    """Respuestas por categoría de las sesiones completadas de cada usuario"""
+    __tablename__ = "user_category_stats"
+
+    usuario_key = Column(String, primary_key=True)
+    categoria_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    num_respuestas = Column(Integer, nullable=False, default=0)
+    num_correctas = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,227 @@
+"""
+Perfilado bajo demanda (cProfile por request) y registro de consultas SQL lentas
+
+Todo es opt-in: sin ADMIN_TOKEN no se perfila nada y /debug/profiles no existe.
+Para perfilar un request se manda `X-Admin-Token: <token>` junto con
+`X-Profile: 1` (o `?profile=1`). El resultado queda en un buffer circular en
+memoria y su ID vuelve en el header `X-Profile-Id`.
+"""
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Consultas más lentas que esto (ms) se guardan con su plan; 0 lo desactiva
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+PROFILE_TOP_FUNCTIONS = 40
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+class ProfileStore:
+    """Buffer circular (thread-safe) con los últimos perfiles y consultas lentas"""
+
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE) -> None:
+        self._items: deque[dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def add(self, item: dict[str, Any]) -> int:
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+            self._items.append({"id": item_id, "fecha": datetime.now(timezone.utc).isoformat(), **item})
+            return item_id
+
+    def list(self, tipo: Optional[str] = None) -> list[dict[str, Any]]:
+        with self._lock:
+            items = list(self._items)
+        return [i for i in reversed(items) if tipo is None or i["tipo"] == tipo]
+
+    def get(self, item_id: int) -> Optional[dict[str, Any]]:
+        with self._lock:
+            return next((i for i in self._items if i["id"] == item_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+profiles = ProfileStore()
+
+
+@dataclass
+class RequestContext:
+    ruta: str
+    perfilar: bool = False
+    perfil: Optional[str] = None
+    consultas: list[tuple[float, str]] = field(default_factory=list)
+
+
+# Request en curso; anyio copia el contexto al threadpool, así que los endpoints
+# sincrónicos y los hooks de SQLAlchemy lo ven
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def _format_stats(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def _profiled(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # cProfile solo mide el hilo donde se activa: se envuelve el endpoint para
+    # activarlo dentro del hilo del threadpool que lo ejecuta
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        ctx = current_request.get()
+        if ctx is None or not ctx.perfilar:
+            return endpoint(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(endpoint, *args, **kwargs)
+        finally:
+            ctx.perfil = _format_stats(profiler)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Ruta cuyo endpoint (si es sincrónico) se puede perfilar con cProfile"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if not inspect.iscoroutinefunction(endpoint) and not inspect.isasyncgenfunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfilingMiddleware:
+    """
+    Marca el request en curso (para atribuir consultas lentas a su ruta) y, si
+    un admin lo pide, guarda el perfil cProfile y las consultas SQL del request.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict((k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in scope.get("headers", []))
+        query = scope.get("query_string", b"").decode("latin-1")
+        wants_profile = headers.get("x-profile", "") not in ("", "0") or "profile=1" in query.split("&")
+        ctx = RequestContext(
+            ruta=f"{scope.get('method')} {scope.get('path')}",
+            perfilar=wants_profile and is_admin(headers.get("x-admin-token")),
+        )
+        token = current_request.set(ctx)
+        if not ctx.perfilar:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                current_request.reset(token)
+            return
+
+        start = time.perf_counter()
+        start_message: Optional[dict[str, Any]] = None
+
+        async def wrapped_send(message: dict[str, Any]) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Se retiene para agregar X-Profile-Id cuando termine el endpoint
+                start_message = message
+                return
+            if start_message is not None:
+                elapsed = (time.perf_counter() - start) * 1000
+                profile_id = profiles.add({
+                    "tipo": "request",
+                    "ruta": ctx.ruta,
+                    "duracion_ms": round(elapsed, 2),
+                    "status": start_message["status"],
+                    "num_consultas": len(ctx.consultas),
+                    "tiempo_sql_ms": round(sum(ms for ms, _ in ctx.consultas), 2),
+                    "consultas_mas_lentas": [
+                        {"duracion_ms": round(ms, 2), "sql": sql}
+                        for ms, sql in sorted(ctx.consultas, reverse=True)[:10]
+                    ],
+                    "perfil": ctx.perfil or "(endpoint asíncrono: sin perfil cProfile)",
+                })
+                headers_out = list(start_message.get("headers", [])) + [
+                    (b"x-profile-id", str(profile_id).encode("latin-1"))
+                ]
+                await send({**start_message, "headers": headers_out})
+                start_message = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            current_request.reset(token)
+
+
+def _explain(cursor: Any, statement: str, parameters: Any) -> Optional[list[str]]:
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    try:
+        plan_cursor = cursor.connection.cursor()
+        plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        rows = plan_cursor.fetchall()
+        plan_cursor.close()
+        return [str(row[-1]) for row in rows]
+    except Exception as exc:  # el plan es solo informativo
+        return [f"(sin plan: {exc})"]
+
+
+def install_query_hooks(engine: Engine, threshold_ms: float = SLOW_QUERY_MS) -> None:
+    """
+    Medir cada consulta del engine.
+
+    Las de más de `threshold_ms` se guardan en el buffer (y se imprimen) con su
+    EXPLAIN QUERY PLAN (solo SQLite) y la ruta que las disparó. Durante un request
+    perfilado además se juntan todas sus consultas.
+    """
+    is_sqlite = engine.dialect.name == "sqlite"
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        elapsed = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        ctx = current_request.get()
+        if ctx is not None and ctx.perfilar:
+            ctx.consultas.append((elapsed, statement))
+        if threshold_ms <= 0 or elapsed < threshold_ms:
+            return
+        ruta = ctx.ruta if ctx is not None else None
+        plan = _explain(cursor, statement, parameters) if is_sqlite and not executemany else None
+        profiles.add({
+            "tipo": "consulta_lenta",
+            "ruta": ruta,
+            "duracion_ms": round(elapsed, 2),
+            "sql": statement,
+            "plan": plan,
+        })
+        sql = " ".join(statement.split())
+        print(f"[WARN] Consulta lenta ({elapsed:.0f} ms) en {ruta or 'fuera de un request'}: {sql[:200]}")
@@ -0,0 +1,206 @@
+"""Script para reconstruir created_at/fecha_inicio de filas creadas con la fecha de arranque del proceso
+
+Después recalcula lo que se agrupa por fecha: los agregados por hora/día, los
+usuarios y sesiones únicos por día y los próximos repasos de las respuestas corregidas.
+"""
+import sys
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+if sys.platform == "win32":
+    os.environ["PYTHONIOENCODING"] = "utf-8"
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, ArchiveSessionLocal, engine, archive_engine
+from app.models.question import Question
+from app.models.quiz_session import QuizSession
+from app.models.answer import Answer
+from app.services.timeseries_service import backfill_timeseries
+from app.services.cardinality_service import rebuild_unique_counts
+from app.services.review_service import replay_review
+from app.services.schema_service import ensure_schema
+
+
+def _suspect_values(values: list[Optional[datetime]]) -> set[datetime]:
+    # Antes el default se evaluaba una sola vez al importar, así que todas las filas
+    # de un mismo proceso comparten exactamente el mismo valor (con microsegundos)
+    counts = Counter(v for v in values if v is not None)
+    return {v for v, n in counts.items() if n > 1}
+
+
+def interpolate(ids: list[int], anchors: dict[int, datetime]) -> dict[int, datetime]:
+    """
+    Estimar una fecha para cada ID interpolando linealmente entre anclas conocidas.
+
+    Los IDs son autoincrementales, así que el orden de IDs es el orden de creación.
+    Antes de la primera ancla y después de la última se usa el ancla más cercana.
+    El resultado es no decreciente en el orden de los IDs.
+    """
+    known = sorted((i, anchors[i]) for i in ids if i in anchors)
+    if not known:
+        return {}
+
+    result: dict[int, datetime] = {}
+    k = 0
+    for i in sorted(ids):
+        while k + 1 < len(known) and known[k + 1][0] <= i:
+            k += 1
+        left_id, left_ts = known[k]
+        if i <= left_id:
+            result[i] = left_ts
+        elif k + 1 < len(known):
+            right_id, right_ts = known[k + 1]
+            frac = (i - left_id) / (right_id - left_id)
+            result[i] = left_ts + (right_ts - left_ts) * frac
+        else:
+            result[i] = left_ts
+
+    # Forzar orden no decreciente (las anclas pueden venir algo desordenadas)
+    latest: Optional[datetime] = None
+    for i in sorted(result):
+        if latest is not None and result[i] < latest:
+            result[i] = latest
+        latest = result[i]
+    return result
+
+
+def _bulk_update(db: Session, model: type, column: str, values: dict[int, datetime], batch_size: int) -> None:
+    table = model.__table__  # type: ignore
+    stmt = table.update().where(table.c.id == bindparam("_id")).values({column: bindparam("_ts")})
+    items = [{"_id": i, "_ts": ts} for i, ts in values.items()]
+    for start in range(0, len(items), batch_size):
+        db.connection().execute(stmt, items[start:start + batch_size])
+        db.commit()
+
+
+def repair_sessions(db: Session, rebuild_all: bool = False) -> dict[int, datetime]:
+    rows = db.query(
+        QuizSession.id, QuizSession.created_at, QuizSession.fecha_inicio,
+        QuizSession.fecha_fin, QuizSession.tiempo_total_segundos
+    ).order_by(QuizSession.id).all()
+    bad_created = _suspect_values([r[1] for r in rows])
+    bad_inicio = _suspect_values([r[2] for r in rows])
+
+    anchors: dict[int, datetime] = {}
+    to_fix: list[int] = []
+    for session_id, created_at, fecha_inicio, fecha_fin, tiempo_total in rows:
+        if created_at is not None and created_at not in bad_created and not rebuild_all:
+            anchors[session_id] = created_at
+            continue
+        to_fix.append(session_id)
+        if fecha_inicio is not None and fecha_inicio not in bad_inicio:
+            anchors[session_id] = fecha_inicio
+        elif fecha_fin is not None:
+            # fecha_fin siempre se guardó bien: se asume que la sesión duró tiempo_total
+            anchors[session_id] = fecha_fin - timedelta(seconds=tiempo_total or 0)
+
+    estimated = interpolate([r[0] for r in rows], anchors)
+    return {i: estimated[i] for i in to_fix if i in estimated}
+
+
+def repair_answers(db: Session, session_starts: dict[int, datetime], rebuild_all: bool = False) -> dict[int, datetime]:
+    rows = db.query(
+        Answer.id, Answer.quiz_session_id, Answer.created_at, Answer.tiempo_respuesta_segundos
+    ).order_by(Answer.quiz_session_id, Answer.id).all()
+    bad_created = _suspect_values([r[2] for r in rows])
+    fin_by_session = dict(db.query(QuizSession.id, QuizSession.fecha_fin).all())
+
+    fixed: dict[int, datetime] = {}
+    elapsed: dict[int, int] = {}
+    for answer_id, session_id, created_at, tiempo in rows:
+        elapsed[session_id] = elapsed.get(session_id, 0) + (tiempo or 0)
+        if created_at is not None and created_at not in bad_created and not rebuild_all:
+            continue
+        start = session_starts.get(session_id)
+        if start is None:
+            continue
+        # Cada respuesta se ubica después de la anterior según su tiempo de respuesta
+        ts = start + timedelta(seconds=elapsed[session_id])
+        fin = fin_by_session.get(session_id)
+        if fin is not None and start <= fin < ts:
+            ts = fin
+        fixed[answer_id] = ts
+    return fixed
+
+
+def repair_questions(db: Session, rebuild_all: bool = False) -> dict[int, datetime]:
+    rows = db.query(Question.id, Question.created_at).order_by(Question.id).all()
+    bad_created = _suspect_values([r[1] for r in rows])
+    anchors = {i: ts for i, ts in rows if ts is not None and ts not in bad_created and not rebuild_all}
+    to_fix = [i for i, ts in rows if i not in anchors]
+    if not anchors:
+        return {}
+    estimated = interpolate([r[0] for r in rows], anchors)
+    return {i: estimated[i] for i in to_fix if i in estimated}
+
+
+def repair_reviews(db: Session, archive_db: Session, answer_ids: set[int]) -> int:
+    """Recalcular el próximo repaso de cada (usuario, pregunta) con alguna respuesta corregida"""
+    pairs = {
+        (str(usuario_key), int(question_id))
+        for answer_id, usuario_key, question_id in db.query(Answer.id, QuizSession.usuario_key, Answer.question_id).join(
+            QuizSession, QuizSession.id == Answer.quiz_session_id
+        ).filter(QuizSession.usuario_key.isnot(None))
+        if answer_id in answer_ids
+    }
+    for usuario_key, question_id in pairs:
+        replay_review(db, archive_db, usuario_key, question_id)
+    db.commit()
+    return len(pairs)
+
+
+def repair_timestamps(dry_run: bool = False, rebuild_all: bool = False, batch_size: int = 1000) -> None:
+    ensure_schema(engine, archive_engine)
+
+    db = SessionLocal()
+    try:
+        sessions = repair_sessions(db, rebuild_all)
+        all_starts = dict(db.query(QuizSession.id, QuizSession.created_at).all())
+        all_starts.update(sessions)
+        answers = repair_answers(db, all_starts, rebuild_all)
+        questions = repair_questions(db, rebuild_all)
+
+        print(f"[INFO] Sesiones a corregir: {len(sessions)}")
+        print(f"[INFO] Respuestas a corregir: {len(answers)}")
+        print(f"[INFO] Preguntas a corregir: {len(questions)}")
+        if dry_run:
+            print("[INFO] Modo prueba: no se escribió nada")
+            return
+
+        _bulk_update(db, QuizSession, "created_at", sessions, batch_size)
+        _bulk_update(db, QuizSession, "fecha_inicio", sessions, batch_size)
+        _bulk_update(db, Answer, "created_at", answers, batch_size)
+        _bulk_update(db, Question, "created_at", questions, batch_size)
+
+        # Lo que se agrupa por día sale de created_at: se recalcula con las fechas nuevas
+        with ArchiveSessionLocal() as archive_db:
+            if answers:
+                backfill_timeseries(db, archive_db)
+                reviews = repair_reviews(db, archive_db, set(answers))
+                print(f"[INFO] Repasos recalculados: {reviews}")
+            if sessions or answers:
+                rebuild_unique_counts(db, archive_db)
+        print("✓ Fechas reconstruidas")
+        if answers:
+            print("[INFO] Si la API está andando, sus colas de repaso en memoria se actualizan en REVIEW_CACHE_TTL_SECONDS")
+    except Exception as exc:
+        db.rollback()
+        print(f"Error reconstruyendo fechas: {exc}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reconstruir fechas de creación a partir del orden de IDs")
+    parser.add_argument('--dry-run', action='store_true', help='Solo mostrar cuántas filas se corregirían')
+    parser.add_argument('--all', action='store_true', help='Recalcular todas las filas, no solo las sospechosas')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Filas actualizadas por transacción')
+    args = parser.parse_args()
+
+    repair_timestamps(dry_run=args.dry_run, rebuild_all=args.all, batch_size=args.batch_size)
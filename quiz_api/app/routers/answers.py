@@ -1,17 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import cast
-from ..database import get_db
-from ..models.answer import Answer
+from typing import Optional, cast
+from datetime import datetime, timezone
+from ..database import get_db, get_archive_db, mark_session_written
+from ..models.answer import Answer, answer_category_id
 from ..models.question import Question
 from ..models.quiz_session import QuizSession
+from ..models.archive import ArchivedAnswer
+from ..models.category import categories
 from ..schemas.answer import AnswerCreate, AnswerRead
+from ..services.timeseries_service import record_answer
+from ..services.archive_service import find_archived_session
+from ..services.live_stats_service import live_stats
+from ..services.user_stats_service import record_category_answer
+from ..services.option_stats_service import record_option_answer
+from ..services.response_time_service import response_times
+from ..services.cardinality_service import unique_counts
+from ..services.review_service import record_review, replay_review, review_queue
+from ..services.analytics_service import analytics_cache
+from ..profiling import ProfiledRoute
+from ..idempotency import IdempotentCall
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+
+DUPLICATE_ANSWER_DETAIL = "Ya existe una respuesta para esta pregunta en esta sesión"
 
 
 @router.post("/", response_model=AnswerRead)
-def register_answer(payload: AnswerCreate, db: Session = Depends(get_db)):
+def register_answer(
+    payload: AnswerCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Registrar una respuesta del usuario.
     
@@ -22,17 +44,29 @@ def register_answer(payload: AnswerCreate, db: Session = Depends(get_db)):
     
     Calcula automáticamente si la respuesta es correcta.
     
+    Con el header `Idempotency-Key`, un reintento con la misma clave devuelve
+    la respuesta original (header `Idempotent-Replayed: true`) sin volver a escribir.
+    
     Args:
         payload: Datos de la respuesta (quiz_session_id, question_id, 
                  respuesta_seleccionada, tiempo_respuesta_segundos)
         db: Sesión de base de datos
+        idempotency_key: Clave única de la operación elegida por el cliente (opcional)
         
     Returns:
         AnswerRead: Respuesta creada con su ID y corrección automática
         
     Raises:
-        HTTPException: Si sesión/pregunta no existe (404) o datos inválidos (400)
+        HTTPException: Si sesión/pregunta no existe (404), datos inválidos (400),
+                       la clave se usó con otros datos (422) o sigue en curso (409)
     """
+    with IdempotentCall(idempotency_key, "POST /answers/", payload.model_dump()) as call:
+        if call.replay is not None:
+            return call.replay
+        return call.save(AnswerRead.model_validate(_register_answer(payload, db)))
+
+
+def _register_answer(payload: AnswerCreate, db: Session) -> Answer:
     # Validar que la sesión existe
     session = db.query(QuizSession).filter(QuizSession.id == payload.quiz_session_id).first()
     if not session:
@@ -44,11 +78,11 @@ def register_answer(payload: AnswerCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Pregunta no encontrada")
     
     # Validar que respuesta_seleccionada está en rango válido
-    opciones_list = cast(list[str], question.opciones) if isinstance(question.opciones, list) else []
-    if not (0 <= payload.respuesta_seleccionada < len(opciones_list)):
+    num_opciones = cast(int, question.num_opciones)
+    if not (0 <= payload.respuesta_seleccionada < num_opciones):
         raise HTTPException(
             status_code=400,
-            detail=f"respuesta_seleccionada debe estar entre 0 y {len(opciones_list) - 1}"
+            detail=f"respuesta_seleccionada debe estar entre 0 y {num_opciones - 1}"
         )
     
     # Validar que no hay respuesta duplicada para la misma pregunta en una sesión
@@ -58,26 +92,48 @@ def register_answer(payload: AnswerCreate, db: Session = Depends(get_db)):
     ).first()
     
     if existing:
-        raise HTTPException(
-            status_code=400,
-            detail="Ya existe una respuesta para esta pregunta en esta sesión"
-        )
+        raise HTTPException(status_code=400, detail=DUPLICATE_ANSWER_DETAIL)
     
     # Determinar si la respuesta es correcta
     es_correcta = (payload.respuesta_seleccionada == question.respuesta_correcta)
     
     # Crear respuesta
+    now = datetime.now(timezone.utc)
     answer = Answer(
         quiz_session_id=payload.quiz_session_id,
         question_id=payload.question_id,
+        categoria_id=question.categoria_id,
         respuesta_seleccionada=payload.respuesta_seleccionada,
         es_correcta=es_correcta,
-        tiempo_respuesta_segundos=payload.tiempo_respuesta_segundos
+        tiempo_respuesta_segundos=payload.tiempo_respuesta_segundos,
+        created_at=now
     )
     
     db.add(answer)
-    db.commit()
+    # Actualizar los agregados por hora/día en la misma transacción
+    record_answer(db, cast(str, question.categoria), es_correcta, payload.tiempo_respuesta_segundos, now)
+    record_option_answer(db, payload.question_id, payload.respuesta_seleccionada, es_correcta)
+    usuario_key = cast(Optional[str], session.usuario_key)
+    vence_at = None
+    if usuario_key:
+        if session.estado == "completado":
+            # Los totales por categoría del usuario cuentan las respuestas de sesiones completadas
+            record_category_answer(db, usuario_key, cast(int, question.categoria_id), es_correcta)
+        # Cola de repaso del usuario (ver /questions/review)
+        vence_at = record_review(db, usuario_key, payload.question_id, es_correcta, payload.tiempo_respuesta_segundos, now)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otra petición insertó la misma (sesión, pregunta) entre la validación y el commit
+        db.rollback()
+        raise HTTPException(status_code=400, detail=DUPLICATE_ANSWER_DETAIL)
+    if usuario_key and vence_at is not None:
+        review_queue.update(usuario_key, payload.question_id, vence_at)
+    response_times.record(payload.question_id, cast(int, question.categoria_id), payload.tiempo_respuesta_segundos)
+    unique_counts.record_answer(payload.quiz_session_id, usuario_key, cast(int, question.categoria_id), now)
     db.refresh(answer)
+    mark_session_written(cast(int, answer.quiz_session_id))
+    live_stats.publish("respuesta")
     return answer
 
 
@@ -85,6 +141,7 @@ def register_answer(payload: AnswerCreate, db: Session = Depends(get_db)):
 def get_answers_by_session(
     session_id: int,
     db: Session = Depends(get_db),
+    archive_db: Session = Depends(get_archive_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100)
 ):
@@ -92,11 +149,13 @@ def get_answers_by_session(
     Obtener todas las respuestas de una sesión específica.
     
     Retorna un listado de todas las respuestas registradas en una sesión,
-    incluyendo si fueron correctas o no.
+    incluyendo si fueron correctas o no. Si la sesión ya fue archivada,
+    las respuestas se leen de la base de datos de archivo.
     
     Args:
         session_id: ID de la sesión
         db: Sesión de base de datos
+        archive_db: Sesión de la base de datos de archivo
         skip: Número de registros a saltar (default: 0)
         limit: Número máximo de registros a retornar (1-100, default: 100)
         
@@ -109,6 +168,11 @@ def get_answers_by_session(
     # Validar que la sesión existe
     session = db.query(QuizSession).filter(QuizSession.id == session_id).first()
     if not session:
+        archived = archive_db.query(ArchivedAnswer).filter(
+            ArchivedAnswer.quiz_session_id == session_id
+        ).order_by(ArchivedAnswer.id).offset(skip).limit(limit).all()
+        if archived or find_archived_session(archive_db, session_id):
+            return archived
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
     
     return db.query(Answer).filter(
@@ -138,17 +202,24 @@ def get_answer(answer_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{answer_id}", response_model=AnswerRead)
-def update_answer(answer_id: int, payload: AnswerCreate, db: Session = Depends(get_db)):
+def update_answer(
+    answer_id: int,
+    payload: AnswerCreate,
+    db: Session = Depends(get_db),
+    archive_db: Session = Depends(get_archive_db)
+):
     """
     Actualizar una respuesta registrada (para correcciones).
     
     Permite cambiar la respuesta seleccionada y recalcula automáticamente
-    si es correcta. También puede actualizar el tiempo de respuesta.
+    si es correcta. También puede actualizar el tiempo de respuesta. El
+    próximo repaso de la pregunta se recalcula como si se hubiera respondido así.
     
     Args:
         answer_id: ID de la respuesta a actualizar
         payload: Nuevos datos de la respuesta
         db: Sesión de base de datos
+        archive_db: Sesión de la base de datos de archivo (historial de repasos)
         
     Returns:
         AnswerRead: Respuesta actualizada
@@ -166,19 +237,55 @@ def update_answer(answer_id: int, payload: AnswerCreate, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="Pregunta no encontrada")
     
     # Validar que respuesta_seleccionada está en rango válido
-    opciones_list = cast(list[str], question.opciones) if isinstance(question.opciones, list) else []
-    if not (0 <= payload.respuesta_seleccionada < len(opciones_list)):
+    num_opciones = cast(int, question.num_opciones)
+    if not (0 <= payload.respuesta_seleccionada < num_opciones):
         raise HTTPException(
             status_code=400,
-            detail=f"respuesta_seleccionada debe estar entre 0 y {len(opciones_list) - 1}"
+            detail=f"respuesta_seleccionada debe estar entre 0 y {num_opciones - 1}"
         )
     
+    # Quitar la respuesta anterior de los agregados por hora/día, en la categoría en la que se sumó
+    categoria_id = answer_category_id(answer)
+    categoria = cast(str, categories.name_of(categoria_id))
+    tiempo_anterior = cast(Optional[int], answer.tiempo_respuesta_segundos)
+    created_at = cast(datetime, answer.created_at)
+    record_answer(db, categoria, cast(bool, answer.es_correcta), cast(int, answer.tiempo_respuesta_segundos), created_at, sign=-1)
+    record_option_answer(
+        db, cast(int, answer.question_id), cast(int, answer.respuesta_seleccionada), cast(bool, answer.es_correcta), sign=-1
+    )
+    session = answer.quiz_session
+    usuario_key = cast(str, session.usuario_key) if session.estado == "completado" else None
+    if usuario_key:
+        record_category_answer(db, usuario_key, categoria_id, cast(bool, answer.es_correcta), sign=-1)
+    
     # Actualizar respuesta
     answer.respuesta_seleccionada = payload.respuesta_seleccionada  # type: ignore
     answer.es_correcta = (payload.respuesta_seleccionada == question.respuesta_correcta)  # type: ignore
     answer.tiempo_respuesta_segundos = payload.tiempo_respuesta_segundos  # type: ignore
+    record_answer(db, categoria, cast(bool, answer.es_correcta), payload.tiempo_respuesta_segundos, created_at)
+    record_option_answer(db, cast(int, answer.question_id), payload.respuesta_seleccionada, cast(bool, answer.es_correcta))
+    if usuario_key:
+        record_category_answer(db, usuario_key, categoria_id, cast(bool, answer.es_correcta))
+    # La cola de repaso cuenta todas las sesiones del usuario, completadas o no (como al registrar)
+    review_key = cast(Optional[str], session.usuario_key)
+    vence_at = None
+    if review_key:
+        db.add(answer)
+        db.flush()
+        vence_at = replay_review(db, archive_db, review_key, cast(int, answer.question_id))
     
     db.add(answer)
     db.commit()
     db.refresh(answer)
+    if review_key:
+        if vence_at is not None:
+            review_queue.update(review_key, cast(int, answer.question_id), vence_at)
+        else:
+            review_queue.remove(review_key, cast(int, answer.question_id))
+    mark_session_written(cast(int, answer.quiz_session_id))
+    response_times.record(cast(int, answer.question_id), categoria_id, tiempo_anterior, sign=-1)
+    response_times.record(cast(int, answer.question_id), categoria_id, payload.tiempo_respuesta_segundos)
+    # Corregir una respuesta no cambia la versión de los datos del análisis
+    analytics_cache.invalidate()
+    live_stats.publish("respuesta")
     return answer
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from typing import Any, Literal, Optional
+from ..profiling import ADMIN_TOKEN, is_admin, profiles
+
+router = APIRouter()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Solo con X-Admin-Token válido; sin ADMIN_TOKEN configurado las rutas no existen"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Token de administrador inválido")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+def list_profiles(
+    tipo: Optional[Literal["request", "consulta_lenta"]] = Query(None)
+) -> list[dict[str, Any]]:
+    """
+    Listar los perfiles y consultas lentas guardados (del más nuevo al más viejo).
+
+    El texto del perfil cProfile no se incluye; se obtiene con /debug/profiles/{id}.
+
+    Args:
+        tipo: Filtrar por "request" (perfiles pedidos con X-Profile) o "consulta_lenta"
+
+    Returns:
+        list: Resumen de cada entrada del buffer
+    """
+    return [{k: v for k, v in item.items() if k != "perfil"} for item in profiles.list(tipo)]
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile(profile_id: int) -> dict[str, Any]:
+    """
+    Obtener una entrada completa del buffer (con el perfil cProfile o el plan de la consulta).
+
+    Raises:
+        HTTPException: Si la entrada ya no está en el buffer (404)
+    """
+    item = profiles.get(profile_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return item
+
+
+@router.delete("/profiles", dependencies=[Depends(require_admin)])
+def clear_profiles() -> dict[str, str]:
+    profiles.clear()
+    return {"detail": "Perfiles eliminados"}
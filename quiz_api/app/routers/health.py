@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from typing import Any
+from ..admission import MAX_CONCURRENT_WRITES, RATE_LIMITS, RATE_LIMIT_ENABLED, admission_stats, rate_limiter
+from ..startup import startup
+
+router = APIRouter()
+
+
+@router.get("/live")
+def health_live() -> dict[str, str]:
+    """El proceso está vivo (no revisa la BD)"""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def health_ready() -> JSONResponse:
+    """
+    La API puede recibir tráfico: el esquema de la BD está verificado.
+
+    No espera a las cachés que se cargan en segundo plano; su estado
+    ("cargando", "listo" o "error") y los tiempos de cada etapa del arranque
+    vienen en la respuesta.
+
+    Returns:
+        200 si está lista, 503 mientras arranca
+    """
+    estado = startup.snapshot()
+    return JSONResponse(status_code=200 if estado["listo"] else 503, content=estado)
+
+
+@router.get("/admission")
+def health_admission() -> dict[str, Any]:
+    """
+    Métricas del control de admisión de este proceso.
+
+    Por clase de ruta (lectura, escritura, masiva): requests admitidos,
+    limitados por tasa (429) y rechazados por exceso de escrituras en
+    curso (503); además las escrituras en curso, su máximo y la cantidad de
+    buckets (cliente, clase) en memoria.
+
+    Returns:
+        dict: Configuración y contadores desde que arrancó el proceso
+    """
+    return {
+        "activo": RATE_LIMIT_ENABLED,
+        "limites": {clase: {"tasa": rate, "rafaga": burst} for clase, (rate, burst) in RATE_LIMITS.items()},
+        "max_escrituras_simultaneas": MAX_CONCURRENT_WRITES,
+        "buckets": len(rate_limiter),
+        **admission_stats.snapshot(),
+    }
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, HTTPException, Query
+from datetime import date
+from typing import Any, Optional
+from ..services.leaderboard_service import leaderboard
+from ..services.quiz_service import canonical_category
+from ..profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def _resolve_board(fecha: Optional[date], categoria: Optional[str]):
+    if not leaderboard.loaded.is_set():
+        raise HTTPException(status_code=503, detail="El ranking se está cargando", headers={"Retry-After": "1"})
+    if fecha is not None and categoria:
+        raise HTTPException(status_code=400, detail="Usar fecha o categoria, no ambas")
+    if categoria:
+        try:
+            categoria = canonical_category(categoria)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return leaderboard.board(
+        dia=fecha.isoformat() if fecha is not None else None,
+        categoria=categoria or None
+    )
+
+
+@router.get("/")
+def get_leaderboard(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    fecha: Optional[date] = Query(None),
+    categoria: Optional[str] = Query(None)
+) -> dict[str, Any]:
+    """
+    Obtener el ranking de sesiones completadas por puntuación.
+    
+    Sin filtros devuelve el ranking global. Con `fecha` devuelve el ranking de
+    las sesiones terminadas ese día (UTC) y con `categoria` el ranking según
+    la puntuación obtenida solo en las preguntas de esa categoría.
+    
+    El ranking se mantiene en memoria, así que no consulta la base de datos.
+    
+    Args:
+        skip: Número de posiciones a saltar (default: 0)
+        limit: Número máximo de posiciones a retornar (1-100, default: 10)
+        fecha: Día de finalización (YYYY-MM-DD, opcional)
+        categoria: Categoría (opcional)
+        
+    Returns:
+        dict: Total de sesiones en el ranking y las posiciones pedidas
+        
+    Raises:
+        HTTPException: Si se usan fecha y categoría a la vez, o la categoría no existe (400)
+    """
+    board = _resolve_board(fecha, categoria)
+    return {
+        "total": len(board),
+        "ranking": board.top(limit, offset=skip)
+    }
+
+
+@router.get("/session/{session_id}")
+def get_session_rank(
+    session_id: int,
+    fecha: Optional[date] = Query(None),
+    categoria: Optional[str] = Query(None)
+) -> dict[str, Any]:
+    """
+    Obtener la posición de una sesión en el ranking.
+    
+    Args:
+        session_id: ID de la sesión
+        fecha: Día de finalización (YYYY-MM-DD, opcional)
+        categoria: Categoría (opcional)
+        
+    Returns:
+        dict: Posición de la sesión, total de sesiones y datos de la entrada
+        
+    Raises:
+        HTTPException: Si la sesión no está en el ranking (404)
+    """
+    board = _resolve_board(fecha, categoria)
+    posicion = board.rank(session_id)
+    if posicion is None:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada en el ranking")
+    return {
+        "posicion": posicion,
+        "total": len(board),
+        **(board.entry(session_id) or {})
+    }
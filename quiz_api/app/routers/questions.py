@@ -1,16 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from typing import List, Literal, Optional
 from random import sample
-from ..database import get_db
+from ..database import get_db, get_read_db, consistent_read
 from ..models.question import Question
-from ..schemas.question import QuestionCreate, QuestionRead
+from ..models.category import categories, difficulties
+from ..schemas.question import QuestionCreate, QuestionRead, questions_json
+from ..services.quiz_service import canonical_category, canonical_difficulty
+from ..services.search_service import index_questions, search_questions
+from ..services.live_stats_service import live_stats
+from ..services.review_service import review_queue
+from ..services.snapshot_service import QuestionSnapshot, question_snapshots
+from ..services.user_stats_service import normalize_user
+from ..services.dedup_service import (
+    DEFAULT_THRESHOLD, DedupIndex, get_dedup_index, minhash, question_text, track_questions
+)
+from ..profiling import ProfiledRoute
 
 # Type hints for better IDE support
 QuestionList = List[QuestionRead]
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def _questions_response(questions: list[Question]) -> Response:
+    # Las opciones se copian crudas de la BD (ver schemas.question.questions_json)
+    return Response(content=questions_json(questions), media_type="application/json")
+
+
+def _snapshot(request: Request) -> Optional[QuestionSnapshot]:
+    # Con X-Consistent-Read se lee de la BD principal, igual que get_read_db
+    return None if consistent_read(request) else question_snapshots.current()
 
 
 @router.post("/", response_model=QuestionRead)
@@ -38,13 +58,19 @@ def create_question(payload: QuestionCreate, db: Session = Depends(get_db)):
         dificultad=payload.dificultad
     )
     db.add(q)
+    db.flush()
+    index_questions(db, [q])
     db.commit()
     db.refresh(q)
+    track_questions([q])
+    question_snapshots.invalidate()
+    live_stats.publish("pregunta")
     return q
 
 
 @router.get("/random", response_model=List[QuestionRead])
 def get_random_questions(
+    request: Request,
     db: Session = Depends(get_db),
     limit: int = Query(10, ge=1, le=50)
 ):
@@ -52,9 +78,12 @@ def get_random_questions(
     Obtener preguntas aleatorias para un quiz.
     
     Este endpoint retorna un número aleatorio de preguntas activas.
-    Útil para iniciar una sesión de quiz con preguntas variadas.
+    Útil para iniciar una sesión de quiz con preguntas variadas. Si el
+    snapshot del banco está al día se sortea sobre él, sin consultar la BD
+    (salvo con X-Consistent-Read).
     
     Args:
+        request: Request (para X-Consistent-Read)
         db: Sesión de base de datos
         limit: Número máximo de preguntas a retornar (1-50, default: 10)
         
@@ -64,18 +93,89 @@ def get_random_questions(
     Raises:
         HTTPException: Si no hay preguntas disponibles
     """
-    total = db.query(func.count(Question.id)).filter(Question.is_active == True).scalar()
-    if total == 0:
+    snapshot = _snapshot(request)
+    if snapshot is not None and len(snapshot) > 0:
+        chosen_positions = sample(range(len(snapshot)), min(limit, len(snapshot)))
+        return Response(content=snapshot.json(chosen_positions), media_type="application/json")
+    
+    # Se sortean solo los IDs y se cargan únicamente las preguntas elegidas
+    ids = [row[0] for row in db.query(Question.id).filter(Question.is_active == True)]
+    if not ids:
         raise HTTPException(status_code=404, detail="No hay preguntas disponibles")
     
-    num_questions = min(limit, total)
-    questions = db.query(Question).filter(Question.is_active == True).all()
-    return sample(questions, num_questions)
+    chosen = sample(ids, min(limit, len(ids)))
+    questions = {q.id: q for q in db.query(Question).filter(Question.id.in_(chosen))}
+    return _questions_response([questions[i] for i in chosen if i in questions])
+
+
+@router.get("/review", response_model=List[QuestionRead])
+def get_review_questions(
+    usuario: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener las preguntas que al usuario le toca repasar.
+    
+    Una pregunta entra en el repaso la primera vez que el usuario la falla y
+    cada respuesta posterior la reprograma con SM-2 (cuanto más la acierta,
+    más tarda en volver). Devuelve las más vencidas primero; puede devolver
+    menos de `limit` (o ninguna) si no hay tantas vencidas.
+    
+    Args:
+        usuario: Nombre del usuario (sin distinguir mayúsculas ni espacios de más)
+        limit: Número máximo de preguntas (1-50, default: 10)
+        db: Sesión de base de datos
+        
+    Returns:
+        List[QuestionRead]: Preguntas a repasar
+    """
+    key = normalize_user(usuario)
+    if key is None:
+        raise HTTPException(status_code=400, detail="usuario no puede estar vacío")
+    
+    chosen: list[Question] = []
+    offset = 0
+    # Se saltean las preguntas desactivadas o borradas
+    while len(chosen) < limit:
+        ids = review_queue.overdue(db, key, limit - len(chosen), offset)
+        if not ids:
+            break
+        offset += len(ids)
+        found = {q.id: q for q in db.query(Question).filter(Question.id.in_(ids), Question.is_active == True)}
+        chosen.extend(found[i] for i in ids if i in found)
+    return _questions_response(chosen)
+
+
+@router.get("/search", response_model=List[QuestionRead])
+def search(
+    db: Session = Depends(get_read_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Buscar preguntas activas por texto.
+    
+    Busca en el enunciado, la explicación y las opciones usando un índice
+    FTS5. No distingue mayúsculas ni acentos y ordena por relevancia (bm25).
+    
+    Args:
+        db: Sesión de base de datos
+        q: Texto a buscar
+        skip: Número de resultados a saltar (default: 0)
+        limit: Número máximo de resultados (1-100, default: 10)
+        
+    Returns:
+        List[QuestionRead]: Preguntas que coinciden, de más a menos relevante
+    """
+    return _questions_response(search_questions(db, q, skip=skip, limit=limit))
 
 
 @router.get("/", response_model=List[QuestionRead])
 def list_questions(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     categoria: str = Query(None),
@@ -85,34 +185,56 @@ def list_questions(
     """
     Listar preguntas activas con filtros y paginación.
     
+    Las preguntas activas se sirven del snapshot del banco (sin consultar la
+    BD) cuando está al día; las inactivas siempre se leen de la BD.
+    
     Args:
+        request: Request (para X-Consistent-Read)
         db: Sesión de base de datos
         skip: Número de registros a saltar (default: 0)
         limit: Número máximo de registros a retornar (1-100, default: 10)
-        categoria: Filtrar por categoría (opcional)
-        dificultad: Filtrar por dificultad (opcional)
+        categoria: Filtrar por categoría, sin importar acentos ni mayúsculas (opcional)
+        dificultad: Filtrar por dificultad, sin importar acentos ni mayúsculas (opcional)
         is_active: Filtrar por estado activo (default: True)
         
     Returns:
         List[QuestionRead]: Lista de preguntas que cumplen los filtros
     """
-    query = db.query(Question).filter(Question.is_active == is_active)
+    # Los filtros aceptan las mismas variantes que al crear (sin acentos, mayúsculas, etc.)
+    categoria_id: Optional[int] = None
+    dificultad_id: Optional[int] = None
+    try:
+        if categoria:
+            categoria_id = categories.id_of(canonical_category(categoria))
+        if dificultad:
+            dificultad_id = difficulties.id_of(canonical_difficulty(dificultad))
+    except ValueError:
+        return []
     
-    if categoria:
-        query = query.filter(Question.categoria == categoria)
-    if dificultad:
-        query = query.filter(Question.dificultad == dificultad)
+    snapshot = _snapshot(request) if is_active else None
+    if snapshot is not None:
+        positions = snapshot.positions(categoria_id, dificultad_id)[skip:skip + limit]
+        return Response(content=snapshot.json(positions), media_type="application/json")
     
-    return query.offset(skip).limit(limit).all()
+    query = db.query(Question).filter(Question.is_active == is_active)
+    if categoria_id is not None:
+        query = query.filter(Question.categoria_id == categoria_id)
+    if dificultad_id is not None:
+        query = query.filter(Question.dificultad_id == dificultad_id)
+    return _questions_response(query.offset(skip).limit(limit).all())
 
 
 @router.get("/{question_id}", response_model=QuestionRead)
-def get_question(question_id: int, db: Session = Depends(get_db)):
+def get_question(question_id: int, request: Request, db: Session = Depends(get_read_db)):
     """
     Obtener una pregunta específica por ID.
     
+    Las preguntas activas salen del snapshot del banco; si no está ahí
+    (inactiva o más nueva que el snapshot) se busca en la BD.
+    
     Args:
         question_id: ID de la pregunta a obtener
+        request: Request (para X-Consistent-Read)
         db: Sesión de base de datos
         
     Returns:
@@ -121,6 +243,12 @@ def get_question(question_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: Si la pregunta no existe (404)
     """
+    snapshot = _snapshot(request)
+    if snapshot is not None:
+        body = snapshot.get(question_id)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+    
     q = db.query(Question).filter(Question.id == question_id).first()
     if not q:
         raise HTTPException(status_code=404, detail="Pregunta no encontrada")
@@ -162,8 +290,13 @@ def update_question(
     q.dificultad = payload.dificultad  # type: ignore
     
     db.add(q)
+    db.flush()
+    index_questions(db, [q])
     db.commit()
     db.refresh(q)
+    track_questions([q])
+    question_snapshots.invalidate()
+    live_stats.publish("pregunta")
     return q
 
 
@@ -191,14 +324,21 @@ def delete_question(question_id: int, db: Session = Depends(get_db)):
     
     q.is_active = False  # type: ignore
     db.add(q)
+    index_questions(db, [q])
     db.commit()
+    track_questions([q])
+    question_snapshots.invalidate()
+    live_stats.publish("pregunta")
     return {"detail": "Pregunta eliminada"}
 
 
 @router.post("/bulk", response_model=List[QuestionRead])
 def bulk_create_questions(
     payload: List[QuestionCreate],
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_db),
+    duplicados: Literal["permitir", "omitir", "rechazar"] = Query("permitir"),
+    umbral: float = Query(DEFAULT_THRESHOLD, ge=0.5, le=1.0)
 ) -> List[QuestionRead]:
     """
     Crear múltiples preguntas desde JSON en una sola petición.
@@ -206,18 +346,54 @@ def bulk_create_questions(
     Útil para cargar un conjunto de preguntas desde un archivo JSON.
     Todas las validaciones de Pydantic se aplican a cada pregunta.
     
+    Cada pregunta se compara contra el banco existente (y contra las
+    anteriores del mismo lote) con un índice MinHash/LSH, en tiempo
+    aproximadamente constante por pregunta. Según `duplicados`:
+    - permitir: se crean todas; los casos sospechosos se informan en el
+      header `X-Duplicados` como `indice:id_existente` (o `indice:lote-j`
+      si repite a la pregunta j del lote), separados por coma
+    - omitir: los casi duplicados no se crean
+    - rechazar: si hay algún casi duplicado no se crea nada (409)
+    
     Args:
         payload: Lista de preguntas a crear
+        response: Respuesta HTTP (para el header X-Duplicados)
         db: Sesión de base de datos
+        duplicados: Qué hacer con los casi duplicados (default: permitir)
+        umbral: Similitud estimada mínima para considerar duplicado (0.5-1.0)
         
     Returns:
         List[QuestionRead]: Lista de preguntas creadas con sus IDs
         
     Raises:
         HTTPException: Si alguna pregunta contiene datos inválidos (400)
+                       o hay duplicados con duplicados=rechazar (409)
     """
+    index = get_dedup_index(db)
+    batch_index = DedupIndex()
+    sospechosos: list[dict[str, object]] = []
     questions: list[Question] = []
-    for item in payload:
+    for i, item in enumerate(payload):
+        sig = minhash(question_text(item.pregunta, item.opciones))
+        match = index.best_match(sig, umbral)
+        if match is None:
+            # Duplicados dentro del mismo lote: la clave es la posición en payload
+            batch_match = batch_index.best_match(sig, umbral)
+            if batch_match is not None:
+                match = (-1 - batch_match[0], batch_match[1])
+        batch_index.add(i, sig)
+        
+        if match is not None:
+            other, sim = match
+            sospechosos.append({
+                "indice": i,
+                "question_id": other if other >= 0 else None,
+                "indice_lote": -1 - other if other < 0 else None,
+                "similitud": round(sim, 2)
+            })
+            if duplicados == "omitir":
+                continue
+        
         q = Question(
             pregunta=item.pregunta,
             opciones=item.opciones,
@@ -229,8 +405,26 @@ def bulk_create_questions(
         db.add(q)
         questions.append(q)
     
+    if sospechosos and duplicados == "rechazar":
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={"mensaje": "El lote contiene preguntas casi duplicadas", "duplicados": sospechosos}
+        )
+    
+    db.flush()
+    index_questions(db, questions)
     db.commit()
     for q in questions:
         db.refresh(q)
+    track_questions(questions)
+    question_snapshots.invalidate()
+    live_stats.publish("pregunta")
+    
+    if sospechosos:
+        response.headers["X-Duplicados"] = ",".join(
+            f"{d['indice']}:{d['question_id'] if d['question_id'] is not None else 'lote-' + str(d['indice_lote'])}"
+            for d in sospechosos
+        )
     
     return questions  # type: ignore
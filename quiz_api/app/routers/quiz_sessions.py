@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import cast
+from typing import Optional, cast
 from datetime import datetime, timezone
-from ..database import get_db
+from ..database import get_db, get_archive_db, mark_session_written
 from ..models.quiz_session import QuizSession
 from ..models.answer import Answer
+from ..models.question import Question
+from ..models.category import categories
 from ..schemas.quiz_session import QuizSessionCreate, QuizSessionRead
+from ..services.leaderboard_service import leaderboard, record_session
+from ..services.timeseries_service import record_answer
+from ..services.archive_service import find_archived_session
+from ..services.live_stats_service import live_stats
+from ..services.user_stats_service import normalize_user, record_completion, remove_completion
+from ..services.option_stats_service import record_option_answer
+from ..services.response_time_service import response_times
+from ..services.cardinality_service import unique_counts
+from ..services.review_service import replay_review, review_queue
+from ..profiling import ProfiledRoute
+from ..idempotency import IdempotentCall
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.post("/", response_model=QuizSessionRead)
@@ -27,11 +41,14 @@ def create_session(payload: QuizSessionCreate, db: Session = Depends(get_db)):
     """
     session = QuizSession(
         usuario_nombre=payload.usuario_nombre,
+        usuario_key=normalize_user(payload.usuario_nombre),
         estado="en_progreso"
     )
     db.add(session)
     db.commit()
     db.refresh(session)
+    mark_session_written(cast(int, session.id))
+    unique_counts.record_session(cast(int, session.id), cast(Optional[str], session.usuario_key), cast(datetime, session.created_at))
     return session
 
 
@@ -58,13 +75,20 @@ def list_sessions(
 
 
 @router.get("/{session_id}", response_model=QuizSessionRead)
-def get_session(session_id: int, db: Session = Depends(get_db)):
+def get_session(
+    session_id: int,
+    db: Session = Depends(get_db),
+    archive_db: Session = Depends(get_archive_db)
+):
     """
     Obtener detalles completos de una sesión específica.
     
+    Si la sesión ya fue archivada, se lee de la base de datos de archivo.
+    
     Args:
         session_id: ID de la sesión a obtener
         db: Sesión de base de datos
+        archive_db: Sesión de la base de datos de archivo
         
     Returns:
         QuizSessionRead: Datos completos de la sesión
@@ -73,13 +97,20 @@ def get_session(session_id: int, db: Session = Depends(get_db)):
         HTTPException: Si la sesión no existe (404)
     """
     session = db.query(QuizSession).filter(QuizSession.id == session_id).first()
+    if not session:
+        session = find_archived_session(archive_db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
     return session
 
 
 @router.put("/{session_id}/complete", response_model=QuizSessionRead)
-def complete_session(session_id: int, db: Session = Depends(get_db)):
+def complete_session(
+    session_id: int,
+    db: Session = Depends(get_db),
+    archive_db: Session = Depends(get_archive_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Finalizar una sesión de quiz y calcular la puntuación final.
     
@@ -89,9 +120,14 @@ def complete_session(session_id: int, db: Session = Depends(get_db)):
     - Número de preguntas respondidas y correctas
     - Tiempo total invertido
     
+    También actualiza los totales del usuario (ver /users/{nombre}/stats).
+    Acepta el header `Idempotency-Key` igual que `POST /answers/`.
+    
     Args:
         session_id: ID de la sesión a finalizar
         db: Sesión de base de datos
+        archive_db: Sesión de la base de datos de archivo (para recalcular la mejor puntuación)
+        idempotency_key: Clave única de la operación elegida por el cliente (opcional)
         
     Returns:
         QuizSessionRead: Sesión actualizada con la puntuación final
@@ -99,10 +135,26 @@ def complete_session(session_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: Si la sesión no existe (404)
     """
+    with IdempotentCall(idempotency_key, f"PUT /quiz-sessions/{session_id}/complete", {}) as call:
+        if call.replay is not None:
+            return call.replay
+        return call.save(QuizSessionRead.model_validate(_complete_session(session_id, db, archive_db)))
+
+
+def _complete_session(session_id: int, db: Session, archive_db: Session) -> QuizSession:
     session = db.query(QuizSession).filter(QuizSession.id == session_id).first()
     if not session:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
     
+    previous = None
+    if session.estado == "completado":
+        # Se completa otra vez: en los totales del usuario se reemplazan los valores anteriores
+        previous = (
+            int(session.puntuacion_total or 0),  # type: ignore
+            int(session.preguntas_respondidas or 0),  # type: ignore
+            int(session.preguntas_correctas or 0),  # type: ignore
+        )
+    
     # Obtener todas las respuestas de esta sesión
     answers = db.query(Answer).filter(Answer.quiz_session_id == session_id).all()
     
@@ -123,22 +175,33 @@ def complete_session(session_id: int, db: Session = Depends(get_db)):
     session.estado = "completado"  # type: ignore
     
     db.add(session)
+    db.flush()
+    record_completion(db, archive_db, session, previous)
     db.commit()
     db.refresh(session)
+    record_session(db, session)
+    mark_session_written(session_id)
+    live_stats.publish("sesion")
     return session
 
 
 @router.delete("/{session_id}")
-def delete_session(session_id: int, db: Session = Depends(get_db)):
+def delete_session(
+    session_id: int,
+    db: Session = Depends(get_db),
+    archive_db: Session = Depends(get_archive_db)
+):
     """
     Eliminar una sesión de quiz.
     
     Nota: Esta acción es irreversible y eliminará también todas 
-    las respuestas asociadas a la sesión (por cascada).
+    las respuestas asociadas a la sesión (por cascada). Los repasos de
+    las preguntas respondidas se recalculan sin ellas.
     
     Args:
         session_id: ID de la sesión a eliminar
         db: Sesión de base de datos
+        archive_db: Sesión de la base de datos de archivo
         
     Returns:
         dict: Mensaje de confirmación
@@ -150,6 +213,35 @@ def delete_session(session_id: int, db: Session = Depends(get_db)):
     if not session:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
     
+    # Descontar las respuestas de la sesión de los agregados por hora/día y por opción
+    # Cada respuesta se descuenta de la categoría en la que se sumó, aunque la pregunta haya cambiado
+    answers = db.query(
+        Answer.es_correcta, Answer.tiempo_respuesta_segundos, Answer.created_at,
+        func.coalesce(Answer.categoria_id, Question.categoria_id),
+        Answer.question_id, Answer.respuesta_seleccionada,
+    ).join(Question, Question.id == Answer.question_id).filter(Answer.quiz_session_id == session_id).all()
+    for es_correcta, tiempo, created_at, categoria_id, question_id, opcion in answers:
+        record_answer(db, cast(str, categories.name_of(categoria_id)), bool(es_correcta), tiempo, created_at, sign=-1)
+        record_option_answer(db, question_id, opcion, bool(es_correcta), sign=-1)
+    remove_completion(db, archive_db, session)
+    
+    usuario_key = cast(Optional[str], session.usuario_key)
     db.delete(session)
+    # El repaso de cada pregunta respondida se recalcula con el historial que queda del usuario
+    repasos: dict[int, Optional[datetime]] = {}
+    if usuario_key:
+        db.flush()
+        for question_id in {row[4] for row in answers}:
+            repasos[question_id] = replay_review(db, archive_db, usuario_key, question_id)
     db.commit()
+    for _, tiempo, _, categoria_id, question_id, _ in answers:
+        response_times.record(question_id, categoria_id, tiempo, sign=-1)
+    for question_id, vence_at in repasos.items():
+        if vence_at is not None:
+            review_queue.update(cast(str, usuario_key), question_id, vence_at)
+        else:
+            review_queue.remove(cast(str, usuario_key), question_id)
+    leaderboard.remove(session_id)
+    mark_session_written(session_id)
+    live_stats.publish("sesion")
     return {"detail": "Sesión eliminada"}
@@ -1,17 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Any, cast
-from ..database import get_db
+from typing import Any, Literal, Optional, cast
+from datetime import date, datetime
+from ..database import SessionLocal, get_read_db, get_session_read_db, get_archive_db
 from ..models.quiz_session import QuizSession
 from ..models.answer import Answer
 from ..models.question import Question
+from ..models.category import categories
+from ..services.quiz_service import canonical_category, get_question_statistics
+from ..services.timeseries_service import as_utc_naive, default_range, get_timeseries
+from ..services.archive_service import archived_question_totals, archived_session_totals, find_archived_session
+from ..services.live_stats_service import live_stats
+from ..services import analytics_service
+from ..services.analytics_service import analytics_cache
+from ..services.response_time_service import GLOBAL_KEY, category_key, question_key, response_times
+from ..services.cardinality_service import ALL_CATEGORIES, STANDARD_ERROR, default_days, unique_counts
+from ..profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/global")
-def statistics_global(db: Session = Depends(get_db)) -> dict[str, Any]:
+def statistics_global(db: Session = Depends(get_read_db)) -> dict[str, Any]:
     """
     Obtener estadísticas globales del sistema.
     
@@ -20,6 +32,7 @@ def statistics_global(db: Session = Depends(get_db)) -> dict[str, Any]:
     - Total de sesiones completadas
     - Promedio de aciertos general (de todas las sesiones)
     - Categorías con mayor tasa de error (top 5)
+    - Tiempo de respuesta: promedio y percentiles 50/90/99 aproximados
     
     Útil para dashboards y análisis del rendimiento global.
     
@@ -32,28 +45,36 @@ def statistics_global(db: Session = Depends(get_db)) -> dict[str, Any]:
     # Total de preguntas activas
     total_preguntas = db.query(func.count(Question.id)).filter(Question.is_active == True).scalar()
     
-    # Total de sesiones completadas
+    # Total de sesiones completadas (incluye las archivadas)
+    archivadas = archived_session_totals(db)
     total_sesiones = db.query(func.count(QuizSession.id)).filter(QuizSession.estado == "completado").scalar()
+    total_sesiones += archivadas["num_sesiones_completadas"]
     
     # Promedio de aciertos general
     sesiones = db.query(QuizSession).filter(QuizSession.estado == "completado").all()
     promedio_aciertos = (
-        sum(cast(int, s.puntuacion_total) for s in sesiones) / len(sesiones)
-        if sesiones else 0
+        (sum(cast(int, s.puntuacion_total) for s in sesiones) + archivadas["suma_puntuacion"]) / total_sesiones
+        if total_sesiones else 0
     )
+    archivadas_por_pregunta = archived_question_totals(db)
     
     # Categorías más difíciles (con mayor tasa de error)
-    categorias_query = db.query(Question.categoria).filter(Question.is_active == True).distinct().all()
+    categorias_query = db.query(Question.categoria_id).filter(Question.is_active == True).distinct().all()
     categorias_dificiles: list[dict[str, Any]] = []
     
-    for (cat,) in categorias_query:
-        preguntas_cat = db.query(Question.id).filter(Question.categoria == cat, Question.is_active == True).all()
+    for (cat_id,) in categorias_query:
+        cat = categories.name_of(cat_id)
+        preguntas_cat = db.query(Question.id).filter(Question.categoria_id == cat_id, Question.is_active == True).all()
         preguntas_ids = [p[0] for p in preguntas_cat]
         
         if preguntas_ids:
             answers_cat = db.query(Answer).filter(Answer.question_id.in_(preguntas_ids)).all()
             total_resp = len(answers_cat)
             correctas = sum(1 for a in answers_cat if cast(bool, a.es_correcta))
+            for qid in preguntas_ids:
+                arch_total, arch_correctas = archivadas_por_pregunta.get(qid, (0, 0))
+                total_resp += arch_total
+                correctas += arch_correctas
             tasa_error = ((total_resp - correctas) / total_resp * 100) if total_resp > 0 else 0
             categorias_dificiles.append({
                 "categoria": cat,
@@ -66,12 +87,17 @@ def statistics_global(db: Session = Depends(get_db)) -> dict[str, Any]:
         "total_preguntas_activas": total_preguntas,
         "total_sesiones_completadas": total_sesiones,
         "promedio_aciertos": round(float(promedio_aciertos), 2),
-        "categorias_dificiles": categorias_dificiles[:5]
+        "categorias_dificiles": categorias_dificiles[:5],
+        "tiempo_respuesta": response_times.summary(db, GLOBAL_KEY)
     }
 
 
 @router.get("/session/{session_id}")
-def statistics_session(session_id: int, db: Session = Depends(get_db)) -> dict[str, Any]:
+def statistics_session(
+    session_id: int,
+    db: Session = Depends(get_session_read_db),
+    archive_db: Session = Depends(get_archive_db)
+) -> dict[str, Any]:
     """
     Obtener estadísticas detalladas de una sesión específica.
     
@@ -82,10 +108,12 @@ def statistics_session(session_id: int, db: Session = Depends(get_db)) -> dict[s
     - Resumen detallado de cada respuesta (pregunta, opción seleccionada, si fue correcta)
     
     Útil para mostrar resultados finales después de completar un quiz.
+    Si la sesión ya fue archivada, se lee de la base de datos de archivo.
     
     Args:
         session_id: ID de la sesión
         db: Sesión de base de datos
+        archive_db: Sesión de la base de datos de archivo
         
     Returns:
         dict: Diccionario con estadísticas completas de la sesión
@@ -93,12 +121,14 @@ def statistics_session(session_id: int, db: Session = Depends(get_db)) -> dict[s
     Raises:
         HTTPException: Si la sesión no existe (404)
     """
-    session = db.query(QuizSession).filter(QuizSession.id == session_id).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Sesión no encontrada")
-    
-    # Obtener respuestas
-    answers = db.query(Answer).filter(Answer.quiz_session_id == session_id).all()
+    session: Any = db.query(QuizSession).filter(QuizSession.id == session_id).first()
+    if session:
+        answers: list[Any] = db.query(Answer).filter(Answer.quiz_session_id == session_id).all()
+    else:
+        session = find_archived_session(archive_db, session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Sesión no encontrada")
+        answers = list(session.answers)
     
     # Calcular estadísticas
     total_respondidas = len(answers)
@@ -137,7 +167,7 @@ def statistics_session(session_id: int, db: Session = Depends(get_db)) -> dict[s
 
 @router.get("/questions/difficult")
 def statistics_difficult_questions(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(10, ge=1, le=50)
 ) -> list[dict[str, Any]]:
     """
@@ -156,13 +186,15 @@ def statistics_difficult_questions(
         List[dict]: Lista de preguntas con sus tasas de error
     """
     preguntas = db.query(Question).filter(Question.is_active == True).all()
+    archivadas_por_pregunta = archived_question_totals(db)
     
     preguntas_dificiles: list[dict[str, Any]] = []
     for q in preguntas:
         answers = db.query(Answer).filter(Answer.question_id == q.id).all()
-        if answers:
-            total = len(answers)
-            incorrectas = sum(1 for a in answers if not cast(bool, a.es_correcta))
+        arch_total, arch_correctas = archivadas_por_pregunta.get(cast(int, q.id), (0, 0))
+        if answers or arch_total:
+            total = len(answers) + arch_total
+            incorrectas = sum(1 for a in answers if not cast(bool, a.es_correcta)) + (arch_total - arch_correctas)
             tasa_error = (incorrectas / total * 100)
             preguntas_dificiles.append({
                 "question_id": q.id,
@@ -178,13 +210,91 @@ def statistics_difficult_questions(
     return preguntas_dificiles[:limit]
 
 
+@router.get("/questions/{question_id}")
+def statistics_question(question_id: int, db: Session = Depends(get_read_db)) -> dict[str, Any]:
+    """
+    Obtener las estadísticas de una pregunta.
+    
+    Además de aciertos y errores, cuántas veces se eligió cada opción y cuál
+    es el distractor (opción incorrecta) más elegido, y los percentiles
+    50/90/99 aproximados del tiempo de respuesta. Sale de los contadores por
+    opción y del sketch de tiempos, sin recorrer las respuestas; incluye las
+    archivadas.
+    
+    Args:
+        question_id: ID de la pregunta
+        db: Sesión de base de datos
+        
+    Returns:
+        dict: Totales de la pregunta, detalle por opción y distractor principal
+        
+    Raises:
+        HTTPException: Si la pregunta no existe (404)
+    """
+    stats = get_question_statistics(question_id, db)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Pregunta no encontrada")
+    stats["tiempo_respuesta"] = response_times.summary(db, question_key(question_id))
+    return stats
+
+
+@router.get("/questions/{question_id}/analysis")
+def statistics_question_analysis(question_id: int, db: Session = Depends(get_read_db)) -> dict[str, Any]:
+    """
+    Obtener el análisis de ítem de una pregunta.
+    
+    Retorna, sobre todas las respuestas (incluidas las archivadas):
+    - Índice de discriminación: aciertos del 27% de sesiones con mejor puntaje
+      menos los del 27% con peor puntaje (cerca de 0 o negativo: la pregunta
+      no separa a quienes saben de quienes no)
+    - Correlación biserial puntual con el puntaje del resto de la sesión
+    - Cuántas veces se eligió cada opción (distractores)
+    - Percentiles 50/90/99 del tiempo de respuesta
+    
+    El análisis se calcula para todas las preguntas a la vez, en segundo
+    plano, y se reutiliza hasta que cambian los datos (ver `calculado_at`).
+    Requiere numpy.
+    
+    Args:
+        question_id: ID de la pregunta
+        db: Sesión de base de datos
+        
+    Returns:
+        dict: Métricas de la pregunta y datos del cálculo
+        
+    Raises:
+        HTTPException: Si la pregunta no existe (404), si numpy no está
+                       instalado (501) o si el primer cálculo está en curso (503)
+    """
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Pregunta no encontrada")
+    if not analytics_service.available():
+        raise HTTPException(status_code=501, detail="El análisis de preguntas requiere numpy (pip install numpy)")
+    
+    snapshot = analytics_cache.get()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="El análisis se está calculando", headers={"Retry-After": "5"})
+    
+    return {
+        "pregunta": question.pregunta,
+        **snapshot.question(
+            question_id,
+            respuesta_correcta=cast(int, question.respuesta_correcta),
+            num_opciones=cast(int, question.num_opciones),
+        ),
+        "analisis": snapshot.summary(),
+    }
+
+
 @router.get("/categories")
-def statistics_by_categories(db: Session = Depends(get_db)) -> list[dict[str, Any]]:
+def statistics_by_categories(db: Session = Depends(get_read_db)) -> list[dict[str, Any]]:
     """
     Obtener rendimiento de los usuarios por categoría de pregunta.
     
     Retorna:
     - Para cada categoría: número de preguntas, total de respuestas, aciertos y promedio
+    - Tiempo de respuesta de cada categoría (promedio y percentiles 50/90/99 aproximados)
     - Ordenado de mayor a menor por promedio de aciertos
     
     Útil para identificar en qué temas los usuarios tienen mejor/peor rendimiento.
@@ -195,17 +305,24 @@ def statistics_by_categories(db: Session = Depends(get_db)) -> list[dict[str, An
     Returns:
         List[dict]: Lista de categorías con sus estadísticas de rendimiento
     """
-    categorias = db.query(Question.categoria).filter(Question.is_active == True).distinct().all()
+    categorias = db.query(Question.categoria_id).filter(Question.is_active == True).distinct().all()
+    archivadas_por_pregunta = archived_question_totals(db)
+    tiempos = response_times.get(db, [category_key(categoria_id) for (categoria_id,) in categorias])
     
     rendimiento: list[dict[str, Any]] = []
-    for (categoria,) in categorias:
-        preguntas = db.query(Question.id).filter(Question.categoria == categoria, Question.is_active == True).all()
+    for (categoria_id,) in categorias:
+        categoria = categories.name_of(categoria_id)
+        preguntas = db.query(Question.id).filter(Question.categoria_id == categoria_id, Question.is_active == True).all()
         preguntas_ids = [p[0] for p in preguntas]
         
         if preguntas_ids:
             answers = db.query(Answer).filter(Answer.question_id.in_(preguntas_ids)).all()
             total = len(answers)
             correctas = sum(1 for a in answers if cast(bool, a.es_correcta))
+            for qid in preguntas_ids:
+                arch_total, arch_correctas = archivadas_por_pregunta.get(qid, (0, 0))
+                total += arch_total
+                correctas += arch_correctas
             promedio_aciertos = (correctas / total * 100) if total > 0 else 0
             
             rendimiento.append({
@@ -213,8 +330,150 @@ def statistics_by_categories(db: Session = Depends(get_db)) -> list[dict[str, An
                 "num_preguntas": len(preguntas_ids),
                 "num_respuestas": total,
                 "aciertos": correctas,
-                "promedio_aciertos": round(float(promedio_aciertos), 2)
+                "promedio_aciertos": round(float(promedio_aciertos), 2),
+                "tiempo_respuesta": tiempos[category_key(categoria_id)].summary()
             })
     
     rendimiento.sort(key=lambda x: cast(float, x["promedio_aciertos"]), reverse=True)
     return rendimiento
+
+
+@router.get("/timeseries")
+def statistics_timeseries(
+    db: Session = Depends(get_read_db),
+    bucket: Literal["hour", "day"] = Query("hour"),
+    categoria: Optional[str] = Query(None),
+    desde: Optional[datetime] = Query(None),
+    hasta: Optional[datetime] = Query(None)
+) -> dict[str, Any]:
+    """
+    Obtener volumen de respuestas, tasa de acierto y tiempo promedio a lo largo del tiempo.
+    
+    Lee la tabla de agregados por hora/día que se actualiza al registrar cada
+    respuesta, así que el costo depende del número de intervalos y no del
+    número de respuestas. Solo se devuelven intervalos con respuestas.
+    
+    Args:
+        db: Sesión de base de datos
+        bucket: Tamaño del intervalo, "hour" o "day" (default: hour)
+        categoria: Filtrar por categoría (opcional)
+        desde: Inicio del rango (default: hace 24 horas o 30 días según bucket)
+        hasta: Fin del rango (default: ahora)
+        
+    Returns:
+        dict: Parámetros usados y la serie de puntos ordenada por fecha
+        
+    Raises:
+        HTTPException: Si la categoría no existe o el rango es inválido (400)
+    """
+    if categoria:
+        try:
+            categoria = canonical_category(categoria)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    default_desde, default_hasta = default_range(bucket)
+    desde = as_utc_naive(desde) if desde else default_desde
+    hasta = as_utc_naive(hasta) if hasta else default_hasta
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="desde debe ser anterior a hasta")
+    
+    return {
+        "bucket": bucket,
+        "categoria": categoria,
+        "desde": desde,
+        "hasta": hasta,
+        "serie": get_timeseries(db, bucket, desde, hasta, categoria)
+    }
+
+
+@router.get("/unique")
+def statistics_unique(
+    db: Session = Depends(get_read_db),
+    categoria: Optional[str] = Query(None),
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None)
+) -> dict[str, Any]:
+    """
+    Obtener cuántos usuarios y sesiones distintos jugaron, en total y por día.
+    
+    Los conteos son aproximados (HyperLogLog, ver services/cardinality_service.py):
+    el error estándar es ~1.6% (`error_estandar`), o sea que el 95% de las veces
+    el valor real está a menos de ~3.3% del estimado. Con una categoría se
+    cuentan los usuarios y sesiones que respondieron preguntas de esa categoría.
+    Los días son UTC.
+    
+    Args:
+        db: Sesión de base de datos
+        categoria: Filtrar por categoría (opcional)
+        desde: Primer día (default: hace 29 días)
+        hasta: Último día, inclusive (default: hoy)
+        
+    Returns:
+        dict: Parámetros usados, usuarios y sesiones distintos en todo el rango y por día
+        
+    Raises:
+        HTTPException: Si la categoría no existe o el rango es inválido (400)
+    """
+    categoria_id = ALL_CATEGORIES
+    if categoria:
+        try:
+            categoria = canonical_category(categoria)
+            categoria_id = categories.id_of(categoria)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    default_desde, default_hasta = default_days()
+    desde = desde or default_desde
+    hasta = hasta or default_hasta
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="desde debe ser anterior a hasta")
+    
+    conteos = unique_counts.query(db, desde, hasta, categoria_id)
+    return {
+        "categoria": categoria,
+        "desde": desde,
+        "hasta": hasta,
+        "usuarios_unicos": conteos["usuarios"],
+        "sesiones": conteos["sesiones"],
+        "error_estandar": round(STANDARD_ERROR, 4),
+        "por_dia": conteos["por_dia"]
+    }
+
+
+STREAM_DIFFICULT_LIMIT = 5
+
+
+def _dashboard_snapshot() -> dict[str, Any]:
+    # Se calcula contra la BD principal (a lo sumo una vez por ventana) para no
+    # depender del retraso de una réplica de lectura
+    db = SessionLocal()
+    try:
+        return {
+            "global": statistics_global(db),
+            "preguntas_dificiles": statistics_difficult_questions(db, limit=STREAM_DIFFICULT_LIMIT),
+            "categorias": statistics_by_categories(db),
+        }
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def statistics_stream() -> StreamingResponse:
+    """
+    Estadísticas en vivo (Server-Sent Events).
+
+    Al conectarse se recibe un evento `snapshot` con las mismas secciones que
+    `/global`, `/questions/difficult?limit=5` y `/categories`. Después llegan
+    eventos `delta` solo con lo que cambió, como máximo uno por ventana
+    (STATS_STREAM_WINDOW_SECONDS) y solo si hubo escrituras. Las estadísticas
+    se recalculan una vez por ventana sin importar cuántos clientes haya.
+
+    Returns:
+        StreamingResponse: Flujo text/event-stream
+    """
+    return StreamingResponse(
+        live_stats.subscribe(_dashboard_snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
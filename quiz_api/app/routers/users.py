@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Any, Literal, Optional
+from ..database import get_read_db, get_archive_db
+from ..schemas.quiz_session import QuizSessionRead
+from ..services.user_stats_service import normalize_user, get_user_stats, get_user_history, user_exists
+from ..profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def _user_key(nombre: str) -> str:
+    key = normalize_user(nombre)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return key
+
+
+@router.get("/{nombre}/history")
+def user_history(
+    nombre: str,
+    antes_de: Optional[int] = Query(None, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    estado: Optional[Literal["en_progreso", "completado", "abandonado"]] = Query(None),
+    db: Session = Depends(get_read_db),
+    archive_db: Session = Depends(get_archive_db)
+) -> dict[str, Any]:
+    """
+    Obtener las sesiones de un usuario, de la más nueva a la más vieja.
+
+    El nombre no distingue mayúsculas ni espacios de más. La paginación es por
+    id: para la página siguiente se manda `antes_de` con el valor de `siguiente`
+    de la respuesta anterior. Incluye las sesiones archivadas.
+
+    Args:
+        nombre: Nombre del usuario
+        antes_de: Devolver solo sesiones con id menor a este
+        limit: Número máximo de sesiones (1-100, default: 20)
+        estado: Filtrar por estado (opcional)
+        db: Sesión de base de datos
+        archive_db: Sesión de la base de datos de archivo
+
+    Returns:
+        dict: Sesiones de la página y `siguiente` (None si no hay más)
+
+    Raises:
+        HTTPException: Si el usuario no tiene sesiones (404)
+    """
+    key = _user_key(nombre)
+    sesiones, siguiente = get_user_history(db, archive_db, key, antes_de=antes_de, limit=limit, estado=estado)
+    if not sesiones and antes_de is None and estado is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return {
+        "sesiones": [QuizSessionRead.model_validate(s) for s in sesiones],
+        "siguiente": siguiente,
+    }
+
+
+@router.get("/{nombre}/stats")
+def user_stats(nombre: str, db: Session = Depends(get_read_db)) -> dict[str, Any]:
+    """
+    Obtener los totales de un usuario.
+
+    Incluye sesiones completadas, mejor puntuación, puntuación promedio,
+    porcentaje de aciertos y aciertos por categoría. Los totales se mantienen
+    al completar cada sesión, así que la consulta no depende de cuántas
+    sesiones haya.
+
+    Args:
+        nombre: Nombre del usuario
+        db: Sesión de base de datos
+
+    Returns:
+        dict: Totales del usuario
+
+    Raises:
+        HTTPException: Si el usuario no tiene sesiones (404)
+    """
+    key = _user_key(nombre)
+    stats = get_user_stats(db, key)
+    if stats is not None:
+        return stats
+    if not user_exists(db, key):
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    # Tiene sesiones pero ninguna completada
+    return {
+        "usuario_nombre": nombre,
+        "sesiones_completadas": 0,
+        "mejor_puntuacion": None,
+        "puntuacion_promedio": None,
+        "preguntas_respondidas": 0,
+        "preguntas_correctas": 0,
+        "porcentaje_aciertos": 0,
+        "ultima_sesion_at": None,
+        "por_categoria": [],
+    }
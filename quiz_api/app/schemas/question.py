@@ -1,5 +1,8 @@
+import json
+from typing import Iterable
 from pydantic import BaseModel, field_validator, ValidationInfo
 from datetime import datetime
+from ..models.question import Question
 from ..services.quiz_service import canonical_category, canonical_difficulty
 
 
@@ -62,3 +65,31 @@ class QuestionRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+def question_json(q: Question) -> str:
+    """Un elemento de questions_json (un objeto JSON, sin corchetes)"""
+    head = json.dumps({"id": q.id, "pregunta": q.pregunta}, ensure_ascii=False)
+    tail = json.dumps({
+        "respuesta_correcta": q.respuesta_correcta,
+        "explicacion": q.explicacion,
+        "categoria": q.categoria,
+        "dificultad": q.dificultad,
+        "created_at": q.created_at.isoformat() if q.created_at is not None else None,
+        "is_active": bool(q.is_active),
+    }, ensure_ascii=False)
+    return f'{head[:-1]},"opciones":{q.opciones_json},{tail[1:]}'
+
+
+def questions_json(questions: Iterable[Question]) -> bytes:
+    """
+    Serializar preguntas con el mismo formato que list[QuestionRead], pero sin
+    decodificar las opciones: el JSON guardado en la BD se copia tal cual.
+
+    Args:
+        questions: Preguntas cargadas de la BD
+
+    Returns:
+        Cuerpo JSON (UTF-8) listo para devolver
+    """
+    return ("[" + ",".join(question_json(q) for q in questions) + "]").encode("utf-8")
@@ -6,16 +6,27 @@ from typing import Any, cast
 if sys.platform == "win32":
     os.environ["PYTHONIOENCODING"] = "utf-8"
 
-from app.database import SessionLocal, Base, engine
+from app.database import SessionLocal, engine, archive_engine
 from app.models.question import Question
 from app.models.quiz_session import QuizSession
 from app.models.answer import Answer
+from app.models.user_stats import UserStats, UserCategoryStats
+from app.models.review_item import ReviewItem
+from app.models.option_stats import QuestionOptionStats
+from app.services.search_service import rebuild_search_index
+from app.services.schema_service import ensure_schema
+from app.services.timeseries_service import backfill_timeseries
+from app.services.user_stats_service import normalize_user, record_completion
+from app.services.review_service import record_review
+from app.services.option_stats_service import record_option_answer
+from app.services.response_time_service import rebuild_response_times
+from app.services.cardinality_service import rebuild_unique_counts
 from datetime import datetime, timedelta, timezone
 
 
 def seed_data(force: bool = False) -> None:
     # Carga datos de prueba en la BD
-    Base.metadata.create_all(bind=engine)
+    ensure_schema(engine, archive_engine)
 
     db = SessionLocal()
     try:
@@ -28,6 +39,10 @@ def seed_data(force: bool = False) -> None:
             print("[INFO] Force seed enabled: limpiando tablas...")
             db.query(Answer).delete()
             db.query(QuizSession).delete()
+            db.query(UserCategoryStats).delete()
+            db.query(UserStats).delete()
+            db.query(ReviewItem).delete()
+            db.query(QuestionOptionStats).delete()
             db.query(Question).delete()
             db.commit()
 
@@ -229,6 +244,7 @@ def seed_data(force: bool = False) -> None:
         for s_data in sesiones:
             session = QuizSession(
                 usuario_nombre=s_data["usuario_nombre"],
+                usuario_key=normalize_user(s_data["usuario_nombre"]),
                 fecha_inicio=s_data["fecha_inicio"],
                 fecha_fin=s_data["fecha_fin"],
                 estado="completado"
@@ -254,11 +270,17 @@ def seed_data(force: bool = False) -> None:
                 answer = Answer(
                     quiz_session_id=session.id,
                     question_id=question.id,
+                    categoria_id=question.categoria_id,
                     respuesta_seleccionada=respuesta,
                     es_correcta=es_correcta,
                     tiempo_respuesta_segundos=tiempo_respuesta,
                 )
                 db.add(answer)
+                record_option_answer(db, cast(int, question.id), respuesta, es_correcta)
+                record_review(
+                    db, cast(str, session.usuario_key), cast(int, question.id), es_correcta,
+                    tiempo_respuesta, datetime.now(timezone.utc),
+                )
 
             preguntas_respondidas: int = len([q for q in s_data["preguntas"] if 0 <= q < len(questions_db)])
             puntuacion: int = (correctas * 100 // preguntas_respondidas) if preguntas_respondidas > 0 else 0
@@ -269,8 +291,14 @@ def seed_data(force: bool = False) -> None:
             session.tiempo_total_segundos = tiempo_total  # type: ignore
 
             db.add(session)
+            db.flush()
+            record_completion(db, None, session)
 
         db.commit()
+        rebuild_search_index(db)
+        backfill_timeseries(db)
+        rebuild_response_times(db)
+        rebuild_unique_counts(db)
         print(f"✓ Datos cargados: {len(preguntas)} preguntas, {len(sesiones)} sesiones")
     except Exception as exc:
         db.rollback()
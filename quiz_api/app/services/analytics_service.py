@@ -0,0 +1,350 @@
+"""
+Análisis de ítems sobre todas las respuestas (principal y archivo), con NumPy
+
+Las columnas de answers se cargan por lotes en arrays y las métricas salen de
+agrupaciones vectorizadas (bincount por pregunta, lexsort para los percentiles),
+sin recorrer las respuestas una por una en Python:
+
+- discriminación: entre quienes respondieron la pregunta, proporción de
+  aciertos del 27% con mejor puntaje en el resto de la sesión menos la del
+  27% con peor (sin contar la pregunta misma: los quizzes son cortos)
+- correlación biserial puntual entre acertar la pregunta y el puntaje del resto
+  de la sesión
+- cuántas veces se eligió cada opción (los distractores son las incorrectas)
+- percentiles 50/90/99 del tiempo de respuesta
+
+NumPy es opcional (`pip install numpy`): sin él el análisis no está disponible.
+El resultado se guarda como un snapshot con la versión de los datos que usó; se
+sirve ese snapshot y se recalcula en segundo plano cuando cambiaron los datos y
+pasaron ANALYTICS_REFRESH_SECONDS.
+"""
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from itertools import chain
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from ..database import read_engine, archive_engine
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # numpy es opcional
+    np = None
+
+
+ANALYTICS_CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", "50000"))
+# Un snapshot más nuevo que esto se sirve aunque hayan llegado respuestas nuevas
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))
+
+# Grupos alto y bajo para el índice de discriminación (Kelley)
+GROUP_FRACTION = 0.27
+# Sesiones con menos respuestas no tienen un puntaje útil para comparar
+MIN_SESSION_ANSWERS = 2
+MAX_OPTIONS = 5
+PERCENTILES = (50, 90, 99)
+
+# Columnas: quiz_session_id, question_id, respuesta_seleccionada, es_correcta, tiempo (-1 si falta)
+_SELECT = text(
+    "SELECT id, quiz_session_id, question_id, respuesta_seleccionada, "
+    "CASE WHEN es_correcta THEN 1 ELSE 0 END, COALESCE(tiempo_respuesta_segundos, -1) "
+    "FROM answers WHERE id > :ultimo_id ORDER BY id LIMIT :limite"
+)
+_VERSION = text("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM answers")
+
+
+def available() -> bool:
+    return np is not None
+
+
+def data_version(engines: list[Engine]) -> tuple[int, ...]:
+    """(cantidad, id máximo) de answers en cada BD: cambia con cada respuesta nueva, archivada o borrada"""
+    version: list[int] = []
+    for engine in engines:
+        with engine.connect() as conn:
+            count, max_id = conn.execute(_VERSION).one()
+        version += [int(count), int(max_id)]
+    return tuple(version)
+
+
+def load_answers(engines: list[Engine], chunk_size: int = ANALYTICS_CHUNK_SIZE) -> "np.ndarray":
+    """
+    Cargar las respuestas de todas las BD en un array (n, 5) de int32.
+
+    Se lee por lotes de `chunk_size` filas (paginando por id), cada uno en su
+    propia conexión corta, así que no bloquea a las escrituras.
+    """
+    chunks = []
+    for engine in engines:
+        ultimo_id = 0
+        while True:
+            with engine.connect() as conn:
+                # Tuplas directo del cursor DBAPI, sin armar un Row por fila
+                rows = conn.execute(_SELECT, {"ultimo_id": ultimo_id, "limite": chunk_size}).cursor.fetchall()
+            if not rows:
+                break
+            # fromiter sobre los valores aplanados es mucho más rápido que np.array(rows)
+            chunk = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * 6).reshape(-1, 6)
+            ultimo_id = int(chunk[-1, 0])
+            chunks.append(chunk[:, 1:].astype(np.int32))
+            if len(rows) < chunk_size:
+                break
+    if not chunks:
+        return np.empty((0, 5), dtype=np.int32)
+    return np.concatenate(chunks)
+
+
+def _ratio(num: "np.ndarray", den: "np.ndarray") -> "np.ndarray":
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / np.where(den > 0, den, 1), np.nan)
+
+
+@dataclass
+class AnalyticsSnapshot:
+    """Métricas de todas las preguntas calculadas sobre una versión de los datos"""
+    version: tuple[int, ...]
+    calculado_at: datetime
+    duracion_ms: float
+    num_respuestas: int
+    num_sesiones: int
+    question_ids: "np.ndarray"
+    respuestas: "np.ndarray"
+    aciertos: "np.ndarray"
+    discriminacion: "np.ndarray"
+    biserial: "np.ndarray"
+    opciones: "np.ndarray"          # (preguntas, MAX_OPTIONS)
+    con_tiempo: "np.ndarray"
+    tiempo_promedio: "np.ndarray"
+    tiempo_percentiles: "np.ndarray"  # (preguntas, len(PERCENTILES))
+
+    def _index(self, question_id: int) -> Optional[int]:
+        i = int(np.searchsorted(self.question_ids, question_id))
+        if i < len(self.question_ids) and self.question_ids[i] == question_id:
+            return i
+        return None
+
+    def question(self, question_id: int, respuesta_correcta: Optional[int] = None,
+                 num_opciones: int = MAX_OPTIONS) -> dict[str, Any]:
+        """Métricas de una pregunta (con ceros si nadie la respondió)"""
+        i = self._index(question_id)
+        respuestas = int(self.respuestas[i]) if i is not None else 0
+        aciertos = int(self.aciertos[i]) if i is not None else 0
+        counts = [int(c) for c in self.opciones[i][:num_opciones]] if i is not None else [0] * num_opciones
+        # Sobre las opciones incorrectas elegidas, no sobre es_correcta: si se
+        # cambió la respuesta correcta de la pregunta, las dos cosas no coinciden
+        incorrectas = sum(c for opcion, c in enumerate(counts) if opcion != respuesta_correcta)
+
+        def number(value: float, digits: int = 3) -> Optional[float]:
+            return None if math.isnan(value) else round(float(value), digits)
+
+        return {
+            "question_id": question_id,
+            "respuestas": respuestas,
+            "aciertos": aciertos,
+            "tasa_acierto": round(aciertos / respuestas * 100, 2) if respuestas else None,
+            "discriminacion": number(self.discriminacion[i]) if i is not None else None,
+            "correlacion_biserial": number(self.biserial[i]) if i is not None else None,
+            "opciones": [
+                {
+                    "opcion": opcion,
+                    "veces": veces,
+                    "porcentaje": round(veces / respuestas * 100, 2) if respuestas else 0,
+                    "es_correcta": opcion == respuesta_correcta,
+                    # Entre las respuestas incorrectas, qué parte se llevó este distractor
+                    "porcentaje_de_errores": (
+                        round(veces / incorrectas * 100, 2) if incorrectas and opcion != respuesta_correcta else None
+                    ),
+                }
+                for opcion, veces in enumerate(counts)
+            ],
+            "tiempo_respuesta": {
+                "respuestas_con_tiempo": int(self.con_tiempo[i]) if i is not None else 0,
+                "promedio": number(self.tiempo_promedio[i], 2) if i is not None else None,
+                **{
+                    f"p{p}": number(self.tiempo_percentiles[i][k], 2) if i is not None else None
+                    for k, p in enumerate(PERCENTILES)
+                },
+            },
+        }
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "calculado_at": self.calculado_at.isoformat(),
+            "duracion_ms": self.duracion_ms,
+            "respuestas_analizadas": self.num_respuestas,
+            "sesiones_analizadas": self.num_sesiones,
+        }
+
+
+def analyze(answers: "np.ndarray", version: tuple[int, ...] = ()) -> AnalyticsSnapshot:
+    """
+    Calcular las métricas de todas las preguntas.
+
+    Args:
+        answers: Array (n, 5) de load_answers
+        version: Versión de los datos (ver data_version)
+
+    Returns:
+        AnalyticsSnapshot con un valor por pregunta respondida (NaN donde no alcanza)
+    """
+    start = time.perf_counter()
+    session_col, question_col, option_col, correct_col, time_col = answers.T
+    question_ids, q = np.unique(question_col, return_inverse=True)
+    _, s = np.unique(session_col, return_inverse=True)
+    nq = len(question_ids)
+    correct = correct_col.astype(np.float64)
+
+    respuestas = np.bincount(q, minlength=nq)
+    aciertos = np.bincount(q, weights=correct, minlength=nq)
+
+    # Opciones elegidas: una celda por (pregunta, opción)
+    valid = (option_col >= 0) & (option_col < MAX_OPTIONS)
+    opciones = np.bincount(
+        q[valid] * MAX_OPTIONS + option_col[valid], minlength=nq * MAX_OPTIONS
+    ).reshape(nq, MAX_OPTIONS)
+
+    # Puntaje de cada sesión y, para cada respuesta, el del resto de la sesión
+    session_n = np.bincount(s)
+    session_correct = np.bincount(s, weights=correct)
+    num_sesiones = int(np.count_nonzero(session_n >= MIN_SESSION_ANSWERS))
+    n_row = session_n[s]
+    rows = n_row >= MIN_SESSION_ANSWERS
+    x = correct[rows]
+    y = (session_correct[s][rows] - x) / (n_row[rows] - 1)
+    qr = q[rows]
+
+    # Discriminación: se ordena por (pregunta, puntaje del resto) y dentro del
+    # tramo de cada pregunta se toman las primeras y las últimas posiciones
+    order = np.lexsort((y, qr))
+    sorted_q = qr[order]
+    sorted_x = x[order]
+    n_q = np.bincount(qr, minlength=nq)
+    rank = np.arange(len(sorted_q)) - np.searchsorted(sorted_q, np.arange(nq))[sorted_q]
+    k = np.ceil(GROUP_FRACTION * n_q).astype(np.int64)[sorted_q]
+
+    def group_rate(in_group: "np.ndarray") -> "np.ndarray":
+        return _ratio(
+            np.bincount(sorted_q[in_group], weights=sorted_x[in_group], minlength=nq),
+            np.bincount(sorted_q[in_group], minlength=nq),
+        )
+
+    discriminacion = group_rate(rank >= n_q[sorted_q] - k) - group_rate(rank < k)
+    discriminacion[n_q < 2] = np.nan
+
+    # Biserial puntual: x = acierto, y = puntaje del resto de la sesión
+    n = n_q.astype(np.float64)
+    sx = np.bincount(qr, weights=x, minlength=nq)
+    sy = np.bincount(qr, weights=y, minlength=nq)
+    sxy = np.bincount(qr, weights=x * y, minlength=nq)
+    syy = np.bincount(qr, weights=y * y, minlength=nq)
+    with np.errstate(invalid="ignore"):
+        # x es 0/1, así que la suma de x² es la suma de x
+        den = np.sqrt((n * sx - sx * sx) * (n * syy - sy * sy))
+    biserial = _ratio(n * sxy - sx * sy, den)
+
+    # Percentiles de tiempo: se ordena por (pregunta, tiempo) y se toma la
+    # posición de cada percentil dentro del tramo de cada pregunta
+    timed = time_col >= 0
+    tq = q[timed]
+    order = np.lexsort((time_col[timed], tq))
+    sorted_q = tq[order]
+    sorted_t = time_col[timed][order].astype(np.float64)
+    con_tiempo = np.bincount(sorted_q, minlength=nq)
+    starts = np.searchsorted(sorted_q, np.arange(nq))
+    tiempo_promedio = _ratio(np.bincount(sorted_q, weights=sorted_t, minlength=nq), con_tiempo)
+    percentiles = np.full((nq, len(PERCENTILES)), np.nan)
+    has_time = con_tiempo > 0
+    for col, p in enumerate(PERCENTILES):
+        pos = starts + np.ceil(p / 100 * con_tiempo).astype(np.int64) - 1  # nearest-rank
+        percentiles[has_time, col] = sorted_t[pos[has_time]]
+
+    return AnalyticsSnapshot(
+        version=version,
+        calculado_at=datetime.now(timezone.utc),
+        duracion_ms=round((time.perf_counter() - start) * 1000, 2),
+        num_respuestas=len(answers),
+        num_sesiones=num_sesiones,
+        question_ids=question_ids,
+        respuestas=respuestas,
+        aciertos=aciertos.astype(np.int64),
+        discriminacion=discriminacion,
+        biserial=biserial,
+        opciones=opciones,
+        con_tiempo=con_tiempo,
+        tiempo_promedio=tiempo_promedio,
+        tiempo_percentiles=percentiles,
+    )
+
+
+def compute_snapshot(engines: list[Engine], chunk_size: int = ANALYTICS_CHUNK_SIZE) -> AnalyticsSnapshot:
+    """Cargar las respuestas de `engines` y analizarlas"""
+    start = time.perf_counter()
+    version = data_version(engines)
+    snapshot = analyze(load_answers(engines, chunk_size), version)
+    snapshot.duracion_ms = round((time.perf_counter() - start) * 1000, 2)
+    return snapshot
+
+
+class AnalyticsCache:
+    """
+    El último snapshot calculado en este proceso.
+
+    `get` nunca calcula en el request: si no hay snapshot o está viejo, lanza
+    el cálculo en un hilo y devuelve lo que haya (None la primera vez).
+    """
+
+    def __init__(self, engines: list[Engine], refresh_seconds: float = ANALYTICS_REFRESH_SECONDS) -> None:
+        self.engines = engines
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[AnalyticsSnapshot] = None
+        self._computed_at = 0.0
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Cambios que no alteran la versión (una respuesta corregida)
+        self._stale = False
+        self.error: Optional[str] = None
+
+    def _compute(self) -> None:
+        try:
+            snapshot = compute_snapshot(self.engines)
+            with self._lock:
+                self._snapshot = snapshot
+                self.error = None
+        except Exception as exc:
+            self.error = str(exc)
+            print(f"[WARN] No se pudo calcular el análisis de respuestas: {exc}")
+        finally:
+            with self._lock:
+                self._computed_at = time.monotonic()
+                self._worker = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._compute, name="analytics", daemon=True)
+            self._worker.start()
+
+    def get(self) -> Optional[AnalyticsSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is None or self._stale:
+            self._stale = False
+            self._start()
+        elif time.monotonic() - self._computed_at >= self.refresh_seconds:
+            with self._lock:
+                self._computed_at = time.monotonic()  # una verificación por intervalo
+            if data_version(self.engines) != snapshot.version:
+                self._start()
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Recalcular en la próxima consulta (por ejemplo, tras corregir una respuesta)"""
+        self._stale = True
+
+
+# La BD principal se lee por la réplica (o la conexión solo lectura)
+analytics_cache = AnalyticsCache([read_engine, archive_engine])
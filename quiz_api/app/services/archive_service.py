@@ -0,0 +1,158 @@
+"""
+Archivo de sesiones viejas (hot/cold) y limpieza de sesiones abandonadas
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from ..models.answer import Answer
+from ..models.quiz_session import QuizSession
+from ..models.archive import ArchivedAnswer, ArchivedQuizSession, ArchivedQuestionStats, ArchivedSessionStats
+
+
+ARCHIVABLE_STATES = ("completado", "abandonado")
+
+_SESSION_COLUMNS = (
+    "id", "usuario_nombre", "usuario_key", "fecha_inicio", "fecha_fin", "puntuacion_total", "preguntas_respondidas",
+    "preguntas_correctas", "estado", "tiempo_total_segundos", "created_at",
+)
+_ANSWER_COLUMNS = (
+    "id", "quiz_session_id", "question_id", "respuesta_seleccionada", "es_correcta",
+    "tiempo_respuesta_segundos", "created_at",
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def reap_stale_sessions(db: Session, older_than: timedelta, batch_size: int = 1000) -> int:
+    """
+    Marcar como 'abandonado' las sesiones en progreso sin actividad reciente.
+
+    Args:
+        db: Sesión de base de datos
+        older_than: Antigüedad mínima (desde created_at) para considerar la sesión abandonada
+        batch_size: Sesiones actualizadas por transacción
+
+    Returns:
+        Número de sesiones marcadas
+    """
+    cutoff = _utcnow() - older_than
+    total = 0
+    while True:
+        ids = [row[0] for row in db.query(QuizSession.id).filter(
+            QuizSession.estado == "en_progreso",
+            QuizSession.created_at < cutoff
+        ).order_by(QuizSession.id).limit(batch_size).all()]
+        if not ids:
+            break
+        db.query(QuizSession).filter(QuizSession.id.in_(ids)).update(
+            {QuizSession.estado: "abandonado", QuizSession.fecha_fin: _utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        total += len(ids)
+    return total
+
+
+def _add_rollups(db: Session, sessions: list[QuizSession], answers: list[Answer]) -> None:
+    per_question: dict[int, list[int]] = {}
+    for a in answers:
+        acc = per_question.setdefault(int(a.question_id), [0, 0])  # type: ignore
+        acc[0] += 1
+        acc[1] += 1 if a.es_correcta else 0
+    for question_id, (total, correctas) in per_question.items():
+        row = db.get(ArchivedQuestionStats, question_id)
+        if row is None:
+            db.add(ArchivedQuestionStats(question_id=question_id, num_respuestas=total, num_correctas=correctas))
+        else:
+            row.num_respuestas += total  # type: ignore
+            row.num_correctas += correctas  # type: ignore
+
+    completed = [s for s in sessions if s.estado == "completado"]
+    if completed:
+        row = db.get(ArchivedSessionStats, 1)
+        if row is None:
+            row = ArchivedSessionStats(id=1, num_sesiones_completadas=0, suma_puntuacion=0)
+            db.add(row)
+        row.num_sesiones_completadas += len(completed)  # type: ignore
+        row.suma_puntuacion += sum(int(s.puntuacion_total or 0) for s in completed)  # type: ignore
+
+
+def archive_sessions(
+    db: Session,
+    archive_db: Session,
+    older_than: timedelta,
+    batch_size: int = 500,
+    max_batches: Optional[int] = None,
+) -> dict[str, int]:
+    """
+    Mover sesiones terminadas (completadas o abandonadas) más viejas que older_than,
+    junto con sus respuestas, a la base de datos de archivo.
+
+    Cada lote se copia primero al archivo (con merge, así que repetirlo es seguro) y
+    después se borra de la BD principal en la misma transacción que actualiza los
+    totales archivados, para que las estadísticas sigan siendo correctas.
+
+    Returns:
+        Diccionario con el número de sesiones y respuestas archivadas
+    """
+    cutoff = _utcnow() - older_than
+    archived_sessions = 0
+    archived_answers = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        sessions = db.query(QuizSession).filter(
+            QuizSession.estado.in_(ARCHIVABLE_STATES),
+            or_(
+                QuizSession.fecha_fin < cutoff,
+                and_(QuizSession.fecha_fin == None, QuizSession.created_at < cutoff)
+            )
+        ).order_by(QuizSession.id).limit(batch_size).all()
+        if not sessions:
+            break
+        ids = [int(s.id) for s in sessions]  # type: ignore
+        answers = db.query(Answer).filter(Answer.quiz_session_id.in_(ids)).all()
+
+        now = _utcnow()
+        for s in sessions:
+            archive_db.merge(ArchivedQuizSession(archived_at=now, **{c: getattr(s, c) for c in _SESSION_COLUMNS}))
+        archive_db.flush()
+        for a in answers:
+            archive_db.merge(ArchivedAnswer(**{c: getattr(a, c) for c in _ANSWER_COLUMNS}))
+        archive_db.commit()
+
+        _add_rollups(db, sessions, answers)
+        db.query(Answer).filter(Answer.quiz_session_id.in_(ids)).delete(synchronize_session=False)
+        db.query(QuizSession).filter(QuizSession.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+
+        archived_sessions += len(sessions)
+        archived_answers += len(answers)
+        batches += 1
+    return {"sesiones": archived_sessions, "respuestas": archived_answers}
+
+
+def find_archived_session(archive_db: Session, session_id: int) -> Optional[ArchivedQuizSession]:
+    return archive_db.query(ArchivedQuizSession).filter(ArchivedQuizSession.id == session_id).first()
+
+
+def archived_question_totals(db: Session, question_ids: Optional[list[int]] = None) -> dict[int, tuple[int, int]]:
+    """Respuestas archivadas por pregunta: {question_id: (total, correctas)}"""
+    query = db.query(ArchivedQuestionStats)
+    if question_ids is not None:
+        query = query.filter(ArchivedQuestionStats.question_id.in_(question_ids))
+    return {
+        int(r.question_id): (int(r.num_respuestas), int(r.num_correctas))  # type: ignore
+        for r in query.all()
+    }
+
+
+def archived_session_totals(db: Session) -> dict[str, Any]:
+    row = db.get(ArchivedSessionStats, 1)
+    return {
+        "num_sesiones_completadas": int(row.num_sesiones_completadas) if row else 0,  # type: ignore
+        "suma_puntuacion": int(row.suma_puntuacion) if row else 0,  # type: ignore
+    }
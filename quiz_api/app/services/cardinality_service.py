@@ -0,0 +1,332 @@
+"""
+Usuarios y sesiones distintos por día y categoría (HyperLogLog)
+
+Contar jugadores únicos en un rango con COUNT(DISTINCT) recorre todas las
+sesiones y respuestas del rango. En cambio cada (métrica, día, categoría)
+tiene un HyperLogLog: 2^12 registros de un byte donde cada valor visto deja
+la cantidad de ceros iniciales de su hash. La estimación tiene un error
+estándar de 1.04 / √4096 ≈ 1.6% con cualquier cantidad de valores, y dos HLL
+se combinan con el máximo registro a registro, así que un rango de días es la
+combinación de sus días. La categoría 0 junta todas.
+
+Como en los tiempos de respuesta (response_time_service), cada worker junta en
+memoria lo que vio después de cada commit y lo combina con la fila de la BD
+cada UNIQUE_COUNT_FLUSH_SECONDS. Combinar es idempotente: volver a sumar un
+valor ya contado no cambia nada. Lo que no se puede es descontar, así que las
+sesiones borradas siguen contando.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+from sqlalchemy import literal
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.answer import Answer
+from ..models.archive import ArchivedAnswer, ArchivedQuizSession
+from ..models.question import Question
+from ..models.quiz_session import QuizSession
+from ..models.unique_count import UniqueCountSketch
+from .timeseries_service import as_utc_naive
+
+
+# Cada cuánto se combinan con la BD los valores vistos por este proceso
+UNIQUE_COUNT_FLUSH_SECONDS = float(os.getenv("UNIQUE_COUNT_FLUSH_SECONDS", "10"))
+
+# Cambiarla invalida los sketches guardados: hay que reconstruirlos (rebuild_unique_counts)
+PRECISION = 12
+NUM_REGISTERS = 1 << PRECISION
+STANDARD_ERROR = 1.04 / NUM_REGISTERS ** 0.5
+ALL_CATEGORIES = 0
+
+_HASH_BITS = 64
+_ALPHA = 0.7213 / (1 + 1.079 / NUM_REGISTERS)
+_INVERSE_POWERS = [2.0 ** -k for k in range(_HASH_BITS + 1)]
+
+
+class HyperLogLog:
+    """Registros de un HLL (un byte cada uno)"""
+
+    def __init__(self, registers: Optional[bytes] = None) -> None:
+        self.registers = bytearray(registers) if registers else bytearray(NUM_REGISTERS)
+
+    def add(self, value: str) -> None:
+        # Hash estable entre procesos (hash() de Python cambia con cada arranque)
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = h >> (_HASH_BITS - PRECISION)
+        rest = h & ((1 << (_HASH_BITS - PRECISION)) - 1)
+        rank = _HASH_BITS - PRECISION - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        """Cantidad aproximada de valores distintos"""
+        raw = _ALPHA * NUM_REGISTERS ** 2 / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * NUM_REGISTERS and zeros:
+            # Pocos valores: conteo lineal sobre los registros vacíos
+            return round(NUM_REGISTERS * math.log(NUM_REGISTERS / zeros))
+        return round(raw)
+
+    def to_blob(self) -> bytes:
+        # Con pocos valores casi todos los registros son 0 y se comprimen a unos pocos bytes
+        return zlib.compress(bytes(self.registers), 1)
+
+    @classmethod
+    def from_blob(cls, blob: Optional[bytes]) -> "HyperLogLog":
+        return cls(zlib.decompress(blob) if blob else None)
+
+
+SketchKey = tuple[str, date, int]
+
+
+def _day(ts: datetime) -> date:
+    return as_utc_naive(ts).date()
+
+
+def _session_values(session_id: int, usuario_key: Optional[str]) -> list[tuple[str, str]]:
+    values = [("sesiones", str(session_id))]
+    if usuario_key:
+        values.append(("usuarios", usuario_key))
+    return values
+
+
+def _record(
+    target: dict[SketchKey, HyperLogLog],
+    values: list[tuple[str, str]],
+    ts: datetime,
+    categoria_ids: tuple[int, ...],
+) -> None:
+    dia = _day(ts)
+    for metrica, value in values:
+        for categoria_id in categoria_ids:
+            key = (metrica, dia, categoria_id)
+            hll = target.get(key)
+            if hll is None:
+                hll = target[key] = HyperLogLog()
+            hll.add(value)
+
+
+def _merge_row(db: Session, key: SketchKey, hll: HyperLogLog) -> None:
+    metrica, dia, categoria_id = key
+    ids = {"metrica": metrica, "dia": dia, "categoria_id": categoria_id}
+    if db.get_bind().dialect.name == "sqlite":
+        # Crear la fila primero toma el lock de escritura: nadie más puede combinar
+        # la misma fila entre la lectura y la escritura de abajo
+        from sqlalchemy.dialects.sqlite import insert
+        db.execute(insert(UniqueCountSketch).values(**ids, registros=b"").on_conflict_do_nothing())
+    row = db.query(UniqueCountSketch).filter_by(**ids).with_for_update().first()
+    if row is None:
+        db.add(UniqueCountSketch(**ids, registros=hll.to_blob()))
+        return
+    stored = HyperLogLog.from_blob(row.registros)  # type: ignore
+    stored.merge(hll)
+    row.registros = stored.to_blob()  # type: ignore
+
+
+class UniqueCounts:
+    """HLL de este proceso que todavía no se combinaron con la BD"""
+
+    def __init__(self, flush_interval: float = UNIQUE_COUNT_FLUSH_SECONDS) -> None:
+        self.flush_interval = flush_interval
+        self._pending: dict[SketchKey, HyperLogLog] = {}
+        # Lo que se está escribiendo: sigue contando al leer hasta que termina el commit
+        self._flushing: dict[SketchKey, HyperLogLog] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self.flushes = 0
+
+    def record_session(self, session_id: int, usuario_key: Optional[str], ts: datetime) -> None:
+        """Contar una sesión nueva (y su usuario) en el día, para todas las categorías"""
+        with self._lock:
+            _record(self._pending, _session_values(session_id, usuario_key), ts, (ALL_CATEGORIES,))
+
+    def record_answer(self, session_id: int, usuario_key: Optional[str], categoria_id: int, ts: datetime) -> None:
+        """Contar la sesión y el usuario de una respuesta en la categoría de la pregunta"""
+        with self._lock:
+            _record(self._pending, _session_values(session_id, usuario_key), ts, (categoria_id, ALL_CATEGORIES))
+
+    def flush(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """
+        Combinar lo pendiente con la BD, en una transacción.
+
+        Returns:
+            Cantidad de sketches escritos
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return 0
+            try:
+                with session_factory() as db:
+                    for key, hll in pending.items():
+                        _merge_row(db, key, hll)
+                    db.commit()
+            except Exception:
+                # Vuelve a quedar pendiente para el próximo intento
+                with self._lock:
+                    self._flushing = {}
+                    for key, hll in pending.items():
+                        self._pending.setdefault(key, HyperLogLog()).merge(hll)
+                raise
+            with self._lock:
+                self._flushing = {}
+                self.flushes += 1
+            return len(pending)
+
+    def _safe_flush(self) -> None:
+        try:
+            self.flush()
+        except Exception as exc:
+            print(f"[WARN] No se pudieron guardar los conteos de únicos: {exc}")
+
+    def start_flush(self) -> None:
+        """Combinar lo pendiente cada UNIQUE_COUNT_FLUSH_SECONDS en segundo plano"""
+        if self.flush_interval <= 0 or self._flusher is not None:
+            return
+
+        def run() -> None:
+            while True:
+                time.sleep(self.flush_interval)
+                self._safe_flush()
+
+        self._flusher = threading.Thread(target=run, name="unique-counts-flush", daemon=True)
+        self._flusher.start()
+
+    def close(self) -> None:
+        """Combinar lo pendiente al apagar el proceso"""
+        self._safe_flush()
+
+    def query(self, db: Session, desde: date, hasta: date, categoria_id: int = ALL_CATEGORIES) -> dict[str, Any]:
+        """
+        Usuarios y sesiones distintos entre dos días (inclusive), en total y por día.
+
+        Args:
+            db: Sesión de base de datos
+            desde: Primer día (UTC)
+            hasta: Último día (UTC)
+            categoria_id: Categoría, o ALL_CATEGORIES para todas
+
+        Returns:
+            {"usuarios": n, "sesiones": n, "por_dia": [{"dia", "usuarios", "sesiones"}, ...]}
+        """
+        per_day: dict[date, dict[str, HyperLogLog]] = {}
+
+        def merge(metrica: str, dia: date, hll: HyperLogLog) -> None:
+            current = per_day.setdefault(dia, {}).get(metrica)
+            if current is None:
+                per_day[dia][metrica] = HyperLogLog(hll.registers)
+            else:
+                current.merge(hll)
+
+        rows = db.query(UniqueCountSketch).filter(
+            UniqueCountSketch.categoria_id == categoria_id,
+            UniqueCountSketch.dia >= desde,
+            UniqueCountSketch.dia <= hasta,
+        ).all()
+        for row in rows:
+            merge(str(row.metrica), row.dia, HyperLogLog.from_blob(row.registros))  # type: ignore
+        with self._lock:
+            for local in (self._flushing, self._pending):
+                for (metrica, dia, cat), hll in local.items():
+                    if cat == categoria_id and desde <= dia <= hasta:
+                        merge(metrica, dia, hll)
+
+        totals: dict[str, HyperLogLog] = {}
+        por_dia = []
+        for dia in sorted(per_day):
+            entry: dict[str, Any] = {"dia": dia}
+            for metrica in ("usuarios", "sesiones"):
+                hll = per_day[dia].get(metrica)
+                entry[metrica] = hll.estimate() if hll is not None else 0
+                if hll is not None:
+                    totals.setdefault(metrica, HyperLogLog()).merge(hll)
+            por_dia.append(entry)
+        return {
+            "usuarios": totals["usuarios"].estimate() if "usuarios" in totals else 0,
+            "sesiones": totals["sesiones"].estimate() if "sesiones" in totals else 0,
+            "por_dia": por_dia,
+        }
+
+
+unique_counts = UniqueCounts()
+
+
+def rebuild_unique_counts(db: Session, archive_db: Optional[Session] = None, batch_size: int = 5000) -> int:
+    """
+    Recalcular todos los sketches a partir de las sesiones y respuestas (principal y archivo).
+
+    Recorre por lotes de ID y reemplaza la tabla unique_count_sketches en una
+    sola transacción, como backfill_timeseries.
+
+    Returns:
+        Número de sesiones y respuestas procesadas
+    """
+    question_categories = {int(qid): int(cid) for qid, cid in db.query(Question.id, Question.categoria_id).all()}
+    sketches: dict[SketchKey, HyperLogLog] = {}
+    procesadas = 0
+    for session, session_model, answer_model in (
+        (db, QuizSession, Answer), (archive_db, ArchivedQuizSession, ArchivedAnswer),
+    ):
+        if session is None:
+            continue
+        last_id = 0
+        while True:
+            rows = session.query(session_model.id, session_model.usuario_key, session_model.created_at).filter(
+                session_model.id > last_id
+            ).order_by(session_model.id).limit(batch_size).all()
+            if not rows:
+                break
+            for session_id, usuario_key, created_at in rows:
+                if created_at is not None:
+                    _record(sketches, _session_values(int(session_id), usuario_key), created_at, (ALL_CATEGORIES,))
+            procesadas += len(rows)
+            last_id = int(rows[-1][0])
+
+        # Las principales con la categoría con la que se registraron (la que se contó al responder);
+        # las archivadas no la guardan y toman la actual de la pregunta, como en rebuild_response_times
+        categoria_col = answer_model.categoria_id if answer_model is Answer else literal(None)
+        last_id = 0
+        while True:
+            rows = session.query(
+                answer_model.id, answer_model.quiz_session_id, answer_model.question_id,
+                answer_model.created_at, session_model.usuario_key, categoria_col,
+            ).join(session_model, session_model.id == answer_model.quiz_session_id).filter(
+                answer_model.id > last_id
+            ).order_by(answer_model.id).limit(batch_size).all()
+            if not rows:
+                break
+            for _, session_id, question_id, created_at, usuario_key, categoria_id in rows:
+                if categoria_id is None:
+                    categoria_id = question_categories.get(int(question_id))
+                if categoria_id is not None and created_at is not None:
+                    _record(
+                        sketches, _session_values(int(session_id), usuario_key), created_at,
+                        (categoria_id, ALL_CATEGORIES),
+                    )
+            procesadas += len(rows)
+            last_id = int(rows[-1][0])
+
+    db.query(UniqueCountSketch).delete()
+    db.add_all(
+        UniqueCountSketch(metrica=metrica, dia=dia, categoria_id=categoria_id, registros=hll.to_blob())
+        for (metrica, dia, categoria_id), hll in sketches.items()
+    )
+    db.commit()
+    return procesadas
+
+
+def default_days(now: Optional[datetime] = None, days: int = 30) -> tuple[date, date]:
+    """Rango por defecto: los últimos `days` días, incluido hoy"""
+    hoy = _day(now or datetime.now(timezone.utc))
+    return hoy - timedelta(days=days - 1), hoy
@@ -0,0 +1,76 @@
+"""
+Tablas de lookup de categorías y dificultades
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from ..models.category import Catalog, categories, difficulties
+
+
+_LEGACY_COLUMNS = (
+    # (columna vieja con el nombre, columna nueva con el ID, tabla de lookup)
+    ("categoria", "categoria_id", "categories"),
+    ("dificultad", "dificultad_id", "difficulties"),
+)
+
+
+def _seed(conn, catalog: Catalog) -> None:  # type: ignore
+    table = catalog.model.__tablename__  # type: ignore
+    existing = {name for (name,) in conn.execute(text(f"SELECT nombre FROM {table}"))}
+    for i, name in enumerate(catalog.canonical, start=1):
+        if name in existing:
+            continue
+        taken = conn.execute(text(f"SELECT 1 FROM {table} WHERE id = :id"), {"id": i}).first()
+        if taken:
+            conn.execute(text(f"INSERT INTO {table} (nombre) VALUES (:nombre)"), {"nombre": name})
+        else:
+            conn.execute(text(f"INSERT INTO {table} (id, nombre) VALUES (:id, :nombre)"), {"id": i, "nombre": name})
+
+
+def _migrate_legacy_questions(conn) -> None:  # type: ignore
+    """
+    Convertir una tabla questions vieja (categoria/dificultad como texto) a IDs.
+
+    create_all no modifica tablas existentes, así que se agregan las columnas a
+    mano, se completan desde las tablas de lookup y se borran las de texto.
+    """
+    inspector = inspect(conn)
+    columns = {c["name"] for c in inspector.get_columns("questions")}
+    for old, new, lookup in _LEGACY_COLUMNS:
+        if new in columns or old not in columns:
+            continue
+        # SQLite no deja borrar una columna que sigue indexada
+        for index in inspector.get_indexes("questions"):
+            if old in index["column_names"]:
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+        conn.execute(text(f"ALTER TABLE questions ADD COLUMN {new} INTEGER REFERENCES {lookup}(id)"))
+        conn.execute(text(
+            f"UPDATE questions SET {new} = (SELECT id FROM {lookup} WHERE {lookup}.nombre = questions.{old})"
+        ))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_questions_{new} ON questions ({new})"))
+        conn.execute(text(f"ALTER TABLE questions DROP COLUMN {old}"))
+        print(f"✓ questions.{old} migrada a {new}")
+
+
+def ensure_catalogs(engine: Engine) -> None:
+    """
+    Sembrar las tablas de lookup, migrar esquemas viejos y cargar los catálogos en memoria.
+
+    Se llama desde la migración base (ver schema_service), después de create_all.
+    """
+    with engine.begin() as conn:
+        _seed(conn, categories)
+        _seed(conn, difficulties)
+        _migrate_legacy_questions(conn)
+        _load(conn)
+
+
+def _load(conn) -> None:  # type: ignore
+    for catalog in (categories, difficulties):
+        table = catalog.model.__tablename__  # type: ignore
+        catalog.load([(int(i), str(n)) for i, n in conn.execute(text(f"SELECT id, nombre FROM {table}"))])
+
+
+def load_catalogs(engine: Engine) -> None:
+    """Solo cargar los catálogos en memoria (el esquema ya está al día)"""
+    with engine.connect() as conn:
+        _load(conn)
@@ -0,0 +1,209 @@
+"""
+Detección de preguntas casi duplicadas con MinHash + LSH
+"""
+import random
+import threading
+import zlib
+from typing import Iterable, Optional
+from sqlalchemy.orm import Session
+from ..models.question import Question
+from .quiz_service import _normalize_text
+
+
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+Signature = tuple[int, ...]
+
+
+def question_text(pregunta: str, opciones: Iterable[str]) -> str:
+    """Texto normalizado que identifica una pregunta (enunciado + opciones)"""
+    raw = " ".join([pregunta or "", *[str(o) for o in opciones]])
+    return " ".join(_normalize_text(raw).split())
+
+
+def minhash(text: str) -> Signature:
+    """
+    Calcular la firma MinHash de un texto a partir de sus shingles de caracteres
+
+    Args:
+        text: Texto ya normalizado
+
+    Returns:
+        Tupla de NUM_PERM enteros
+    """
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return tuple(
+        min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Similitud de Jaccard estimada entre dos firmas"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _band_keys(sig: Signature) -> list[tuple[int, int]]:
+    return [
+        (band, hash(sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+        for band in range(NUM_BANDS)
+    ]
+
+
+class DedupIndex:
+    """
+    Índice LSH en memoria: cada firma se reparte en NUM_BANDS cubetas, y solo
+    las preguntas que comparten alguna cubeta se comparan entre sí.
+    """
+
+    def __init__(self) -> None:
+        self._signatures: dict[int, Signature] = {}
+        self._buckets: dict[tuple[int, int], set[int]] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, key: int, sig: Signature) -> None:
+        with self._lock:
+            self._remove(key)
+            self._signatures[key] = sig
+            for bucket in _band_keys(sig):
+                self._buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, key: int) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: int) -> None:
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for bucket in _band_keys(sig):
+            members = self._buckets.get(bucket)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._buckets[bucket]
+
+    def query(self, sig: Signature, threshold: float = DEFAULT_THRESHOLD) -> list[tuple[int, float]]:
+        """
+        Buscar claves cuya similitud estimada sea >= threshold
+
+        Returns:
+            Lista de (clave, similitud) ordenada de mayor a menor similitud
+        """
+        with self._lock:
+            candidates: set[int] = set()
+            for bucket in _band_keys(sig):
+                candidates |= self._buckets.get(bucket, set())
+            matches = [(key, similarity(sig, self._signatures[key])) for key in candidates]
+        matches = [(key, sim) for key, sim in matches if sim >= threshold]
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def best_match(self, sig: Signature, threshold: float = DEFAULT_THRESHOLD) -> Optional[tuple[int, float]]:
+        matches = self.query(sig, threshold)
+        return matches[0] if matches else None
+
+    def items(self) -> list[tuple[int, Signature]]:
+        with self._lock:
+            return list(self._signatures.items())
+
+
+def question_signature(q: Question) -> Signature:
+    opciones = q.opciones if isinstance(q.opciones, list) else []
+    return minhash(question_text(str(q.pregunta), opciones))
+
+
+def build_index(db: Session, batch_size: int = 1000) -> DedupIndex:
+    """Construir un índice nuevo con todas las preguntas activas"""
+    index = DedupIndex()
+    last_id = 0
+    while True:
+        batch = db.query(Question).filter(
+            Question.is_active == True,
+            Question.id > last_id
+        ).order_by(Question.id).limit(batch_size).all()
+        if not batch:
+            break
+        for q in batch:
+            index.add(int(q.id), question_signature(q))  # type: ignore
+        last_id = int(batch[-1].id)  # type: ignore
+    index.loaded = True
+    return index
+
+
+_index = DedupIndex()
+_index_lock = threading.Lock()
+
+
+def get_dedup_index(db: Session) -> DedupIndex:
+    """
+    Devolver el índice global del proceso, cargándolo desde la BD la primera vez.
+
+    Cada worker mantiene su propio índice; las preguntas creadas por otro
+    proceso no se ven hasta que el índice se vuelve a cargar.
+    """
+    global _index
+    if not _index.loaded:
+        with _index_lock:
+            if not _index.loaded:
+                _index = build_index(db)
+    return _index
+
+
+def track_questions(questions: Iterable[Question]) -> None:
+    """Actualizar el índice global tras crear, editar o desactivar preguntas"""
+    if not _index.loaded:
+        return
+    for q in questions:
+        if q.is_active is False:
+            _index.remove(int(q.id))  # type: ignore
+        else:
+            _index.add(int(q.id), question_signature(q))  # type: ignore
+
+
+def find_clusters(index: DedupIndex, threshold: float = DEFAULT_THRESHOLD) -> list[list[int]]:
+    """
+    Agrupar las preguntas casi duplicadas de un índice (union-find sobre
+    los pares candidatos de LSH).
+
+    Returns:
+        Lista de grupos con más de una pregunta, cada uno ordenado por ID
+    """
+    parent: dict[int, int] = {}
+
+    def find(x: int) -> int:
+        while parent.get(x, x) != x:
+            parent[x] = parent.get(parent[x], parent[x])
+            x = parent[x]
+        return x
+
+    for key, sig in index.items():
+        for other, _ in index.query(sig, threshold):
+            if other != key:
+                ra, rb = find(key), find(other)
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+
+    clusters: dict[int, list[int]] = {}
+    for key in parent:
+        clusters.setdefault(find(key), []).append(key)
+    for root, members in clusters.items():
+        members.append(root)
+    return sorted((sorted(c) for c in clusters.values() if len(c) > 1), key=lambda c: c[0])
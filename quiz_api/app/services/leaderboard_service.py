@@ -0,0 +1,315 @@
+"""
+Rankings de sesiones completadas mantenidos en memoria
+"""
+import bisect
+import threading
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from ..models.answer import Answer
+from ..models.question import Question
+from ..models.quiz_session import QuizSession
+from ..models.archive import ArchivedAnswer, ArchivedQuizSession
+from ..models.category import categories
+
+
+# Orden del ranking: mayor puntuación, más aciertos y, a igualdad, la sesión más antigua
+RankKey = tuple[int, int, int]
+
+
+class SortedBoard:
+    """
+    Ranking ordenado con arrays mantenidos con bisect.
+
+    Buscar la posición de una sesión es O(log n) y el top-N es un slice.
+
+    Las escrituras (upsert, extend, remove) las hace Leaderboard con su lock
+    tomado; las lecturas toman ese mismo lock para no ver los arrays a medio
+    actualizar.
+    """
+
+    def __init__(self, lock: Optional[threading.Lock] = None) -> None:
+        self._keys: list[RankKey] = []
+        self._by_session: dict[int, RankKey] = {}
+        self._entries: dict[int, dict[str, Any]] = {}
+        self._lock = lock or threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+    def __contains__(self, session_id: int) -> bool:
+        return session_id in self._by_session
+
+    def upsert(self, session_id: int, puntuacion: int, correctas: int, entry: dict[str, Any]) -> None:
+        self.remove(session_id)
+        key = (-puntuacion, -correctas, session_id)
+        bisect.insort(self._keys, key)
+        self._by_session[session_id] = key
+        self._entries[session_id] = entry
+
+    def extend(self, items: list[tuple[int, int, int, dict[str, Any]]]) -> None:
+        """Agregar muchas sesiones nuevas (session_id, puntuacion, correctas, entry) ordenando una sola vez"""
+        for session_id, puntuacion, correctas, entry in items:
+            key = (-puntuacion, -correctas, session_id)
+            self._keys.append(key)
+            self._by_session[session_id] = key
+            self._entries[session_id] = entry
+        self._keys.sort()
+
+    def remove(self, session_id: int) -> None:
+        key = self._by_session.pop(session_id, None)
+        if key is None:
+            return
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+        self._entries.pop(session_id, None)
+
+    def rank(self, session_id: int) -> Optional[int]:
+        """Posición (empezando en 1) de la sesión, o None si no está"""
+        with self._lock:
+            key = self._by_session.get(session_id)
+            if key is None:
+                return None
+            return bisect.bisect_left(self._keys, key) + 1
+
+    def top(self, limit: int, offset: int = 0) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                {"posicion": offset + i + 1, **self._entries[key[2]]}
+                for i, key in enumerate(self._keys[offset:offset + limit])
+            ]
+
+    def entry(self, session_id: int) -> Optional[dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(session_id)
+
+
+class Leaderboard:
+    """Ranking global, por día (de finalización) y por categoría"""
+
+    def __init__(self) -> None:
+        # Un solo lock para todos los rankings: lo comparten con sus lecturas
+        self._lock = threading.Lock()
+        self.global_board = SortedBoard(self._lock)
+        self.by_day: dict[str, SortedBoard] = {}
+        self.by_category: dict[str, SortedBoard] = {}
+        self._session_days: dict[int, str] = {}
+        self._session_categories: dict[int, list[str]] = {}
+        # Se marca al terminar rebuild_leaderboard (la carga inicial corre en segundo plano)
+        self.loaded = threading.Event()
+
+    def record(
+        self,
+        session_id: int,
+        usuario_nombre: Optional[str],
+        puntuacion: int,
+        correctas: int,
+        respondidas: int,
+        fecha_fin: Optional[datetime],
+        categorias: dict[str, tuple[int, int]],
+    ) -> None:
+        """
+        Registrar (o reemplazar) una sesión completada.
+
+        Args:
+            categorias: {categoria: (respondidas, correctas)} de la sesión
+        """
+        with self._lock:
+            self._remove(session_id)
+            for board, item in self._placements(
+                session_id, usuario_nombre, puntuacion, correctas, respondidas, fecha_fin, categorias
+            ):
+                board.upsert(*item)
+
+    def load(self, rows: list[tuple[Any, ...]]) -> None:
+        """
+        Registrar muchas sesiones de una vez (la carga inicial).
+
+        Cada ranking se ordena una sola vez al final en vez de insertar fila
+        por fila. Las sesiones que ya están (registradas por la API mientras
+        se leía la BD) se dejan como están.
+
+        Args:
+            rows: (session_id, usuario_nombre, puntuacion, correctas, respondidas, fecha_fin, categorias)
+        """
+        with self._lock:
+            pending: dict[int, tuple[SortedBoard, list[tuple[int, int, int, dict[str, Any]]]]] = {}
+            seen: set[int] = set()
+            for row in rows:
+                if row[0] in self.global_board or row[0] in seen:
+                    continue
+                seen.add(row[0])
+                for board, item in self._placements(*row):
+                    pending.setdefault(id(board), (board, []))[1].append(item)
+            for board, items in pending.values():
+                board.extend(items)
+
+    def _placements(
+        self,
+        session_id: int,
+        usuario_nombre: Optional[str],
+        puntuacion: int,
+        correctas: int,
+        respondidas: int,
+        fecha_fin: Optional[datetime],
+        categorias: dict[str, tuple[int, int]],
+    ) -> list[tuple[SortedBoard, tuple[int, int, int, dict[str, Any]]]]:
+        # Rankings donde va la sesión y con qué valores; se llama con el lock tomado
+        entry = {
+            "session_id": session_id,
+            "usuario_nombre": usuario_nombre,
+            "puntuacion_total": puntuacion,
+            "preguntas_correctas": correctas,
+            "preguntas_respondidas": respondidas,
+            "fecha_fin": fecha_fin,
+        }
+        placements = [(self.global_board, (session_id, puntuacion, correctas, entry))]
+
+        if fecha_fin is not None:
+            day = fecha_fin.date().isoformat()
+            placements.append((self.by_day.setdefault(day, SortedBoard(self._lock)), (session_id, puntuacion, correctas, entry)))
+            self._session_days[session_id] = day
+
+        for categoria, (resp, corr) in categorias.items():
+            score = (corr * 100 // resp) if resp > 0 else 0
+            placements.append((
+                self.by_category.setdefault(categoria, SortedBoard(self._lock)),
+                (session_id, score, corr,
+                 {**entry, "puntuacion_total": score, "preguntas_correctas": corr, "preguntas_respondidas": resp}),
+            ))
+        self._session_categories[session_id] = list(categorias)
+        return placements
+
+    def remove(self, session_id: int) -> None:
+        with self._lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id: int) -> None:
+        self.global_board.remove(session_id)
+        day = self._session_days.pop(session_id, None)
+        if day is not None and day in self.by_day:
+            self.by_day[day].remove(session_id)
+        for categoria in self._session_categories.pop(session_id, []):
+            if categoria in self.by_category:
+                self.by_category[categoria].remove(session_id)
+
+    def board(self, dia: Optional[str] = None, categoria: Optional[str] = None) -> SortedBoard:
+        with self._lock:
+            if dia is not None:
+                return self.by_day.get(dia) or SortedBoard()
+            if categoria is not None:
+                return self.by_category.get(categoria) or SortedBoard()
+            return self.global_board
+
+    def clear(self) -> None:
+        with self._lock:
+            self.global_board = SortedBoard(self._lock)
+            self.by_day.clear()
+            self.by_category.clear()
+            self._session_days.clear()
+            self._session_categories.clear()
+
+
+leaderboard = Leaderboard()
+
+
+def _category_breakdown(db: Session, session_ids: Optional[list[int]] = None) -> dict[int, dict[str, tuple[int, int]]]:
+    query = db.query(
+        Answer.quiz_session_id,
+        Question.categoria_id,
+        func.count(Answer.id),
+        func.sum(case((Answer.es_correcta == True, 1), else_=0)),
+    ).join(Question, Question.id == Answer.question_id)
+    if session_ids is not None:
+        query = query.filter(Answer.quiz_session_id.in_(session_ids))
+    else:
+        query = query.join(QuizSession, QuizSession.id == Answer.quiz_session_id).filter(
+            QuizSession.estado == "completado"
+        )
+    result: dict[int, dict[str, tuple[int, int]]] = {}
+    for session_id, categoria_id, total, correctas in query.group_by(Answer.quiz_session_id, Question.categoria_id):
+        categoria = categories.name_of(categoria_id)
+        if categoria is not None:
+            result.setdefault(session_id, {})[categoria] = (int(total), int(correctas or 0))
+    return result
+
+
+def record_session(db: Session, session: QuizSession) -> None:
+    """Actualizar el ranking con una sesión recién completada"""
+    categorias = _category_breakdown(db, [int(session.id)])  # type: ignore
+    leaderboard.record(
+        int(session.id),  # type: ignore
+        session.usuario_nombre,  # type: ignore
+        int(session.puntuacion_total or 0),  # type: ignore
+        int(session.preguntas_correctas or 0),  # type: ignore
+        int(session.preguntas_respondidas or 0),  # type: ignore
+        session.fecha_fin,  # type: ignore
+        categorias.get(int(session.id), {}),  # type: ignore
+    )
+
+
+def _archived_category_breakdown(db: Session, archive_db: Session) -> dict[int, dict[str, tuple[int, int]]]:
+    # Las respuestas archivadas no pueden hacer JOIN con preguntas (otra BD)
+    categorias = {qid: categories.name_of(cid) for qid, cid in db.query(Question.id, Question.categoria_id)}
+    result: dict[int, dict[str, tuple[int, int]]] = {}
+    rows = archive_db.query(
+        ArchivedAnswer.quiz_session_id,
+        ArchivedAnswer.question_id,
+        func.count(ArchivedAnswer.id),
+        func.sum(case((ArchivedAnswer.es_correcta == True, 1), else_=0)),
+    ).join(ArchivedQuizSession, ArchivedQuizSession.id == ArchivedAnswer.quiz_session_id).filter(
+        ArchivedQuizSession.estado == "completado"
+    ).group_by(ArchivedAnswer.quiz_session_id, ArchivedAnswer.question_id)
+    for session_id, question_id, total, correctas in rows:
+        categoria = categorias.get(question_id)
+        if categoria is None:
+            continue
+        resp, corr = result.setdefault(session_id, {}).get(categoria, (0, 0))
+        result[session_id][categoria] = (resp + int(total), corr + int(correctas or 0))
+    return result
+
+
+def rebuild_leaderboard(db: Session, archive_db: Optional[Session] = None) -> int:
+    """
+    Reconstruir el ranking desde la BD (se usa al arrancar).
+
+    Lee solo las columnas del índice ix_quiz_sessions_leaderboard, así que
+    SQLite no necesita visitar la tabla de sesiones. Si se pasa archive_db
+    también se cargan las sesiones archivadas.
+
+    Returns:
+        Número de sesiones cargadas
+    """
+    leaderboard.clear()
+    categorias = _category_breakdown(db)
+    rows = db.query(
+        QuizSession.id,
+        QuizSession.usuario_nombre,
+        QuizSession.puntuacion_total,
+        QuizSession.preguntas_correctas,
+        QuizSession.preguntas_respondidas,
+        QuizSession.fecha_fin,
+    ).filter(QuizSession.estado == "completado").all()
+
+    if archive_db is not None:
+        categorias.update(_archived_category_breakdown(db, archive_db))
+        rows += archive_db.query(
+            ArchivedQuizSession.id,
+            ArchivedQuizSession.usuario_nombre,
+            ArchivedQuizSession.puntuacion_total,
+            ArchivedQuizSession.preguntas_correctas,
+            ArchivedQuizSession.preguntas_respondidas,
+            ArchivedQuizSession.fecha_fin,
+        ).filter(ArchivedQuizSession.estado == "completado").all()
+
+    # Un solo sort por ranking: insertar fila por fila era O(n²) y el ranking responde 503 hasta terminar
+    leaderboard.load([
+        (session_id, usuario, puntuacion or 0, correctas or 0, respondidas or 0,
+         fecha_fin, categorias.get(session_id, {}))
+        for session_id, usuario, puntuacion, correctas, respondidas, fecha_fin in rows
+    ])
+    leaderboard.loaded.set()
+    return len(rows)
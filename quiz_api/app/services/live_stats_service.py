@@ -0,0 +1,150 @@
+"""
+Feed en vivo de estadísticas (pub/sub en proceso) para el endpoint /statistics/stream
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Optional
+
+
+WINDOW_SECONDS = float(os.getenv("STATS_STREAM_WINDOW_SECONDS", "1.0"))
+HEARTBEAT_SECONDS = 15.0
+QUEUE_SIZE = 16
+
+
+def diff_snapshot(old: dict[str, Any], new: dict[str, Any], keys: dict[str, str]) -> dict[str, Any]:
+    """
+    Calcular qué cambió entre dos snapshots.
+
+    Args:
+        old: Snapshot anterior
+        new: Snapshot nuevo
+        keys: Para las secciones que son listas, el campo que identifica cada elemento
+              (las listas sin clave se mandan completas si cambiaron)
+
+    Returns:
+        Diccionario solo con las secciones que cambiaron. Los dicts traen solo los
+        campos distintos y las listas con clave solo los elementos distintos.
+    """
+    delta: dict[str, Any] = {}
+    for section, value in new.items():
+        before = old.get(section)
+        if value == before:
+            continue
+        if isinstance(value, dict) and isinstance(before, dict):
+            delta[section] = {k: v for k, v in value.items() if before.get(k) != v}
+        elif isinstance(value, list) and section in keys and isinstance(before, list):
+            key = keys[section]
+            previous = {item[key]: item for item in before}
+            delta[section] = [item for item in value if previous.get(item[key]) != item]
+        else:
+            delta[section] = value
+    return delta
+
+
+def format_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class LiveStatsFeed:
+    """
+    Publica cambios de estadísticas a muchos suscriptores con un solo cálculo por ventana.
+
+    Los routers llaman a `publish()` después de cada commit (desde cualquier hilo).
+    Mientras haya suscriptores, una sola tarea revisa cada `window` segundos si hubo
+    publicaciones; si las hubo recalcula el snapshot una vez y manda a todos el delta
+    respecto del snapshot anterior. Sin escrituras no se recalcula nada.
+    """
+
+    def __init__(self, window: float = WINDOW_SECONDS, keys: Optional[dict[str, str]] = None) -> None:
+        self.window = window
+        self.keys = keys or {}
+        self.computations = 0
+        self._lock = threading.Lock()
+        self._pending: dict[str, int] = {}
+        self._subscribers: set[asyncio.Queue[str]] = set()
+        self._snapshot: Optional[dict[str, Any]] = None
+        self._version = 0
+        self._task: Optional[asyncio.Task[None]] = None
+        self._snapshot_lock = asyncio.Lock()
+
+    def publish(self, topic: str) -> None:
+        """Avisar que hubo una escritura (p. ej. 'respuesta', 'sesion', 'pregunta')"""
+        with self._lock:
+            self._pending[topic] = self._pending.get(topic, 0) + 1
+
+    def _take_pending(self) -> dict[str, int]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    async def _compute(self, compute: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        self.computations += 1
+        return await asyncio.to_thread(compute)
+
+    def _broadcast(self, message: str, snapshot: str) -> None:
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Cliente lento: se descartan sus deltas y se le manda el snapshot completo
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(snapshot)
+            else:
+                queue.put_nowait(message)
+
+    async def _run(self, compute: Callable[[], dict[str, Any]]) -> None:
+        while self._subscribers:
+            await asyncio.sleep(self.window)
+            pending = self._take_pending()
+            if not pending or self._snapshot is None:
+                continue
+            try:
+                snapshot = await self._compute(compute)
+            except Exception as exc:
+                print(f"[WARN] No se pudieron recalcular las estadísticas en vivo: {exc}")
+                continue
+            delta = diff_snapshot(self._snapshot, snapshot, self.keys)
+            self._snapshot = snapshot
+            if not delta:
+                continue
+            self._version += 1
+            self._broadcast(
+                format_event("delta", {"version": self._version, "eventos": pending, **delta}),
+                format_event("snapshot", {"version": self._version, **snapshot}),
+            )
+
+    async def subscribe(self, compute: Callable[[], dict[str, Any]]) -> AsyncIterator[str]:
+        """
+        Generador de eventos SSE para un cliente: primero el snapshot actual, después deltas.
+
+        Args:
+            compute: Función (sincrónica) que calcula el snapshot completo de estadísticas
+        """
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        async with self._snapshot_lock:
+            if self._snapshot is None:
+                self._take_pending()
+                self._snapshot = await self._compute(compute)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(compute))
+        try:
+            yield format_event("snapshot", {"version": self._version, **self._snapshot})
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers:
+                # Sin suscriptores el snapshot deja de actualizarse: el próximo lo recalcula
+                self._snapshot = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+
+live_stats = LiveStatsFeed(keys={"categorias": "categoria"})
@@ -0,0 +1,255 @@
+"""
+Migraciones numeradas del esquema, pensadas para correr con la API andando
+
+Cada migración tiene un número de versión; las que son mayores que la versión
+guardada en schema_version se aplican en orden y la versión se actualiza después
+de cada una. Los rellenos de datos se hacen en lotes chicos (cada uno en su
+propia transacción corta) con una pausa entre lotes, y el avance queda guardado
+para poder retomarlos si el proceso se corta.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+MIGRATION_PAUSE_MS = float(os.getenv("MIGRATION_PAUSE_MS", "20"))
+# Tiempo máximo (ms) que un lote debería tener tomada la escritura; si se pasa, el lote se achica
+MIGRATION_MAX_LOCK_MS = float(os.getenv("MIGRATION_MAX_LOCK_MS", "5"))
+MIN_BATCH_SIZE = 10
+
+
+def get_schema_version(engine: Engine) -> Optional[int]:
+    """Versión guardada en la tabla schema_version, o None si la tabla no existe"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version FROM schema_version WHERE id = 1")).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def set_schema_version(engine: Engine, version: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL)"))
+        conn.execute(text("DELETE FROM schema_version"))
+        conn.execute(text("INSERT INTO schema_version (id, version) VALUES (1, :version)"), {"version": version})
+
+
+class MigrationContext:
+    """
+    Operaciones disponibles dentro de una migración.
+
+    Cada operación usa su propia transacción: nunca se tiene tomada la escritura
+    durante toda la migración.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        version: int,
+        batch_size: int = MIGRATION_BATCH_SIZE,
+        pause_ms: float = MIGRATION_PAUSE_MS,
+        max_lock_ms: float = MIGRATION_MAX_LOCK_MS,
+        archive_engine: Optional[Engine] = None,
+    ) -> None:
+        self.engine = engine
+        # BD de archivo, para migraciones de la BD principal que también leen sesiones archivadas
+        self.archive_engine = archive_engine
+        self.version = version
+        self.batch_size = max(MIN_BATCH_SIZE, batch_size)
+        self.pause_ms = pause_ms
+        self.max_lock_ms = max_lock_ms
+        self.max_lock_seen_ms = 0.0
+
+    def execute(self, sql: str, params: Optional[dict[str, Any]] = None) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(sql), params or {})
+
+    def has_column(self, table: str, column: str) -> bool:
+        with self.engine.connect() as conn:
+            return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+    def add_column(self, table: str, column: str, ddl: str) -> bool:
+        """
+        Agregar una columna si no existe (en SQLite solo cambia el esquema, no reescribe la tabla).
+
+        Args:
+            ddl: Tipo y restricciones, por ejemplo "INTEGER REFERENCES categories(id)"
+
+        Returns:
+            True si se agregó
+        """
+        if self.has_column(table, column):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        print(f"  ✓ Columna {table}.{column} agregada")
+        return True
+
+    def create_index(self, name: str, table: str, columns: Sequence[str], unique: bool = False) -> None:
+        """
+        Crear un índice si no existe, sin frenar las escrituras donde el motor lo permite.
+
+        En PostgreSQL se usa CREATE INDEX CONCURRENTLY (fuera de una transacción).
+        SQLite no puede construir un índice de a partes: se crea en una única
+        transacción, así que las escrituras esperan lo que tarde. Antes se lee la
+        tabla entera con una conexión de lectura (que con WAL no bloquea a nadie)
+        para que la construcción encuentre las páginas en caché y dure lo menos posible.
+        """
+        cols = ", ".join(columns)
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        start = time.perf_counter()
+        if self.engine.dialect.name == "postgresql":
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols})"))
+        else:
+            with self.engine.connect() as conn:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"), {"name": name}
+                ).first()
+                if exists:
+                    return
+                conn.execute(text(f"SELECT count({columns[0]}) FROM {table}")).scalar()
+            lock_start = time.perf_counter()
+            self.execute(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({cols})")
+            self.max_lock_seen_ms = max(self.max_lock_seen_ms, (time.perf_counter() - lock_start) * 1000)
+        print(f"  ✓ Índice {name} creado ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    def _progress(self, step: str) -> int:
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migration_progress ("
+                "version INTEGER NOT NULL, paso TEXT NOT NULL, ultimo_id INTEGER NOT NULL, "
+                "PRIMARY KEY (version, paso))"
+            ))
+            last = conn.execute(
+                text("SELECT ultimo_id FROM schema_migration_progress WHERE version = :version AND paso = :paso"),
+                {"version": self.version, "paso": step},
+            ).scalar()
+        return int(last or 0)
+
+    def backfill(
+        self,
+        step: str,
+        select_sql: str,
+        update_sql: str,
+        make_params: Callable[[Row], Optional[dict[str, Any]]],
+        source: Optional[Engine] = None,
+    ) -> int:
+        """
+        Rellenar datos en lotes acotados, recorriendo la tabla por id.
+
+        La lectura de cada lote se hace fuera de la transacción de escritura; la
+        escritura (el UPDATE del lote más el avance) es una transacción corta. Si
+        un lote tarda más que max_lock_ms en escribirse, el siguiente se achica a
+        la mitad; si sobra tiempo, vuelve a crecer hasta batch_size. Entre lotes
+        se duerme pause_ms para que las escrituras de la API pasen primero.
+
+        Args:
+            step: Nombre del paso (para guardar el avance y poder retomarlo)
+            select_sql: Consulta con `:ultimo_id` y `:limite` que devuelve el id como
+                primera columna, por ejemplo
+                "SELECT id, x FROM t WHERE id > :ultimo_id ORDER BY id LIMIT :limite"
+            update_sql: Sentencia que se ejecuta una vez por fila (executemany)
+            make_params: Convierte cada fila leída en los parámetros del UPDATE
+                (None para saltear la fila)
+            source: Engine del que se leen las filas (por defecto el mismo que se escribe)
+
+        Returns:
+            Cantidad de filas procesadas en esta corrida
+        """
+        last_id = self._progress(step)
+        limit = self.batch_size
+        total = 0
+        save_progress = text(
+            "INSERT INTO schema_migration_progress (version, paso, ultimo_id) VALUES (:version, :paso, :ultimo_id) "
+            "ON CONFLICT (version, paso) DO UPDATE SET ultimo_id = excluded.ultimo_id"
+        )
+        while True:
+            with (source or self.engine).connect() as conn:
+                rows = conn.execute(text(select_sql), {"ultimo_id": last_id, "limite": limit}).all()
+            if not rows:
+                break
+            params = [p for p in (make_params(row) for row in rows) if p is not None]
+            last_id = int(rows[-1][0])
+
+            lock_start = time.perf_counter()
+            with self.engine.begin() as conn:
+                if params:
+                    conn.execute(text(update_sql), params)
+                conn.execute(save_progress, {"version": self.version, "paso": step, "ultimo_id": last_id})
+            lock_ms = (time.perf_counter() - lock_start) * 1000
+            self.max_lock_seen_ms = max(self.max_lock_seen_ms, lock_ms)
+            total += len(rows)
+
+            if lock_ms > self.max_lock_ms:
+                limit = max(MIN_BATCH_SIZE, limit // 2)
+            elif lock_ms < self.max_lock_ms / 4:
+                limit = min(self.batch_size, limit * 2)
+            if self.pause_ms > 0:
+                time.sleep(self.pause_ms / 1000)
+        if total:
+            print(f"  ✓ {step}: {total} filas")
+        return total
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    descripcion: str
+    run: Callable[[MigrationContext], None]
+
+
+def pending_migrations(engine: Engine, migrations: Sequence[Migration]) -> list[Migration]:
+    current = get_schema_version(engine) or 0
+    return [m for m in migrations if m.version > current]
+
+
+def run_migrations(
+    engine: Engine,
+    migrations: Sequence[Migration],
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    pause_ms: float = MIGRATION_PAUSE_MS,
+    max_lock_ms: float = MIGRATION_MAX_LOCK_MS,
+    archive_engine: Optional[Engine] = None,
+) -> list[Migration]:
+    """
+    Aplicar en orden las migraciones pendientes.
+
+    La versión se guarda después de cada migración, así que si una falla las
+    anteriores quedan registradas y la próxima corrida sigue desde ahí (los
+    rellenos retoman desde el último lote guardado).
+
+    Returns:
+        Migraciones aplicadas
+
+    Raises:
+        ValueError: si las versiones no están en orden creciente
+    """
+    versions = [m.version for m in migrations]
+    if versions != sorted(set(versions)):
+        raise ValueError("Las migraciones tienen que tener versiones únicas y en orden creciente")
+
+    applied = []
+    for migration in pending_migrations(engine, migrations):
+        print(f"[INFO] Migración {migration.version}: {migration.descripcion}")
+        ctx = MigrationContext(engine, migration.version, batch_size, pause_ms, max_lock_ms, archive_engine)
+        start = time.perf_counter()
+        migration.run(ctx)
+        set_schema_version(engine, migration.version)
+        if _has_progress_table(engine):
+            ctx.execute("DELETE FROM schema_migration_progress WHERE version = :version", {"version": migration.version})
+        print(
+            f"✓ Migración {migration.version} aplicada en {(time.perf_counter() - start) * 1000:.0f} ms "
+            f"(escritura más larga: {ctx.max_lock_seen_ms:.1f} ms)"
+        )
+        applied.append(migration)
+    return applied
+
+
+def _has_progress_table(engine: Engine) -> bool:
+    with engine.connect() as conn:
+        return inspect(conn).has_table("schema_migration_progress")
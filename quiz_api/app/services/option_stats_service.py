@@ -0,0 +1,90 @@
+"""
+Veces que se eligió cada opción de cada pregunta
+
+question_option_stats tiene una fila por (pregunta, opción) con las respuestas
+que la eligieron y cuántas de ellas fueron correctas. Se actualiza en la misma
+transacción que registra, corrige o borra la respuesta, así que las
+estadísticas de una pregunta se leen con una consulta por clave primaria
+(tantas filas como opciones) sin recorrer answers. Archivar no la toca: las
+respuestas archivadas siguen contando.
+"""
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+from ..models.option_stats import QuestionOptionStats
+
+
+# Para los rellenos de la migración (mismas columnas que record_option_answer)
+OPTION_UPSERT_SQL = (
+    "INSERT INTO question_option_stats (question_id, opcion, num_respuestas, num_correctas) "
+    "VALUES (:question_id, :opcion, 1, :correcta) "
+    "ON CONFLICT (question_id, opcion) DO UPDATE SET "
+    "num_respuestas = question_option_stats.num_respuestas + 1, "
+    "num_correctas = question_option_stats.num_correctas + excluded.num_correctas"
+)
+
+
+def record_option_answer(db: Session, question_id: int, opcion: int, es_correcta: bool, sign: int = 1) -> None:
+    """
+    Sumar (o restar, con sign=-1) una respuesta a la opción elegida.
+
+    Una corrección resta la opción anterior y suma la nueva. No hace commit.
+    """
+    values = {"num_respuestas": sign, "num_correctas": sign if es_correcta else 0}
+    if db.get_bind().dialect.name == "sqlite":
+        # Un solo INSERT ... ON CONFLICT: dos respuestas a la misma pregunta no chocan al crear la fila
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(QuestionOptionStats).values(question_id=question_id, opcion=opcion, **values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["question_id", "opcion"],
+            set_={k: getattr(QuestionOptionStats, k) + v for k, v in values.items()},
+        ))
+        return
+
+    row = db.get(QuestionOptionStats, (question_id, opcion))
+    if row is None:
+        db.add(QuestionOptionStats(question_id=question_id, opcion=opcion, **values))
+        return
+    for k, v in values.items():
+        setattr(row, k, getattr(row, k) + v)
+
+
+def option_counts(db: Session, question_id: int) -> dict[int, tuple[int, int]]:
+    """Respuestas por opción de una pregunta: {opcion: (total, correctas)}"""
+    rows = db.query(QuestionOptionStats).filter(QuestionOptionStats.question_id == question_id).all()
+    return {int(r.opcion): (int(r.num_respuestas), int(r.num_correctas)) for r in rows}  # type: ignore
+
+
+def option_breakdown(
+    counts: dict[int, tuple[int, int]],
+    opciones: list[str],
+    respuesta_correcta: int,
+) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+    """
+    Detalle por opción y el distractor más elegido.
+
+    Args:
+        counts: Resultado de option_counts
+        opciones: Textos de las opciones de la pregunta
+        respuesta_correcta: Índice de la opción correcta actual
+
+    Returns:
+        (lista por opción, distractor más elegido o None si nadie eligió una incorrecta)
+    """
+    total = sum(n for n, _ in counts.values())
+    errores = sum(n for opcion, (n, _) in counts.items() if opcion != respuesta_correcta)
+    detalle = []
+    for opcion, texto in enumerate(opciones):
+        veces = counts.get(opcion, (0, 0))[0]
+        es_correcta = opcion == respuesta_correcta
+        detalle.append({
+            "opcion": opcion,
+            "texto": texto,
+            "es_correcta": es_correcta,
+            "veces": veces,
+            "porcentaje": round(veces / total * 100, 2) if total else 0,
+            # Qué parte de las respuestas incorrectas se llevó este distractor
+            "porcentaje_de_errores": round(veces / errores * 100, 2) if errores and not es_correcta else None,
+        })
+    distractores = [o for o in detalle if not o["es_correcta"] and o["veces"] > 0]
+    principal = max(distractores, key=lambda o: o["veces"]) if distractores else None
+    return detalle, principal
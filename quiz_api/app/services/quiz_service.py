@@ -1,11 +1,16 @@
 """
 Servicios de negocio para operaciones de quiz
 """
+import unicodedata
+from functools import lru_cache
 from typing import Any, cast
 from sqlalchemy.orm import Session
 from ..models.question import Question
 from ..models.answer import Answer
 from ..models.quiz_session import QuizSession
+from ..models.archive import ArchivedQuestionStats
+from ..models.category import CANONICAL_CATEGORIES, CANONICAL_DIFFICULTIES, categories
+from .option_stats_service import option_breakdown, option_counts
 
 
 def validate_question_data(pregunta: str, opciones: list[str], respuesta_correcta: int, categoria: str, dificultad: str) -> None:
@@ -28,48 +33,75 @@ def validate_question_data(pregunta: str, opciones: list[str], respuesta_correct
     if not (0 <= respuesta_correcta < len(opciones)):
         raise ValueError(f"respuesta_correcta debe estar entre 0 y {len(opciones) - 1}")
     
-    valid_categories = ["Tecnología", "Historia", "Ciencia", "Geografía", "Literatura", "Deporte"]
-    if categoria not in valid_categories:
-        raise ValueError(f"Categoría debe ser una de: {', '.join(valid_categories)}")
+    if categoria not in CANONICAL_CATEGORIES:
+        raise ValueError(f"Categoría debe ser una de: {', '.join(CANONICAL_CATEGORIES)}")
     
-    valid_levels = ["fácil", "medio", "difícil"]
-    if dificultad not in valid_levels:
-        raise ValueError(f"Dificultad debe ser una de: {', '.join(valid_levels)}")
+    if dificultad not in CANONICAL_DIFFICULTIES:
+        raise ValueError(f"Dificultad debe ser una de: {', '.join(CANONICAL_DIFFICULTIES)}")
 
 
 def _normalize_text(s: str) -> str:
-    import unicodedata
     if not s:
         return ""
     s = s.strip().lower()
+    if s.isascii():
+        # Sin caracteres especiales no hay acentos que quitar
+        return s
     s = unicodedata.normalize('NFKD', s)
     s = ''.join(ch for ch in s if not unicodedata.combining(ch))
     return s
 
 
-CANONICAL_CATEGORIES = ["Tecnología", "Historia", "Ciencia", "Geografía", "Literatura", "Deporte"]
-CANONICAL_DIFFICULTIES = ["fácil", "medio", "difícil"]
-
-
 _CATEGORY_MAP = { _normalize_text(c): c for c in CANONICAL_CATEGORIES }
 _DIFFICULTY_MAP = { _normalize_text(d): d for d in CANONICAL_DIFFICULTIES }
 
 
+def _exact_variants(mapping: dict[str, str]) -> dict[str, str]:
+    # Formas más comunes de escribir cada valor: se resuelven con un solo lookup
+    variants: dict[str, str] = {}
+    for key, canonical in mapping.items():
+        for form in (canonical, canonical.lower(), canonical.upper(), canonical.capitalize(),
+                     key, key.upper(), key.capitalize()):
+            variants[form] = canonical
+    return variants
+
+
+_CATEGORY_EXACT = _exact_variants(_CATEGORY_MAP)
+_DIFFICULTY_EXACT = _exact_variants(_DIFFICULTY_MAP)
+
+
+@lru_cache(maxsize=1024)
+def _lookup_category(value: str) -> str | None:
+    return _CATEGORY_MAP.get(_normalize_text(value))
+
+
+@lru_cache(maxsize=1024)
+def _lookup_difficulty(value: str) -> str | None:
+    return _DIFFICULTY_MAP.get(_normalize_text(value))
+
+
 def canonical_category(value: str) -> str:
     """Map input to a canonical category (accent- and case-insensitive).
 
+    Exact canonical spellings hit a precomputed dict; other spellings go
+    through a bounded LRU cache, so normalization runs once per variant.
+
     Returns canonical string or raises ValueError if unknown.
     """
-    key = _normalize_text(value)
-    if key in _CATEGORY_MAP:
-        return _CATEGORY_MAP[key]
+    canonical = _CATEGORY_EXACT.get(value)
+    if canonical is None and isinstance(value, str):
+        canonical = _lookup_category(value)
+    if canonical is not None:
+        return canonical
     raise ValueError(f"Categoría debe ser una de: {', '.join(CANONICAL_CATEGORIES)}")
 
 
 def canonical_difficulty(value: str) -> str:
-    key = _normalize_text(value)
-    if key in _DIFFICULTY_MAP:
-        return _DIFFICULTY_MAP[key]
+    canonical = _DIFFICULTY_EXACT.get(value)
+    if canonical is None and isinstance(value, str):
+        canonical = _lookup_difficulty(value)
+    if canonical is not None:
+        return canonical
     raise ValueError(f"Dificultad debe ser una de: {', '.join(CANONICAL_DIFFICULTIES)}")
 
 
@@ -101,6 +133,9 @@ def get_question_statistics(question_id: int, db: Session) -> dict[str, Any]:
     """
     Obtener estadísticas de una pregunta específica
     
+    Lee los contadores por opción (ver services/option_stats_service.py): una
+    fila por opción, sin recorrer las respuestas. Incluyen las archivadas.
+    
     Args:
         question_id: ID de la pregunta
         db: Sesión de base de datos
@@ -112,10 +147,11 @@ def get_question_statistics(question_id: int, db: Session) -> dict[str, Any]:
     if not question:
         return {}
     
-    answers = db.query(Answer).filter(Answer.question_id == question_id).all()
-    total = len(answers)
-    correctas = sum(1 for a in answers if cast(bool, a.es_correcta))
+    counts = option_counts(db, question_id)
+    total = sum(n for n, _ in counts.values())
+    correctas = sum(c for _, c in counts.values())
     tasa_acierto = (correctas / total * 100) if total > 0 else 0
+    opciones, distractor = option_breakdown(counts, question.opciones, cast(int, question.respuesta_correcta))
     
     return {
         "question_id": question_id,
@@ -124,7 +160,9 @@ def get_question_statistics(question_id: int, db: Session) -> dict[str, Any]:
         "dificultad": question.dificultad,
         "veces_respondida": total,
         "veces_correcta": correctas,
-        "tasa_acierto": round(tasa_acierto, 2)
+        "tasa_acierto": round(tasa_acierto, 2),
+        "opciones": opciones,
+        "distractor_principal": distractor,
     }
 
 
@@ -139,8 +177,9 @@ def get_category_statistics(categoria: str, db: Session) -> dict[str, Any]:
     Returns:
         Diccionario con estadísticas
     """
+    categoria_id = categories.get_id(categoria)
     preguntas = db.query(Question).filter(
-        Question.categoria == categoria,
+        Question.categoria_id == categoria_id,
         Question.is_active == True
     ).all()
     
@@ -149,8 +188,9 @@ def get_category_statistics(categoria: str, db: Session) -> dict[str, Any]:
         return {}
     
     answers = db.query(Answer).filter(Answer.question_id.in_(preguntas_ids)).all()
-    total = len(answers)
-    correctas = sum(1 for a in answers if cast(bool, a.es_correcta))
+    archivadas = db.query(ArchivedQuestionStats).filter(ArchivedQuestionStats.question_id.in_(preguntas_ids)).all()
+    total = len(answers) + sum(cast(int, a.num_respuestas) for a in archivadas)
+    correctas = sum(1 for a in answers if cast(bool, a.es_correcta)) + sum(cast(int, a.num_correctas) for a in archivadas)
     promedio_aciertos = (correctas / total * 100) if total > 0 else 0
     
     return {
@@ -0,0 +1,302 @@
+"""
+Percentiles aproximados de tiempo de respuesta (DDSketch)
+
+Cada clave (global, cada categoría y cada pregunta) tiene un sketch: los
+tiempos se cuentan en buckets logarítmicos, el bucket i cubre
+(γ^(i-1), γ^i] con γ = (1 + α) / (1 - α), así que cualquier percentil sale
+con error relativo de a lo sumo α (1%) recorriendo los buckets en orden. Con
+los tiempos acotados a MAX_SECONDS hay a lo sumo ~570 buckets por clave, sin
+importar cuántas respuestas haya.
+
+Los sketches se suman bucket a bucket, así que se guardan como filas
+(clave, índice) con contadores que se incrementan con ON CONFLICT, igual que
+answer_buckets: cada worker junta en memoria lo que cambió desde la última
+vez y lo suma a la BD cada RESPONSE_TIME_FLUSH_SECONDS. Al leer se combina lo
+guardado con lo pendiente del propio proceso. Restar (correcciones, sesiones
+borradas) también es exacto: el tiempo anterior cae en el mismo bucket.
+"""
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+from sqlalchemy import literal
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.answer import Answer
+from ..models.archive import ArchivedAnswer
+from ..models.question import Question
+from ..models.response_time import ResponseTimeBucket
+
+
+# Cada cuánto se suman a la BD los tiempos registrados por este proceso
+RESPONSE_TIME_FLUSH_SECONDS = float(os.getenv("RESPONSE_TIME_FLUSH_SECONDS", "10"))
+
+# Cambiar cualquiera de los dos cambia los índices: hay que reconstruir (rebuild_response_times)
+RELATIVE_ACCURACY = 0.01
+MAX_SECONDS = 86400
+ZERO_INDEX = -1
+PERCENTILES = (50, 90, 99)
+
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+GLOBAL_KEY = "global"
+
+
+def category_key(categoria_id: int) -> str:
+    return f"categoria:{categoria_id}"
+
+
+def question_key(question_id: int) -> str:
+    return f"pregunta:{question_id}"
+
+
+def bucket_index(segundos: int) -> int:
+    """Índice del bucket de un tiempo (en segundos enteros)"""
+    if segundos <= 0:
+        return ZERO_INDEX
+    return math.ceil(math.log(min(segundos, MAX_SECONDS)) / _LOG_GAMMA)
+
+
+def bucket_value(indice: int) -> float:
+    """Valor representativo de un bucket (a menos de α de cualquier tiempo que haya caído en él)"""
+    if indice == ZERO_INDEX:
+        return 0.0
+    return 2 * GAMMA ** indice / (GAMMA + 1)
+
+
+class DDSketch:
+    """Buckets de un sketch: {índice: [respuestas, suma de segundos]}"""
+
+    def __init__(self) -> None:
+        self.buckets: dict[int, list[int]] = {}
+
+    def add(self, segundos: int, sign: int = 1) -> None:
+        """Sumar (o restar, con sign=-1) un tiempo"""
+        bucket = self.buckets.setdefault(bucket_index(segundos), [0, 0])
+        bucket[0] += sign
+        bucket[1] += sign * segundos
+
+    def add_bucket(self, indice: int, n: int, suma: int) -> None:
+        bucket = self.buckets.setdefault(indice, [0, 0])
+        bucket[0] += n
+        bucket[1] += suma
+
+    def merge(self, other: "DDSketch") -> None:
+        for indice, (n, suma) in other.buckets.items():
+            self.add_bucket(indice, n, suma)
+
+    # Un bucket puede quedar negativo si se restó un tiempo que nunca se sumó (por ejemplo una
+    # respuesta anterior a los sketches, o lo pendiente de un worker que se cortó): no cuenta
+    @property
+    def count(self) -> int:
+        return sum(n for n, _ in self.buckets.values() if n > 0)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valor aproximado del cuantil q (0 a 1), o None si no hay tiempos"""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        acumulado = 0
+        indices = sorted(i for i, (n, _) in self.buckets.items() if n > 0)
+        for indice in indices:
+            acumulado += self.buckets[indice][0]
+            if acumulado > rank:
+                return bucket_value(indice)
+        return bucket_value(indices[-1])
+
+    def summary(self) -> dict[str, Any]:
+        """Respuestas con tiempo, promedio exacto y percentiles aproximados (segundos)"""
+        total = self.count
+        suma = sum(s for n, s in self.buckets.values() if n > 0)
+        result: dict[str, Any] = {
+            "respuestas_con_tiempo": total,
+            "promedio": round(suma / total, 2) if total > 0 else None,
+        }
+        for p in PERCENTILES:
+            value = self.quantile(p / 100)
+            result[f"p{p}"] = round(value, 1) if value is not None else None
+        return result
+
+
+def _keys(question_id: int, categoria_id: int) -> tuple[str, str, str]:
+    return GLOBAL_KEY, category_key(categoria_id), question_key(question_id)
+
+
+def _add_bucket(db: Session, clave: str, indice: int, n: int, suma: int) -> None:
+    # Igual que timeseries_service._increment: en SQLite un solo INSERT ... ON CONFLICT,
+    # así los workers que vuelcan a la vez la misma clave suman en vez de pisarse
+    values = {"num_respuestas": n, "suma_segundos": suma}
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(ResponseTimeBucket).values(clave=clave, indice=indice, **values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["clave", "indice"],
+            set_={k: getattr(ResponseTimeBucket, k) + v for k, v in values.items()},
+        ))
+        return
+
+    row = db.get(ResponseTimeBucket, (clave, indice))
+    if row is None:
+        db.add(ResponseTimeBucket(clave=clave, indice=indice, **values))
+        return
+    for k, v in values.items():
+        setattr(row, k, getattr(row, k) + v)
+
+
+class ResponseTimeSketches:
+    """
+    Tiempos registrados por este proceso que todavía no se sumaron a la BD.
+
+    Se registra después del commit de la respuesta; si el proceso se corta se
+    pierden a lo sumo los últimos RESPONSE_TIME_FLUSH_SECONDS (los percentiles
+    son aproximados de todas formas, y rebuild_response_times los recalcula).
+    """
+
+    def __init__(self, flush_interval: float = RESPONSE_TIME_FLUSH_SECONDS) -> None:
+        self.flush_interval = flush_interval
+        self._pending: dict[str, DDSketch] = {}
+        # Lo que se está escribiendo: sigue contando al leer hasta que termina el commit
+        self._flushing: dict[str, DDSketch] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self.flushes = 0
+
+    def record(self, question_id: int, categoria_id: int, segundos: Optional[int], sign: int = 1) -> None:
+        """Sumar (o restar) el tiempo de una respuesta a los sketches de su pregunta, su categoría y el global"""
+        if segundos is None:
+            return
+        with self._lock:
+            for clave in _keys(question_id, categoria_id):
+                self._pending.setdefault(clave, DDSketch()).add(segundos, sign)
+
+    def flush(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """
+        Sumar a la BD lo pendiente, en una transacción.
+
+        Returns:
+            Cantidad de buckets escritos
+        """
+        with self._flush_lock:
+            return self._flush(session_factory)
+
+    def _flush(self, session_factory: Callable[[], Session]) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+        rows = [
+            (clave, indice, n, suma)
+            for clave, sketch in pending.items()
+            for indice, (n, suma) in sketch.buckets.items()
+            if n or suma
+        ]
+        if not rows:
+            with self._lock:
+                self._flushing = {}
+            return 0
+        try:
+            with session_factory() as db:
+                for clave, indice, n, suma in rows:
+                    _add_bucket(db, clave, indice, n, suma)
+                db.commit()
+        except Exception:
+            # Vuelve a quedar pendiente para el próximo intento
+            with self._lock:
+                self._flushing = {}
+                for clave, sketch in pending.items():
+                    self._pending.setdefault(clave, DDSketch()).merge(sketch)
+            raise
+        with self._lock:
+            self._flushing = {}
+            self.flushes += 1
+        return len(rows)
+
+    def _safe_flush(self) -> None:
+        try:
+            self.flush()
+        except Exception as exc:
+            print(f"[WARN] No se pudieron guardar los tiempos de respuesta: {exc}")
+
+    def start_flush(self) -> None:
+        """Volcar lo pendiente cada RESPONSE_TIME_FLUSH_SECONDS en segundo plano"""
+        if self.flush_interval <= 0 or self._flusher is not None:
+            return
+
+        def run() -> None:
+            while True:
+                time.sleep(self.flush_interval)
+                self._safe_flush()
+
+        self._flusher = threading.Thread(target=run, name="response-times-flush", daemon=True)
+        self._flusher.start()
+
+    def close(self) -> None:
+        """Volcar lo pendiente al apagar el proceso"""
+        self._safe_flush()
+
+    def get(self, db: Session, claves: Iterable[str]) -> dict[str, DDSketch]:
+        """Sketches guardados más lo pendiente de este proceso (claves sin datos quedan vacías)"""
+        claves = list(claves)
+        sketches = {clave: DDSketch() for clave in claves}
+        for row in db.query(ResponseTimeBucket).filter(ResponseTimeBucket.clave.in_(claves)).all():
+            sketches[str(row.clave)].add_bucket(int(row.indice), int(row.num_respuestas), int(row.suma_segundos))  # type: ignore
+        with self._lock:
+            for clave in claves:
+                for local in (self._flushing, self._pending):
+                    if clave in local:
+                        sketches[clave].merge(local[clave])
+        return sketches
+
+    def summary(self, db: Session, clave: str) -> dict[str, Any]:
+        return self.get(db, [clave])[clave].summary()
+
+
+response_times = ResponseTimeSketches()
+
+
+def rebuild_response_times(db: Session, archive_db: Optional[Session] = None, batch_size: int = 5000) -> int:
+    """
+    Recalcular todos los sketches a partir de las respuestas (principal y archivo).
+
+    Recorre las respuestas por lotes de ID y reemplaza la tabla
+    response_time_buckets en una sola transacción, como backfill_timeseries.
+
+    Returns:
+        Número de respuestas con tiempo procesadas
+    """
+    question_categories = {int(qid): int(cid) for qid, cid in db.query(Question.id, Question.categoria_id).all()}
+    sketches: dict[str, DDSketch] = {}
+    procesadas = 0
+    for session, model in ((db, Answer), (archive_db, ArchivedAnswer)):
+        if session is None:
+            continue
+        categoria_col = model.categoria_id if model is Answer else literal(None)
+        last_id = 0
+        while True:
+            rows = session.query(model.id, model.question_id, model.tiempo_respuesta_segundos, categoria_col).filter(
+                model.id > last_id, model.tiempo_respuesta_segundos.isnot(None)
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            for _, question_id, segundos, categoria_id in rows:
+                # Las principales con la categoría con la que se registraron (como las restas al corregir o borrar)
+                if categoria_id is None:
+                    categoria_id = question_categories.get(int(question_id))
+                    if categoria_id is None:
+                        continue
+                for clave in _keys(int(question_id), categoria_id):
+                    sketches.setdefault(clave, DDSketch()).add(int(segundos))
+                procesadas += 1
+            last_id = int(rows[-1][0])
+
+    db.query(ResponseTimeBucket).delete()
+    db.add_all(
+        ResponseTimeBucket(clave=clave, indice=indice, num_respuestas=n, suma_segundos=suma)
+        for clave, sketch in sketches.items()
+        for indice, (n, suma) in sketch.buckets.items()
+    )
+    db.commit()
+    return procesadas
@@ -0,0 +1,355 @@
+"""
+Repaso espaciado (SM-2) de las preguntas que cada usuario falló
+
+Una pregunta entra en la cola de repaso del usuario la primera vez que la
+falla; desde ahí cada respuesta (acierto o fallo) reprograma su próximo
+repaso. La BD (review_items, con índice (usuario_key, vence_at)) es la fuente
+de verdad y se escribe en la misma transacción que la respuesta. Encima hay una
+caché LRU acotada con las colas de los usuarios activos; los usuarios que no se
+usan hace rato se descartan y se vuelven a leer de la BD cuando hacen falta.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import Session
+from ..models.answer import Answer
+from ..models.archive import ArchivedAnswer, ArchivedQuizSession
+from ..models.quiz_session import QuizSession
+from ..models.review_item import ReviewItem
+from .timeseries_service import as_utc_naive
+
+
+REVIEW_CACHE_USERS = int(os.getenv("REVIEW_CACHE_USERS", "10000"))
+REVIEW_CACHE_ITEMS = int(os.getenv("REVIEW_CACHE_ITEMS", "500000"))
+# Con varios workers cada uno tiene su caché: pasado este tiempo se vuelve a leer de la BD
+REVIEW_CACHE_TTL_SECONDS = float(os.getenv("REVIEW_CACHE_TTL_SECONDS", "60"))
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# Acierto en menos de esto (segundos) cuenta como respuesta fácil (calidad 5)
+FAST_ANSWER_SECONDS = 10
+
+
+@dataclass
+class ReviewState:
+    repeticiones: int = 0
+    intervalo_dias: float = 0.0
+    facilidad: float = DEFAULT_EASE
+    fallos: int = 0
+
+
+def answer_quality(es_correcta: bool, tiempo_respuesta_segundos: Optional[int]) -> int:
+    """Calidad SM-2 (0-5) a partir de una respuesta de opción múltiple"""
+    if not es_correcta:
+        return 1
+    if tiempo_respuesta_segundos is not None and tiempo_respuesta_segundos <= FAST_ANSWER_SECONDS:
+        return 5
+    return 4
+
+
+def next_review(state: ReviewState, quality: int) -> ReviewState:
+    """
+    Un paso de SM-2.
+
+    Un fallo (calidad < 3) reinicia las repeticiones y vuelve a repasar en un
+    día; con aciertos seguidos el intervalo pasa a 1, 6 y después se multiplica
+    por la facilidad, que sube o baja según la calidad (mínimo 1.3).
+    """
+    facilidad = max(MIN_EASE, state.facilidad + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ReviewState(repeticiones=0, intervalo_dias=1.0, facilidad=facilidad, fallos=state.fallos + 1)
+    repeticiones = state.repeticiones + 1
+    if repeticiones == 1:
+        intervalo = 1.0
+    elif repeticiones == 2:
+        intervalo = 6.0
+    else:
+        intervalo = state.intervalo_dias * facilidad
+    return ReviewState(repeticiones=repeticiones, intervalo_dias=intervalo, facilidad=facilidad, fallos=state.fallos)
+
+
+def record_review(
+    db: Session,
+    usuario_key: str,
+    question_id: int,
+    es_correcta: bool,
+    tiempo_respuesta_segundos: Optional[int],
+    ts: datetime,
+) -> Optional[datetime]:
+    """
+    Reprogramar la pregunta en la cola de repaso del usuario.
+
+    Una búsqueda por clave primaria; no hace commit. Los aciertos de preguntas
+    que el usuario nunca falló no se guardan.
+
+    Returns:
+        Nueva fecha de repaso (UTC sin tzinfo), o None si la pregunta no está en la cola
+    """
+    row = db.get(ReviewItem, (usuario_key, question_id))
+    if row is None and es_correcta:
+        return None
+    current = ReviewState(
+        int(row.repeticiones), float(row.intervalo_dias), float(row.facilidad), int(row.fallos)  # type: ignore
+    ) if row is not None else ReviewState()
+    state = next_review(current, answer_quality(es_correcta, tiempo_respuesta_segundos))
+    vence_at = as_utc_naive(ts) + timedelta(days=state.intervalo_dias)
+    _save_review(db, usuario_key, question_id, state, vence_at, row)
+    return vence_at
+
+
+def _save_review(
+    db: Session, usuario_key: str, question_id: int, state: ReviewState, vence_at: datetime, row: Optional[ReviewItem]
+) -> None:
+    values = {
+        "repeticiones": state.repeticiones,
+        "intervalo_dias": state.intervalo_dias,
+        "facilidad": state.facilidad,
+        "fallos": state.fallos,
+        "vence_at": vence_at,
+    }
+    if db.get_bind().dialect.name == "sqlite":
+        # Un solo INSERT ... ON CONFLICT: dos respuestas concurrentes no chocan al crear la fila
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(ReviewItem).values(usuario_key=usuario_key, question_id=question_id, **values)
+        db.execute(stmt.on_conflict_do_update(index_elements=["usuario_key", "question_id"], set_=values))
+    elif row is None:
+        db.add(ReviewItem(usuario_key=usuario_key, question_id=question_id, **values))
+    else:
+        for k, v in values.items():
+            setattr(row, k, v)
+
+
+def replay_review(db: Session, archive_db: Optional[Session], usuario_key: str, question_id: int) -> Optional[datetime]:
+    """
+    Recalcular desde el historial el repaso de una pregunta del usuario.
+
+    Un paso de SM-2 no se puede deshacer, así que al corregir una respuesta se
+    vuelven a aplicar en orden todas las respuestas del usuario a esa pregunta
+    (principal y archivo; son pocas, por los índices de usuario y de pregunta).
+    Si después de la corrección nunca la falló, sale de la cola. No hace commit.
+
+    Returns:
+        Nueva fecha de repaso (UTC sin tzinfo), o None si la pregunta no quedó en la cola
+    """
+    history: list[tuple[datetime, int, bool, Optional[int]]] = []
+    for session, session_model, answer_model in (
+        (db, QuizSession, Answer), (archive_db, ArchivedQuizSession, ArchivedAnswer),
+    ):
+        if session is None:
+            continue
+        rows = session.query(
+            answer_model.created_at, answer_model.id, answer_model.es_correcta, answer_model.tiempo_respuesta_segundos
+        ).join(session_model, session_model.id == answer_model.quiz_session_id).filter(
+            session_model.usuario_key == usuario_key, answer_model.question_id == question_id
+        ).all()
+        history.extend((as_utc_naive(ts or datetime.min), int(i), bool(c), t) for ts, i, c, t in rows)
+
+    state: Optional[ReviewState] = None
+    vence_at: Optional[datetime] = None
+    for ts, _, es_correcta, tiempo in sorted(history):
+        if state is None and es_correcta:
+            continue
+        state = next_review(state or ReviewState(), answer_quality(es_correcta, tiempo))
+        vence_at = ts + timedelta(days=state.intervalo_dias)
+
+    row = db.get(ReviewItem, (usuario_key, question_id))
+    if state is None or vence_at is None:
+        if row is not None:
+            db.delete(row)
+        return None
+    _save_review(db, usuario_key, question_id, state, vence_at, row)
+    return vence_at
+
+
+def _epoch(ts: datetime) -> float:
+    return as_utc_naive(ts).replace(tzinfo=timezone.utc).timestamp()
+
+
+class _UserQueue:
+    """Preguntas de un usuario ordenadas por vencimiento (bisect), como SortedBoard"""
+
+    def __init__(self, items: list[tuple[float, int]]) -> None:
+        self.due = sorted(items)
+        self.by_question = {question_id: vence for vence, question_id in self.due}
+        self.loaded_at = time.monotonic()
+
+    def set(self, question_id: int, vence: float) -> None:
+        self.discard(question_id)
+        bisect.insort(self.due, (vence, question_id))
+        self.by_question[question_id] = vence
+
+    def discard(self, question_id: int) -> None:
+        old = self.by_question.pop(question_id, None)
+        if old is not None:
+            i = bisect.bisect_left(self.due, (old, question_id))
+            if i < len(self.due) and self.due[i] == (old, question_id):
+                del self.due[i]
+
+    def overdue(self, now: float, limit: int, offset: int = 0) -> list[int]:
+        end = bisect.bisect_right(self.due, (now, float("inf")))
+        return [question_id for _, question_id in self.due[offset:min(end, offset + limit)]]
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+
+class ReviewQueue:
+    """
+    Caché LRU de colas de repaso por usuario.
+
+    Acotada por cantidad de usuarios y de preguntas en total; al pasarse se
+    descartan los usuarios usados hace más tiempo. No hay nada que escribir al
+    descartar: la BD ya tiene todo.
+    """
+
+    def __init__(
+        self,
+        max_users: int = REVIEW_CACHE_USERS,
+        max_items: int = REVIEW_CACHE_ITEMS,
+        ttl: float = REVIEW_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.max_users = max_users
+        self.max_items = max_items
+        self.ttl = ttl
+        self._users: OrderedDict[str, _UserQueue] = OrderedDict()
+        self._items = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self) -> None:
+        while self._users and (len(self._users) > self.max_users or self._items > self.max_items):
+            _, queue = self._users.popitem(last=False)
+            self._items -= len(queue)
+            self.evictions += 1
+
+    def _load(self, db: Session, usuario_key: str) -> _UserQueue:
+        rows = db.query(ReviewItem.vence_at, ReviewItem.question_id).filter(
+            ReviewItem.usuario_key == usuario_key
+        ).all()
+        return _UserQueue([(_epoch(vence_at), int(question_id)) for vence_at, question_id in rows])
+
+    def _get(self, db: Session, usuario_key: str) -> _UserQueue:
+        with self._lock:
+            queue = self._users.get(usuario_key)
+            if queue is not None and time.monotonic() - queue.loaded_at <= self.ttl:
+                self._users.move_to_end(usuario_key)
+                self.hits += 1
+                return queue
+        # Se lee fuera del lock; si otro hilo lo cargó a la vez, gana el último
+        queue = self._load(db, usuario_key)
+        with self._lock:
+            old = self._users.pop(usuario_key, None)
+            if old is not None:
+                self._items -= len(old)
+            self._users[usuario_key] = queue
+            self._items += len(queue)
+            self.misses += 1
+            self._evict()
+        return queue
+
+    def overdue(self, db: Session, usuario_key: str, limit: int, offset: int = 0,
+                now: Optional[datetime] = None) -> list[int]:
+        """IDs de las preguntas vencidas del usuario, de la más vencida a la menos"""
+        now_epoch = _epoch(now) if now is not None else time.time()
+        queue = self._get(db, usuario_key)
+        with self._lock:
+            return queue.overdue(now_epoch, limit, offset)
+
+    def update(self, usuario_key: str, question_id: int, vence_at: datetime) -> None:
+        """Reflejar un repaso ya guardado en la BD (solo si el usuario está en la caché)"""
+        with self._lock:
+            queue = self._users.get(usuario_key)
+            if queue is None:
+                return
+            before = len(queue)
+            queue.set(question_id, _epoch(vence_at))
+            self._items += len(queue) - before
+            self._evict()
+
+    def remove(self, usuario_key: str, question_id: int) -> None:
+        """Sacar de la caché una pregunta que salió de la cola en la BD"""
+        with self._lock:
+            queue = self._users.get(usuario_key)
+            if queue is None:
+                return
+            before = len(queue)
+            queue.discard(question_id)
+            self._items += len(queue) - before
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._items = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "usuarios": len(self._users), "preguntas": self._items,
+                "aciertos": self.hits, "fallos": self.misses, "descartados": self.evictions,
+            }
+
+
+review_queue = ReviewQueue()
+
+
+REVIEW_UPSERT_SQL = (
+    "INSERT INTO review_items (usuario_key, question_id, repeticiones, intervalo_dias, facilidad, fallos, vence_at) "
+    "VALUES (:usuario_key, :question_id, :repeticiones, :intervalo_dias, :facilidad, :fallos, :vence_at) "
+    "ON CONFLICT (usuario_key, question_id) DO UPDATE SET "
+    "repeticiones = excluded.repeticiones, intervalo_dias = excluded.intervalo_dias, "
+    "facilidad = excluded.facilidad, fallos = excluded.fallos, vence_at = excluded.vence_at"
+)
+
+
+def replay_params(engine: Engine, valid_questions: set[int], cache_size: int = 100_000) -> Callable[[Row], Optional[dict[str, Any]]]:
+    """
+    Para reconstruir review_items desde el historial con MigrationContext.backfill.
+
+    Cada fila es (id, usuario_key, question_id, es_correcta, tiempo_respuesta_segundos,
+    created_at) y tiene que llegar en orden cronológico. El estado de cada
+    (usuario, pregunta) se guarda en una caché acotada; si no está, se lee de
+    review_items (lo que ya escribieron los lotes anteriores).
+    """
+    states: OrderedDict[tuple[str, int], Optional[ReviewState]] = OrderedDict()
+    lookup = text(
+        "SELECT repeticiones, intervalo_dias, facilidad, fallos FROM review_items "
+        "WHERE usuario_key = :usuario_key AND question_id = :question_id"
+    )
+
+    def make_params(row: Row) -> Optional[dict[str, Any]]:
+        _, usuario_key, question_id, es_correcta, tiempo, created_at = row
+        if question_id not in valid_questions:
+            return None
+        key = (usuario_key, question_id)
+        if key in states:
+            current = states.pop(key)
+        else:
+            with engine.connect() as conn:
+                found = conn.execute(lookup, {"usuario_key": usuario_key, "question_id": question_id}).first()
+            current = ReviewState(int(found[0]), float(found[1]), float(found[2]), int(found[3])) if found else None
+        if current is None and es_correcta:
+            states[key] = None
+            return None
+        state = next_review(current or ReviewState(), answer_quality(bool(es_correcta), tiempo))
+        states[key] = state
+        if len(states) > cache_size:
+            states.popitem(last=False)
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        return {
+            "usuario_key": usuario_key, "question_id": question_id,
+            "repeticiones": state.repeticiones, "intervalo_dias": state.intervalo_dias,
+            "facilidad": state.facilidad, "fallos": state.fallos,
+            "vence_at": as_utc_naive(created_at) + timedelta(days=state.intervalo_dias),
+        }
+
+    return make_params
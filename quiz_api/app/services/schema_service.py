@@ -0,0 +1,309 @@
+"""
+Versión del esquema: el arranque solo aplica migraciones cuando la versión guardada quedó atrás
+
+Para cambiar el esquema (tabla, columna o índice nuevo) se cambia el modelo y se
+agrega una Migration al final de MIGRATIONS con el paso equivalente para las
+bases que ya existen (create_all no modifica tablas existentes).
+"""
+import json
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from ..database import Base, ArchiveBase
+from ..models.user_stats import UserStats, UserCategoryStats
+from ..models.review_item import ReviewItem
+from ..models.option_stats import QuestionOptionStats
+from ..models.answer_bucket import AnswerBucket
+from ..models.response_time import ResponseTimeBucket
+from ..models.unique_count import UniqueCountSketch
+from .catalog_service import ensure_catalogs, load_catalogs
+from .migration_service import (
+    Migration, MigrationContext, get_schema_version, run_migrations,
+)
+from .search_service import ensure_search_index
+from .review_service import REVIEW_UPSERT_SQL, replay_params
+from .option_stats_service import OPTION_UPSERT_SQL
+from .timeseries_service import backfill_timeseries
+from .response_time_service import rebuild_response_times
+from .cardinality_service import rebuild_unique_counts
+from .user_stats_service import normalize_user
+
+
+def _create_missing_indexes(engine: Engine) -> None:
+    # create_all no agrega índices a tablas que ya existían. Los índices sobre columnas que
+    # todavía no existen (las agrega una migración posterior, que también crea su índice) se saltean
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        existing = {
+            table.name: {c["name"] for c in inspector.get_columns(table.name)}
+            for table in Base.metadata.sorted_tables
+            if inspector.has_table(table.name)
+        }
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if not {c.name for c in index.columns} <= existing.get(table.name, set()):
+                continue
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except IntegrityError:
+                print(f"[WARN] No se pudo crear el índice único {index.name}: hay filas duplicadas")
+
+
+def _baseline(ctx: MigrationContext) -> None:
+    # Bases nuevas o anteriores a schema_version: tablas, catálogos, num_opciones, FTS e índices
+    Base.metadata.create_all(bind=ctx.engine)
+    ensure_catalogs(ctx.engine)
+    ctx.add_column("questions", "num_opciones", "INTEGER")
+    ctx.backfill(
+        "num_opciones",
+        "SELECT id, opciones FROM questions WHERE id > :ultimo_id AND num_opciones IS NULL ORDER BY id LIMIT :limite",
+        "UPDATE questions SET num_opciones = :n WHERE id = :id",
+        lambda row: {"id": row[0], "n": len(json.loads(row[1] or "[]"))},
+    )
+    ensure_search_index(ctx.engine)
+    _create_missing_indexes(ctx.engine)
+
+
+def _index_answers_question(ctx: MigrationContext) -> None:
+    # Las estadísticas por pregunta recorrían toda la tabla answers
+    ctx.create_index("ix_answers_question_id", "answers", ["question_id"])
+
+
+def _add_user_key(ctx: MigrationContext) -> None:
+    # Sirve igual para la BD principal y la de archivo (las dos tablas se llaman quiz_sessions)
+    ctx.add_column("quiz_sessions", "usuario_key", "VARCHAR")
+    ctx.backfill(
+        "usuario_key",
+        "SELECT id, usuario_nombre FROM quiz_sessions "
+        "WHERE id > :ultimo_id AND usuario_key IS NULL AND usuario_nombre IS NOT NULL ORDER BY id LIMIT :limite",
+        "UPDATE quiz_sessions SET usuario_key = :key WHERE id = :id",
+        lambda row: {"id": row[0], "key": normalize_user(row[1])},
+    )
+
+
+def _index_user_key(ctx: MigrationContext) -> None:
+    _add_user_key(ctx)
+    ctx.create_index("ix_quiz_sessions_usuario", "quiz_sessions", ["usuario_key", "id"])
+
+
+def _index_archived_user_key(ctx: MigrationContext) -> None:
+    _add_user_key(ctx)
+    ctx.create_index("ix_archived_sessions_usuario", "quiz_sessions", ["usuario_key", "id"])
+
+
+def _user_stats(ctx: MigrationContext) -> None:
+    # Totales por usuario a partir de las sesiones completadas (principal y archivo)
+    Base.metadata.create_all(bind=ctx.engine, tables=[UserStats.__table__, UserCategoryStats.__table__])  # type: ignore
+    greatest = "max" if ctx.engine.dialect.name == "sqlite" else "GREATEST"
+    sessions_select = (
+        "SELECT id, usuario_key, usuario_nombre, puntuacion_total, preguntas_respondidas, preguntas_correctas, fecha_fin "
+        "FROM quiz_sessions WHERE id > :ultimo_id AND estado = 'completado' AND usuario_key IS NOT NULL "
+        "ORDER BY id LIMIT :limite"
+    )
+    sessions_upsert = (
+        "INSERT INTO user_stats (usuario_key, usuario_nombre, num_sesiones, suma_puntuacion, mejor_puntuacion, "
+        "preguntas_respondidas, preguntas_correctas, ultima_sesion_at) "
+        "VALUES (:key, :nombre, 1, :puntuacion, :puntuacion, :respondidas, :correctas, :fecha_fin) "
+        "ON CONFLICT (usuario_key) DO UPDATE SET "
+        "usuario_nombre = excluded.usuario_nombre, "
+        "num_sesiones = user_stats.num_sesiones + 1, "
+        "suma_puntuacion = user_stats.suma_puntuacion + excluded.suma_puntuacion, "
+        f"mejor_puntuacion = {greatest}(user_stats.mejor_puntuacion, excluded.mejor_puntuacion), "
+        "preguntas_respondidas = user_stats.preguntas_respondidas + excluded.preguntas_respondidas, "
+        "preguntas_correctas = user_stats.preguntas_correctas + excluded.preguntas_correctas, "
+        "ultima_sesion_at = excluded.ultima_sesion_at"
+    )
+
+    def session_params(row) -> dict:  # type: ignore
+        return {
+            "key": row[1], "nombre": row[2], "puntuacion": row[3] or 0,
+            "respondidas": row[4] or 0, "correctas": row[5] or 0, "fecha_fin": row[6],
+        }
+
+    answers_upsert = (
+        "INSERT INTO user_category_stats (usuario_key, categoria_id, num_respuestas, num_correctas) "
+        "VALUES (:key, :categoria_id, 1, :correcta) "
+        "ON CONFLICT (usuario_key, categoria_id) DO UPDATE SET "
+        "num_respuestas = user_category_stats.num_respuestas + 1, "
+        "num_correctas = user_category_stats.num_correctas + excluded.num_correctas"
+    )
+    answers_select = (
+        "SELECT a.id, s.usuario_key, {categoria}, a.es_correcta FROM answers a "
+        "JOIN quiz_sessions s ON s.id = a.quiz_session_id {join} "
+        "WHERE a.id > :ultimo_id AND s.estado = 'completado' AND s.usuario_key IS NOT NULL "
+        "ORDER BY a.id LIMIT :limite"
+    )
+
+    ctx.backfill("sesiones", sessions_select, sessions_upsert, session_params)
+    ctx.backfill(
+        "respuestas",
+        answers_select.format(categoria="q.categoria_id", join="JOIN questions q ON q.id = a.question_id"),
+        answers_upsert,
+        lambda row: {"key": row[1], "categoria_id": row[2], "correcta": 1 if row[3] else 0},
+    )
+    if ctx.archive_engine is None:
+        return
+
+    # Las respuestas archivadas apuntan a preguntas de la BD principal
+    with ctx.engine.connect() as conn:
+        question_categories = dict(conn.execute(text("SELECT id, categoria_id FROM questions")).all())
+    ctx.backfill("sesiones_archivadas", sessions_select, sessions_upsert, session_params, source=ctx.archive_engine)
+    ctx.backfill(
+        "respuestas_archivadas",
+        answers_select.format(categoria="a.question_id", join=""),
+        answers_upsert,
+        lambda row: (
+            {"key": row[1], "categoria_id": question_categories[row[2]], "correcta": 1 if row[3] else 0}
+            if row[2] in question_categories else None
+        ),
+        source=ctx.archive_engine,
+    )
+
+
+def _review_items(ctx: MigrationContext) -> None:
+    # Colas de repaso reconstruidas desde el historial: primero las respuestas archivadas (más viejas)
+    Base.metadata.create_all(bind=ctx.engine, tables=[ReviewItem.__table__])  # type: ignore
+    with ctx.engine.connect() as conn:
+        valid = {int(i) for (i,) in conn.execute(text("SELECT id FROM questions"))}
+    make_params = replay_params(ctx.engine, valid)
+    select = (
+        "SELECT a.id, s.usuario_key, a.question_id, a.es_correcta, a.tiempo_respuesta_segundos, a.created_at "
+        "FROM answers a JOIN quiz_sessions s ON s.id = a.quiz_session_id "
+        "WHERE a.id > :ultimo_id AND s.usuario_key IS NOT NULL ORDER BY a.id LIMIT :limite"
+    )
+    if ctx.archive_engine is not None:
+        ctx.backfill("repasos_archivados", select, REVIEW_UPSERT_SQL, make_params, source=ctx.archive_engine)
+    ctx.backfill("repasos", select, REVIEW_UPSERT_SQL, make_params)
+
+
+def _option_stats(ctx: MigrationContext) -> None:
+    # Contadores por opción desde las respuestas existentes (principal y archivo)
+    Base.metadata.create_all(bind=ctx.engine, tables=[QuestionOptionStats.__table__])  # type: ignore
+    select = (
+        "SELECT id, question_id, respuesta_seleccionada, es_correcta FROM answers "
+        "WHERE id > :ultimo_id ORDER BY id LIMIT :limite"
+    )
+    ctx.backfill(
+        "opciones",
+        select,
+        OPTION_UPSERT_SQL,
+        lambda row: {"question_id": row[1], "opcion": row[2], "correcta": 1 if row[3] else 0},
+    )
+    if ctx.archive_engine is None:
+        return
+
+    with ctx.engine.connect() as conn:
+        valid = {int(i) for (i,) in conn.execute(text("SELECT id FROM questions"))}
+    ctx.backfill(
+        "opciones_archivadas",
+        select,
+        OPTION_UPSERT_SQL,
+        lambda row: (
+            {"question_id": row[1], "opcion": row[2], "correcta": 1 if row[3] else 0}
+            if row[1] in valid else None
+        ),
+        source=ctx.archive_engine,
+    )
+
+
+def _answer_category(ctx: MigrationContext) -> None:
+    # Categoría de cada respuesta al momento de responder; las existentes toman la actual de su pregunta
+    ctx.add_column("answers", "categoria_id", "INTEGER REFERENCES categories(id)")
+    ctx.backfill(
+        "categoria_id",
+        "SELECT a.id, q.categoria_id FROM answers a JOIN questions q ON q.id = a.question_id "
+        "WHERE a.id > :ultimo_id AND a.categoria_id IS NULL ORDER BY a.id LIMIT :limite",
+        "UPDATE answers SET categoria_id = :categoria_id WHERE id = :id",
+        lambda row: {"id": row[0], "categoria_id": row[1]},
+    )
+
+
+def _response_times(ctx: MigrationContext) -> None:
+    # Sketches de tiempos desde las respuestas existentes; se escriben al final en una transacción
+    # (son pocas filas por clave), así que volver a correrla los recalcula desde cero
+    Base.metadata.create_all(bind=ctx.engine, tables=[ResponseTimeBucket.__table__])  # type: ignore
+    with Session(ctx.engine) as db:
+        if ctx.archive_engine is None:
+            n = rebuild_response_times(db)
+        else:
+            with Session(ctx.archive_engine) as archive_db:
+                n = rebuild_response_times(db, archive_db)
+    print(f"  ✓ tiempos de respuesta: {n} respuestas")
+
+
+def _unique_counts(ctx: MigrationContext) -> None:
+    # HLL de usuarios y sesiones por día desde el historial, igual que _response_times
+    Base.metadata.create_all(bind=ctx.engine, tables=[UniqueCountSketch.__table__])  # type: ignore
+    with Session(ctx.engine) as db:
+        if ctx.archive_engine is None:
+            n = rebuild_unique_counts(db)
+        else:
+            with Session(ctx.archive_engine) as archive_db:
+                n = rebuild_unique_counts(db, archive_db)
+    print(f"  ✓ usuarios y sesiones únicos: {n} filas")
+
+
+def _timeseries(ctx: MigrationContext) -> None:
+    # Agregados por hora/día desde el historial (principal y archivo): las correcciones y los
+    # borrados restan de answer_buckets, así que tiene que estar completa. Reemplaza la tabla entera
+    Base.metadata.create_all(bind=ctx.engine, tables=[AnswerBucket.__table__])  # type: ignore
+    with Session(ctx.engine) as db:
+        if ctx.archive_engine is None:
+            n = backfill_timeseries(db)
+        else:
+            with Session(ctx.archive_engine) as archive_db:
+                n = backfill_timeseries(db, archive_db)
+    print(f"  ✓ agregados por hora/día: {n} respuestas")
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "esquema base", _baseline),
+    Migration(2, "índice answers.question_id", _index_answers_question),
+    Migration(3, "clave de usuario en quiz_sessions", _index_user_key),
+    Migration(4, "totales por usuario", _user_stats),
+    Migration(5, "colas de repaso", _review_items),
+    Migration(6, "respuestas por opción", _option_stats),
+    Migration(7, "categoría de cada respuesta", _answer_category),
+    Migration(8, "percentiles de tiempo de respuesta", _response_times),
+    Migration(9, "usuarios y sesiones únicos por día", _unique_counts),
+    Migration(10, "agregados por hora y día", _timeseries),
+]
+
+ARCHIVE_MIGRATIONS: list[Migration] = [
+    Migration(1, "esquema base", lambda ctx: ArchiveBase.metadata.create_all(bind=ctx.engine)),
+    Migration(2, "clave de usuario en quiz_sessions", _index_archived_user_key),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+ARCHIVE_SCHEMA_VERSION = ARCHIVE_MIGRATIONS[-1].version
+
+
+def ensure_schema(engine: Engine, archive_engine: Engine) -> bool:
+    """
+    Dejar las bases listas para servir.
+
+    Si la versión guardada coincide con SCHEMA_VERSION solo se cargan los
+    catálogos (una consulta); si no, se aplican las migraciones pendientes.
+    En bases grandes conviene aplicarlas antes con `python -m app.migrate`,
+    con la versión anterior de la API todavía atendiendo.
+
+    Returns:
+        True si hubo que crear o actualizar el esquema
+    """
+    changed = False
+    # Primero el archivo: las migraciones de la BD principal pueden leer sus sesiones
+    if (get_schema_version(archive_engine) or 0) < ARCHIVE_SCHEMA_VERSION:
+        run_migrations(archive_engine, ARCHIVE_MIGRATIONS)
+        changed = True
+
+    version = get_schema_version(engine)
+    if version is not None and version > SCHEMA_VERSION:
+        print(f"[WARN] La BD está en la versión {version} y este código espera la {SCHEMA_VERSION}")
+    if version is not None and version >= SCHEMA_VERSION:
+        load_catalogs(engine)
+        return changed
+
+    run_migrations(engine, MIGRATIONS, archive_engine=archive_engine)
+    load_catalogs(engine)
+    return True
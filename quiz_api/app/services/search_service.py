@@ -0,0 +1,154 @@
+"""
+Búsqueda de texto completo sobre el banco de preguntas (SQLite FTS5)
+"""
+from typing import Any, Iterable
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..models.question import Question
+from .quiz_service import _normalize_text
+
+
+FTS_TABLE = "questions_fts"
+
+
+def _is_sqlite(bind: Any) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def _document(q: Question) -> dict[str, Any]:
+    """Texto normalizado (sin acentos, minúsculas) que se guarda en el índice"""
+    opciones = q.opciones if isinstance(q.opciones, list) else []
+    return {
+        "rowid": q.id,
+        "pregunta": _normalize_text(str(q.pregunta or "")),
+        "explicacion": _normalize_text(str(q.explicacion or "")),
+        "opciones": _normalize_text(" ".join(str(o) for o in opciones)),
+    }
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """
+    Crear la tabla virtual FTS5 si no existe y poblarla con las preguntas activas.
+
+    Solo se reconstruye cuando la tabla se crea por primera vez; después
+    se mantiene sincronizada desde el router de preguntas.
+    """
+    if not _is_sqlite(engine):
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        if exists:
+            return
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(pregunta, explicacion, opciones)"
+        ))
+    with Session(bind=engine) as db:
+        rebuild_search_index(db)
+
+
+def rebuild_search_index(db: Session, batch_size: int = 1000) -> int:
+    """
+    Reconstruir el índice completo a partir de la tabla de preguntas.
+
+    Returns:
+        Número de preguntas indexadas
+    """
+    if not _is_sqlite(db.get_bind()):
+        return 0
+    db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    total = 0
+    last_id = 0
+    while True:
+        batch = db.query(Question).filter(
+            Question.is_active == True,
+            Question.id > last_id
+        ).order_by(Question.id).limit(batch_size).all()
+        if not batch:
+            break
+        _insert(db, batch)
+        total += len(batch)
+        last_id = int(batch[-1].id)  # type: ignore
+    db.commit()
+    return total
+
+
+def _insert(db: Session, questions: Iterable[Question]) -> None:
+    rows = [_document(q) for q in questions]
+    if rows:
+        db.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE} (rowid, pregunta, explicacion, opciones) "
+                "VALUES (:rowid, :pregunta, :explicacion, :opciones)"
+            ),
+            rows,
+        )
+
+
+def index_questions(db: Session, questions: Iterable[Question]) -> None:
+    """
+    Insertar o reemplazar preguntas en el índice (sin hacer commit).
+
+    Las preguntas inactivas se quitan del índice.
+    """
+    if not _is_sqlite(db.get_bind()):
+        return
+    questions = list(questions)
+    ids = [{"rowid": q.id} for q in questions]
+    if ids:
+        db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), ids)
+    _insert(db, [q for q in questions if q.is_active is not False])
+
+
+def _fts_query(q: str) -> str:
+    # Cada término se cita (para escapar la sintaxis de FTS5) y se busca por prefijo
+    terms = [t for t in "".join(ch if ch.isalnum() else " " for ch in _normalize_text(q)).split() if t]
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search_questions(db: Session, q: str, skip: int = 0, limit: int = 10) -> list[Question]:
+    """
+    Buscar preguntas activas por texto, ordenadas por relevancia (bm25).
+
+    La búsqueda no distingue mayúsculas ni acentos.
+
+    Args:
+        db: Sesión de base de datos
+        q: Texto a buscar
+        skip: Número de resultados a saltar
+        limit: Número máximo de resultados
+
+    Returns:
+        Lista de preguntas ordenadas por relevancia
+    """
+    match = _fts_query(q)
+    if not match:
+        return []
+
+    if not _is_sqlite(db.get_bind()):
+        pattern = f"%{q.strip()}%"
+        return db.query(Question).filter(
+            Question.is_active == True,
+            Question.pregunta.ilike(pattern)
+        ).order_by(Question.id).offset(skip).limit(limit).all()
+
+    ids = [row[0] for row in db.execute(
+        text(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+            f"ORDER BY bm25({FTS_TABLE}) LIMIT :limit OFFSET :skip"
+        ),
+        {"match": match, "limit": limit, "skip": skip},
+    )]
+    if not ids:
+        return []
+
+    by_id = {
+        q.id: q for q in db.query(Question).filter(
+            Question.id.in_(ids),
+            Question.is_active == True
+        ).all()
+    }
+    return [by_id[i] for i in ids if i in by_id]
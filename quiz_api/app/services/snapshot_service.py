@@ -0,0 +1,271 @@
+"""
+Snapshot del banco de preguntas: un archivo inmutable que se lee con mmap
+
+Las preguntas activas se escriben ordenadas por ID en un formato columnar:
+
+    encabezado   magic, versión, cantidad, tamaño del blob
+    ids          int64 x n (ordenados: la búsqueda por ID es un bisect)
+    categorías   int32 x n
+    dificultades int32 x n
+    offsets      int64 x (n + 1), dentro del blob
+    blob         el JSON de cada pregunta (mismo formato que questions_json)
+
+Servir una pregunta o un listado es copiar rebanadas del blob, sin tocar la
+BD. Todos los workers mapean el mismo archivo, así que comparten la memoria
+del page cache. Cada versión se escribe en un archivo temporal y se cambia con
+os.replace (atómico); los lectores notan el cambio con un stat y mapean el
+nuevo. Los números se guardan en el orden de bytes de la máquina: el archivo
+se genera y se lee en el mismo host.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional, Sequence
+from sqlalchemy.orm import Session
+from ..database import SessionLocal, sqlite_file_path, DATABASE_URL
+from ..models.question import Question
+from ..schemas.question import question_json
+
+
+def _default_path() -> str:
+    db_path = sqlite_file_path(DATABASE_URL)
+    return f"{db_path}.preguntas.snap" if db_path else ""
+
+
+# Vacío lo desactiva (con otra BD que no sea un archivo SQLite hay que definirlo)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", _default_path())
+# Después de un cambio se espera esto antes de regenerar (junta ráfagas de cambios)
+SNAPSHOT_DEBOUNCE_SECONDS = float(os.getenv("SNAPSHOT_DEBOUNCE_SECONDS", "1"))
+# Regeneración periódica, para cambios hechos fuera de la API (scripts, otra instancia); 0 la desactiva
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "300"))
+
+MAGIC = b"QSNAP001"
+HEADER = struct.Struct("=8sqqq")  # magic, versión (ns), cantidad, tamaño del blob
+
+
+def write_snapshot(path: str, rows: Iterable[tuple[int, int, int, bytes]], version: int) -> int:
+    """
+    Escribir un snapshot y reemplazar el anterior de forma atómica.
+
+    Args:
+        path: Archivo destino
+        rows: (id, categoria_id, dificultad_id, JSON) ordenados por id
+        version: Número de versión (se usa el momento de generación en ns)
+
+    Returns:
+        Cantidad de preguntas escritas
+    """
+    ids, cats, difs = array("q"), array("i"), array("i")
+    offsets = array("q", [0])
+    blob = bytearray()
+    for question_id, categoria_id, dificultad_id, body in rows:
+        ids.append(question_id)
+        cats.append(categoria_id)
+        difs.append(dificultad_id)
+        blob += body
+        offsets.append(len(blob))
+
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, version, len(ids), len(blob)))
+            for column in (ids, cats, difs, offsets):
+                data = column.tobytes()
+                f.write(data)
+                f.write(b"\0" * (-len(data) % 8))
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return len(ids)
+
+
+def build_snapshot(db: Session, path: str, batch_size: int = 1000) -> int:
+    """Generar el snapshot con las preguntas activas de la BD"""
+    def rows() -> Iterable[tuple[int, int, int, bytes]]:
+        query = db.query(Question).filter(Question.is_active == True).order_by(Question.id)
+        for q in query.yield_per(batch_size):
+            yield int(q.id), int(q.categoria_id), int(q.dificultad_id), question_json(q).encode("utf-8")  # type: ignore
+
+    return write_snapshot(path, rows(), time.time_ns())
+
+
+class QuestionSnapshot:
+    """Un snapshot mapeado en memoria (solo lectura)"""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.file_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        magic, self.version, n, blob_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} no es un snapshot de preguntas")
+
+        view = memoryview(self._mm)
+        pos = HEADER.size
+
+        def column(fmt: str, count: int) -> memoryview:
+            nonlocal pos
+            size = struct.calcsize(fmt) * count
+            col = view[pos:pos + size].cast(fmt)
+            pos += size + (-size % 8)
+            return col
+
+        self.ids = column("q", n)
+        self.categorias = column("i", n)
+        self.dificultades = column("i", n)
+        self._offsets = column("q", n + 1)
+        self._blob = view[pos:pos + blob_size]
+        self._filtered: dict[tuple[Optional[int], Optional[int]], Sequence[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _item(self, i: int) -> memoryview:
+        return self._blob[self._offsets[i]:self._offsets[i + 1]]
+
+    def get(self, question_id: int) -> Optional[bytes]:
+        """JSON de una pregunta, o None si no está (inactiva o más nueva que el snapshot)"""
+        i = bisect_left(self.ids, question_id)
+        if i < len(self.ids) and self.ids[i] == question_id:
+            return bytes(self._item(i))
+        return None
+
+    def positions(self, categoria_id: Optional[int] = None, dificultad_id: Optional[int] = None) -> Sequence[int]:
+        """Posiciones (en orden de ID) de las preguntas con esa categoría y dificultad"""
+        if categoria_id is None and dificultad_id is None:
+            return range(len(self))
+        key = (categoria_id, dificultad_id)
+        found = self._filtered.get(key)
+        if found is None:
+            # El snapshot no cambia: cada combinación de filtros se recorre una sola vez
+            found = array("l", (
+                i for i in range(len(self))
+                if (categoria_id is None or self.categorias[i] == categoria_id)
+                and (dificultad_id is None or self.dificultades[i] == dificultad_id)
+            ))
+            with self._lock:
+                self._filtered[key] = found
+        return found
+
+    def json(self, positions: Iterable[int]) -> bytes:
+        """Cuerpo JSON (una lista) con las preguntas de esas posiciones"""
+        return b"[" + b",".join(self._item(i) for i in positions) + b"]"
+
+
+class SnapshotStore:
+    """
+    El snapshot vigente del proceso y su regeneración.
+
+    Tras un cambio en el banco (`invalidate`) este proceso vuelve a leer de la
+    BD hasta que termina la regeneración, así que lee lo que acaba de escribir;
+    los demás workers siguen con la versión anterior hasta que se reemplaza el
+    archivo (SNAPSHOT_DEBOUNCE_SECONDS más lo que tarde en generarse).
+    """
+
+    def __init__(
+        self,
+        path: str = SNAPSHOT_PATH,
+        debounce: float = SNAPSHOT_DEBOUNCE_SECONDS,
+        interval: float = SNAPSHOT_INTERVAL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.debounce = debounce
+        self.interval = interval
+        self._snapshot: Optional[QuestionSnapshot] = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._refresher: Optional[threading.Thread] = None
+        # Cambios pedidos y cambios ya incluidos en un snapshot generado por este proceso.
+        # Arranca "sucio": un archivo de una corrida anterior puede no reflejar la BD
+        self._changes = 1
+        self._built = 0
+        self.builds = 0
+
+    def current(self) -> Optional[QuestionSnapshot]:
+        """El snapshot a usar, o None si hay que leer de la BD"""
+        if not self.path or self._changes != self._built:
+            return None
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.file_key == key:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.file_key != key:
+                try:
+                    # El mapeo anterior se libera cuando ningún request lo usa
+                    self._snapshot = QuestionSnapshot(self.path)
+                except (OSError, ValueError) as exc:
+                    print(f"[WARN] No se pudo abrir el snapshot de preguntas: {exc}")
+                    return None
+            return self._snapshot
+
+    def rebuild(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """Generar un snapshot nuevo desde la BD principal"""
+        if not self.path:
+            return 0
+        with self._build_lock:
+            changes = self._changes
+            with session_factory() as db:
+                n = build_snapshot(db, self.path)
+            with self._lock:
+                self._built = max(self._built, changes)
+                self.builds += 1
+        return n
+
+    def _safe_rebuild(self) -> None:
+        try:
+            self.rebuild()
+        except Exception as exc:
+            print(f"[WARN] No se pudo regenerar el snapshot de preguntas: {exc}")
+
+    def _run_scheduled(self) -> None:
+        with self._lock:
+            self._timer = None
+        self._safe_rebuild()
+
+    def invalidate(self) -> None:
+        """Avisar que cambió el banco de preguntas (se regenera en segundo plano)"""
+        if not self.path:
+            return
+        with self._lock:
+            self._changes += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.debounce, self._run_scheduled)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def start_refresh(self) -> None:
+        """Regenerar cada SNAPSHOT_INTERVAL_SECONDS (si ningún worker lo hizo hace menos)"""
+        if not self.path or self.interval <= 0 or self._refresher is not None:
+            return
+
+        def run() -> None:
+            while True:
+                time.sleep(self.interval)
+                try:
+                    age = time.time() - os.stat(self.path).st_mtime
+                except OSError:
+                    age = self.interval
+                if age >= self.interval:
+                    self._safe_rebuild()
+
+        self._refresher = threading.Thread(target=run, name="snapshot-refresh", daemon=True)
+        self._refresher.start()
+
+
+question_snapshots = SnapshotStore()
@@ -0,0 +1,183 @@
+"""
+Series de tiempo de respuestas con agregados pre-calculados por hora y día
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from sqlalchemy import func, literal
+from sqlalchemy.orm import Session
+from ..models.answer import Answer
+from ..models.answer_bucket import AnswerBucket
+from ..models.archive import ArchivedAnswer
+from ..models.question import Question
+from ..models.category import categories
+
+
+BUCKETS = ("hour", "day")
+
+
+def as_utc_naive(ts: datetime) -> datetime:
+    """Convertir a UTC sin tzinfo, que es como se guardan las fechas en la BD"""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts: datetime, bucket: str) -> datetime:
+    """Inicio del intervalo (hora o día, UTC sin tzinfo) que contiene a ts"""
+    ts = as_utc_naive(ts)
+    if bucket == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _increment(db: Session, bucket: str, inicio: datetime, categoria: str,
+               respuestas: int, correctas: int, suma_tiempo: int, con_tiempo: int) -> None:
+    values = {
+        "num_respuestas": respuestas,
+        "num_correctas": correctas,
+        "suma_tiempo_segundos": suma_tiempo,
+        "num_con_tiempo": con_tiempo,
+    }
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(AnswerBucket).values(bucket=bucket, inicio=inicio, categoria=categoria, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket", "inicio", "categoria"],
+            set_={k: getattr(AnswerBucket, k) + v for k, v in values.items()},
+        )
+        db.execute(stmt)
+        return
+
+    row = db.get(AnswerBucket, (bucket, inicio, categoria))
+    if row is None:
+        db.add(AnswerBucket(bucket=bucket, inicio=inicio, categoria=categoria, **values))
+    else:
+        for k, v in values.items():
+            setattr(row, k, getattr(row, k) + v)
+
+
+def record_answer(
+    db: Session,
+    categoria: str,
+    es_correcta: bool,
+    tiempo_respuesta_segundos: Optional[int],
+    ts: datetime,
+    sign: int = 1,
+) -> None:
+    """
+    Sumar (sign=1) o restar (sign=-1) una respuesta en los agregados por hora y día.
+
+    No hace commit: se debe llamar dentro de la misma transacción que escribe la respuesta.
+    """
+    tiempo = tiempo_respuesta_segundos
+    for bucket in BUCKETS:
+        _increment(
+            db, bucket, bucket_start(ts, bucket), categoria,
+            sign,
+            sign if es_correcta else 0,
+            sign * tiempo if tiempo is not None else 0,
+            sign if tiempo is not None else 0,
+        )
+
+
+def get_timeseries(
+    db: Session,
+    bucket: str,
+    desde: datetime,
+    hasta: datetime,
+    categoria: Optional[str] = None,
+) -> list[dict[str, Any]]:
+    """
+    Leer la serie de tiempo entre desde y hasta (solo intervalos con respuestas)
+
+    El costo depende del número de intervalos, no del número de respuestas.
+    """
+    query = db.query(
+        AnswerBucket.inicio,
+        func.sum(AnswerBucket.num_respuestas),
+        func.sum(AnswerBucket.num_correctas),
+        func.sum(AnswerBucket.suma_tiempo_segundos),
+        func.sum(AnswerBucket.num_con_tiempo),
+    ).filter(
+        AnswerBucket.bucket == bucket,
+        AnswerBucket.inicio >= bucket_start(desde, bucket),
+        AnswerBucket.inicio <= as_utc_naive(hasta),
+    )
+    if categoria:
+        query = query.filter(AnswerBucket.categoria == categoria)
+
+    serie: list[dict[str, Any]] = []
+    for inicio, total, correctas, suma_tiempo, con_tiempo in query.group_by(AnswerBucket.inicio).order_by(AnswerBucket.inicio):
+        if not total:
+            continue
+        serie.append({
+            "inicio": inicio,
+            "num_respuestas": int(total),
+            "num_correctas": int(correctas),
+            "tasa_acierto": round(correctas / total * 100, 2),
+            "tiempo_promedio_segundos": round(suma_tiempo / con_tiempo, 2) if con_tiempo else None,
+        })
+    return serie
+
+
+def backfill_timeseries(db: Session, archive_db: Optional[Session] = None, batch_size: int = 5000) -> int:
+    """
+    Recalcular todos los agregados a partir de las respuestas (principal y archivo).
+
+    Recorre las respuestas por lotes de ID y reemplaza la tabla answer_buckets
+    en una sola transacción. Archivar no resta de los agregados, así que sin
+    archive_db se pierde lo ya archivado.
+
+    Returns:
+        Número de respuestas procesadas
+    """
+    # Las archivadas no guardan su categoría: toman la actual de la pregunta, como en rebuild_response_times
+    question_categories = {int(qid): int(cid) for qid, cid in db.query(Question.id, Question.categoria_id).all()}
+    totals: dict[tuple[str, datetime, str], list[int]] = {}
+    procesadas = 0
+    for session, model in ((db, Answer), (archive_db, ArchivedAnswer)):
+        if session is None:
+            continue
+        categoria_col = model.categoria_id if model is Answer else literal(None)
+        last_id = 0
+        while True:
+            rows = session.query(
+                model.id, model.question_id, model.created_at, model.es_correcta,
+                model.tiempo_respuesta_segundos, categoria_col,
+            ).filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            for _, question_id, created_at, es_correcta, tiempo, categoria_id in rows:
+                if categoria_id is None:
+                    categoria_id = question_categories.get(int(question_id))
+                    if categoria_id is None:
+                        continue
+                categoria = categories.name_of(categoria_id)
+                for bucket in BUCKETS:
+                    acc = totals.setdefault((bucket, bucket_start(created_at, bucket), categoria), [0, 0, 0, 0])
+                    acc[0] += 1
+                    acc[1] += 1 if es_correcta else 0
+                    if tiempo is not None:
+                        acc[2] += tiempo
+                        acc[3] += 1
+                procesadas += 1
+            last_id = rows[-1][0]
+
+    db.query(AnswerBucket).delete()
+    db.add_all(
+        AnswerBucket(
+            bucket=bucket, inicio=inicio, categoria=categoria,
+            num_respuestas=acc[0], num_correctas=acc[1],
+            suma_tiempo_segundos=acc[2], num_con_tiempo=acc[3],
+        )
+        for (bucket, inicio, categoria), acc in totals.items()
+    )
+    db.commit()
+    return procesadas
+
+
+def default_range(bucket: str, now: Optional[datetime] = None) -> tuple[datetime, datetime]:
+    """Rango por defecto: últimas 24 horas (hour) o últimos 30 días (day)"""
+    now = as_utc_naive(now or datetime.now(timezone.utc))
+    span = timedelta(hours=24) if bucket == "hour" else timedelta(days=30)
+    return now - span, now
@@ -0,0 +1,276 @@
+"""
+Historial y totales por usuario
+
+Las sesiones guardan `usuario_key`, el nombre normalizado, con un índice
+(usuario_key, id): el historial de un usuario se pagina por id sin recorrer las
+sesiones de los demás. Los totales viven en user_stats y user_category_stats y
+se actualizan en la misma transacción que completa (o borra) la sesión.
+"""
+import re
+import unicodedata
+from typing import Any, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from ..models.answer import Answer
+from ..models.question import Question
+from ..models.quiz_session import QuizSession
+from ..models.archive import ArchivedQuizSession
+from ..models.category import categories
+from ..models.user_stats import UserStats, UserCategoryStats
+
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_user(nombre: Optional[str]) -> Optional[str]:
+    """
+    Clave del usuario: sin espacios de más, sin distinguir mayúsculas ni formas Unicode.
+
+    "  Ana  María " y "ana maría" son el mismo usuario. Devuelve None para nombres vacíos.
+    """
+    if nombre is None:
+        return None
+    key = _SPACES.sub(" ", unicodedata.normalize("NFKC", nombre)).strip().casefold()
+    return key or None
+
+
+def _upsert(
+    db: Session,
+    model: Any,
+    keys: dict[str, Any],
+    sums: dict[str, int],
+    extra: Optional[dict[str, Any]] = None,
+    maxes: Optional[dict[str, int]] = None,
+) -> None:
+    # Igual que timeseries_service._increment: en SQLite un solo INSERT ... ON CONFLICT,
+    # así dos sesiones del mismo usuario completadas a la vez no chocan al crear la fila
+    extra = extra or {}
+    maxes = maxes or {}
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model).values(**keys, **sums, **extra, **maxes)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                **{k: getattr(model, k) + v for k, v in sums.items()},
+                **extra,
+                **{k: func.max(getattr(model, k), v) for k, v in maxes.items()},
+            },
+        )
+        db.execute(stmt)
+        return
+
+    row = db.get(model, tuple(keys.values()))
+    if row is None:
+        db.add(model(**keys, **sums, **extra, **maxes))
+        return
+    for k, v in sums.items():
+        setattr(row, k, getattr(row, k) + v)
+    for k, v in extra.items():
+        setattr(row, k, v)
+    for k, v in maxes.items():
+        setattr(row, k, max(getattr(row, k), v))
+
+
+def _session_key(session: Any) -> Optional[str]:
+    key = session.usuario_key
+    return str(key) if key else None
+
+
+def record_category_answer(db: Session, usuario_key: str, categoria_id: int, es_correcta: bool, sign: int = 1) -> None:
+    """
+    Sumar (o restar) una respuesta en los totales por categoría del usuario.
+
+    Solo cuentan las respuestas de sesiones completadas. No hace commit.
+    """
+    _upsert(
+        db, UserCategoryStats,
+        {"usuario_key": usuario_key, "categoria_id": categoria_id},
+        {"num_respuestas": sign, "num_correctas": sign if es_correcta else 0},
+    )
+
+
+def _category_breakdown(db: Session, session_id: int) -> list[tuple[int, int, int]]:
+    # Por la categoría con la que se registró cada respuesta, para descontar de la misma en la que se sumó
+    categoria = func.coalesce(Answer.categoria_id, Question.categoria_id)
+    return [
+        (int(categoria_id), int(total), int(correctas or 0))
+        for categoria_id, total, correctas in db.query(
+            categoria, func.count(Answer.id), func.sum(case((Answer.es_correcta == True, 1), else_=0))
+        ).join(Question, Question.id == Answer.question_id).filter(
+            Answer.quiz_session_id == session_id
+        ).group_by(categoria).all()
+    ]
+
+
+def best_score(db: Session, archive_db: Optional[Session], usuario_key: str, exclude_id: Optional[int] = None) -> int:
+    """Mejor puntuación entre las sesiones completadas del usuario (principal y archivo)"""
+    query = db.query(func.max(QuizSession.puntuacion_total)).filter(
+        QuizSession.usuario_key == usuario_key, QuizSession.estado == "completado"
+    )
+    if exclude_id is not None:
+        query = query.filter(QuizSession.id != exclude_id)
+    best = query.scalar() or 0
+    if archive_db is not None:
+        archived = archive_db.query(func.max(ArchivedQuizSession.puntuacion_total)).filter(
+            ArchivedQuizSession.usuario_key == usuario_key, ArchivedQuizSession.estado == "completado"
+        ).scalar() or 0
+        best = max(best, archived)
+    return int(best)
+
+
+def _set_best(db: Session, usuario_key: str, best: int) -> None:
+    db.query(UserStats).filter(UserStats.usuario_key == usuario_key).update(
+        {UserStats.mejor_puntuacion: best}, synchronize_session=False
+    )
+
+
+def record_completion(
+    db: Session,
+    archive_db: Optional[Session],
+    session: QuizSession,
+    previous: Optional[tuple[int, int, int]] = None,
+) -> None:
+    """
+    Sumar una sesión recién completada a los totales de su usuario.
+
+    Se llama antes del commit que completa la sesión. Si la sesión ya estaba
+    completada, `previous` trae sus valores anteriores (puntuación, respondidas,
+    correctas) para reemplazarlos; las categorías no cambian porque ya se
+    actualizan con cada respuesta de una sesión completada.
+
+    Args:
+        previous: (puntuacion_total, preguntas_respondidas, preguntas_correctas) anteriores
+    """
+    key = _session_key(session)
+    if key is None:
+        return
+    puntuacion = int(session.puntuacion_total or 0)  # type: ignore
+    respondidas = int(session.preguntas_respondidas or 0)  # type: ignore
+    correctas = int(session.preguntas_correctas or 0)  # type: ignore
+    prev_puntuacion, prev_respondidas, prev_correctas = previous or (0, 0, 0)
+
+    _upsert(
+        db, UserStats, {"usuario_key": key},
+        {
+            "num_sesiones": 0 if previous else 1,
+            "suma_puntuacion": puntuacion - prev_puntuacion,
+            "preguntas_respondidas": respondidas - prev_respondidas,
+            "preguntas_correctas": correctas - prev_correctas,
+        },
+        extra={"usuario_nombre": session.usuario_nombre, "ultima_sesion_at": session.fecha_fin},
+        maxes={"mejor_puntuacion": puntuacion},
+    )
+    if previous and puntuacion < prev_puntuacion:
+        # Si bajó la que era la mejor puntuación hay que buscar la siguiente
+        db.flush()
+        _set_best(db, key, best_score(db, archive_db, key))
+
+    if not previous:
+        for categoria_id, total, aciertos in _category_breakdown(db, int(session.id)):  # type: ignore
+            _upsert(
+                db, UserCategoryStats, {"usuario_key": key, "categoria_id": categoria_id},
+                {"num_respuestas": total, "num_correctas": aciertos},
+            )
+
+
+def remove_completion(db: Session, archive_db: Optional[Session], session: QuizSession) -> None:
+    """Descontar una sesión completada que se va a borrar (antes del commit que la borra)"""
+    key = _session_key(session)
+    if key is None or session.estado != "completado":
+        return
+    row = db.get(UserStats, key)
+    if row is None:
+        return
+    for categoria_id, total, aciertos in _category_breakdown(db, int(session.id)):  # type: ignore
+        _upsert(
+            db, UserCategoryStats, {"usuario_key": key, "categoria_id": categoria_id},
+            {"num_respuestas": -total, "num_correctas": -aciertos},
+        )
+    row.num_sesiones -= 1
+    row.suma_puntuacion -= int(session.puntuacion_total or 0)  # type: ignore
+    row.preguntas_respondidas -= int(session.preguntas_respondidas or 0)  # type: ignore
+    row.preguntas_correctas -= int(session.preguntas_correctas or 0)  # type: ignore
+    if int(session.puntuacion_total or 0) >= row.mejor_puntuacion:  # type: ignore
+        row.mejor_puntuacion = best_score(db, archive_db, key, exclude_id=int(session.id))  # type: ignore
+
+
+def get_user_stats(db: Session, usuario_key: str) -> Optional[dict[str, Any]]:
+    """
+    Totales del usuario: dos búsquedas por clave primaria.
+
+    Returns:
+        Diccionario con los totales, o None si el usuario no completó ninguna sesión
+    """
+    row = db.get(UserStats, usuario_key)
+    if row is None:
+        return None
+    num = int(row.num_sesiones)  # type: ignore
+    respondidas = int(row.preguntas_respondidas)  # type: ignore
+    por_categoria = []
+    for categoria_id, total, aciertos in db.query(
+        UserCategoryStats.categoria_id, UserCategoryStats.num_respuestas, UserCategoryStats.num_correctas
+    ).filter(UserCategoryStats.usuario_key == usuario_key).all():
+        if not total:
+            continue
+        por_categoria.append({
+            "categoria": categories.name_of(categoria_id),
+            "num_respuestas": total,
+            "num_correctas": aciertos,
+            "porcentaje_aciertos": round(aciertos / total * 100, 2),
+        })
+    por_categoria.sort(key=lambda c: c["num_respuestas"], reverse=True)
+    return {
+        "usuario_nombre": row.usuario_nombre,
+        "sesiones_completadas": num,
+        "mejor_puntuacion": row.mejor_puntuacion if num else None,
+        "puntuacion_promedio": round(row.suma_puntuacion / num, 2) if num else None,  # type: ignore
+        "preguntas_respondidas": respondidas,
+        "preguntas_correctas": row.preguntas_correctas,
+        "porcentaje_aciertos": round(row.preguntas_correctas / respondidas * 100, 2) if respondidas else 0,  # type: ignore
+        "ultima_sesion_at": row.ultima_sesion_at,
+        "por_categoria": por_categoria,
+    }
+
+
+def get_user_history(
+    db: Session,
+    archive_db: Optional[Session],
+    usuario_key: str,
+    antes_de: Optional[int] = None,
+    limit: int = 20,
+    estado: Optional[str] = None,
+) -> tuple[list[Any], Optional[int]]:
+    """
+    Sesiones del usuario, de la más nueva a la más vieja, paginadas por id (keyset).
+
+    Cada página lee a lo sumo `limit + 1` filas del índice (usuario_key, id) de
+    la BD principal y del archivo, sin importar cuántas sesiones haya en total.
+
+    Args:
+        antes_de: Devolver sesiones con id menor a este (el `siguiente` de la página anterior)
+
+    Returns:
+        (sesiones, id para pedir la página siguiente o None si no hay más)
+    """
+    sources: list[tuple[Session, Any]] = [(db, QuizSession)]
+    if archive_db is not None:
+        sources.append((archive_db, ArchivedQuizSession))
+
+    rows: list[Any] = []
+    for source_db, model in sources:
+        query = source_db.query(model).filter(model.usuario_key == usuario_key)
+        if antes_de is not None:
+            query = query.filter(model.id < antes_de)
+        if estado is not None:
+            query = query.filter(model.estado == estado)
+        rows.extend(query.order_by(model.id.desc()).limit(limit + 1).all())
+
+    rows.sort(key=lambda s: s.id, reverse=True)
+    page = rows[:limit]
+    siguiente = int(page[-1].id) if len(rows) > limit else None
+    return page, siguiente
+
+
+def user_exists(db: Session, usuario_key: str) -> bool:
+    return db.query(QuizSession.id).filter(QuizSession.usuario_key == usuario_key).first() is not None
@@ -0,0 +1,129 @@
+"""
+Arranque en etapas: esquema -> (validadores) -> listo, con las cachés cargándose en segundo plano
+
+La API queda lista para atender apenas el esquema está verificado. El ranking
+en memoria, el índice de duplicados y el snapshot del banco de preguntas se
+cargan después en un hilo aparte; /health/ready informa el estado de cada uno.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator
+
+from .database import SessionLocal, ArchiveSessionLocal
+from .schemas.question import QuestionCreate, QuestionRead
+from .schemas.quiz_session import QuizSessionCreate, QuizSessionRead
+from .schemas.answer import AnswerCreate, AnswerRead
+from .services.leaderboard_service import rebuild_leaderboard
+from .services.dedup_service import get_dedup_index
+from .services.snapshot_service import question_snapshots
+
+
+WARMUP_VALIDATORS = os.getenv("WARMUP_VALIDATORS", "").lower() in ("1", "true", "yes")
+
+
+class StartupState:
+    def __init__(self) -> None:
+        self.ready = False
+        self.tiempos_ms: dict[str, float] = {}
+        self.caches: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.tiempos_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def set_cache(self, name: str, estado: str) -> None:
+        with self._lock:
+            self.caches[name] = estado
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {"listo": self.ready, "caches": dict(self.caches), "tiempos_ms": dict(self.tiempos_ms)}
+
+
+startup = StartupState()
+
+
+def warm_validators(app: Any) -> None:
+    """
+    Ejercitar una vez los schemas de entrada/salida y generar el OpenAPI, para que
+    el primer request (o la primera visita a /docs) no pague ese costo.
+    """
+    now = datetime.now(timezone.utc)
+    QuestionCreate(
+        pregunta="¿Calentamiento?", opciones=["a", "b", "c"], respuesta_correcta=0,
+        categoria="tecnologia", dificultad="facil",
+    )
+    QuestionRead(
+        id=1, pregunta="x", opciones=["a", "b", "c"], respuesta_correcta=0, explicacion=None,
+        categoria="Tecnología", dificultad="fácil", created_at=now, is_active=True,
+    ).model_dump_json()
+    QuizSessionCreate(usuario_nombre="x")
+    QuizSessionRead.model_validate({
+        "id": 1, "usuario_nombre": "x", "fecha_inicio": now, "fecha_fin": None, "puntuacion_total": 0,
+        "preguntas_respondidas": 0, "preguntas_correctas": 0, "estado": "en_progreso",
+        "tiempo_total_segundos": None, "created_at": now,
+    }).model_dump_json()
+    AnswerCreate(quiz_session_id=1, question_id=1, respuesta_seleccionada=0)
+    AnswerRead(
+        id=1, quiz_session_id=1, question_id=1, respuesta_seleccionada=0, es_correcta=True,
+        tiempo_respuesta_segundos=None, created_at=now,
+    ).model_dump_json()
+    app.openapi()
+
+
+def _warm_leaderboard() -> str:
+    with SessionLocal() as db, ArchiveSessionLocal() as archive_db:
+        n = rebuild_leaderboard(db, archive_db)
+    return f"{n} sesiones"
+
+
+def _warm_dedup_index() -> str:
+    with SessionLocal() as db:
+        index = get_dedup_index(db)
+    return f"{len(index.items())} preguntas"
+
+
+def _warm_snapshot() -> str:
+    # Hasta que esté listo, las preguntas se leen de la BD
+    if not question_snapshots.path:
+        return "desactivado"
+    n = question_snapshots.rebuild()
+    question_snapshots.start_refresh()
+    return f"{n} preguntas"
+
+
+CACHE_WARMERS: dict[str, Callable[[], str]] = {
+    "ranking": _warm_leaderboard,
+    "duplicados": _warm_dedup_index,
+    "snapshot": _warm_snapshot,
+}
+
+
+def start_cache_warming() -> threading.Thread:
+    """Cargar las cachés en un hilo aparte (no bloquea /health/ready)"""
+    for name in CACHE_WARMERS:
+        startup.set_cache(name, "cargando")
+
+    def run() -> None:
+        for name, warm in CACHE_WARMERS.items():
+            try:
+                with startup.step(f"cache_{name}"):
+                    detalle = warm()
+                startup.set_cache(name, "listo")
+                print(f"✓ Caché {name} cargada ({detalle})")
+            except Exception as exc:
+                startup.set_cache(name, "error")
+                print(f"[WARN] No se pudo cargar la caché {name}: {exc}")
+
+    thread = threading.Thread(target=run, name="cache-warming", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,104 @@
+"""
+Benchmark: análisis de ítems sobre N respuestas, con un recorrido en Python
+(diccionarios por pregunta y por sesión) contra los arrays de NumPy del
+servicio de análisis. Requiere numpy.
+
+Uso (desde quiz_api/):
+    python -m benchmarks.bench_analytics [--rows 1000000]
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from sqlalchemy import create_engine, text
+
+import app.main  # noqa: F401  (registra todos los modelos)
+from app.database import Base
+from app.services.analytics_service import GROUP_FRACTION, analyze, load_answers
+
+
+def _fill(engine, rows: int, questions: int = 500) -> None:  # type: ignore
+    Base.metadata.create_all(bind=engine)
+    random.seed(0)
+    batch: list[dict] = []
+    session_id = 0
+    with engine.begin() as conn:
+        while len(batch) < rows:
+            session_id += 1
+            ability = random.random()
+            for q in random.sample(range(1, questions + 1), 10):
+                ok = random.random() < ability
+                batch.append({
+                    "s": session_id, "q": q, "o": 0 if ok else random.randint(1, 3), "k": ok,
+                    "t": random.randint(1, 90),
+                })
+        conn.execute(text(
+            "INSERT INTO answers (quiz_session_id, question_id, respuesta_seleccionada, es_correcta, "
+            "tiempo_respuesta_segundos) VALUES (:s, :q, :o, :k, :t)"
+        ), batch[:rows])
+
+
+def python_pass(rows: list) -> dict:  # type: ignore
+    # Lo mismo que analyze, respuesta por respuesta
+    sessions: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+    for s, q, o, k, t in rows:
+        sessions[s][0] += 1
+        sessions[s][1] += k
+    by_question: dict[int, list] = defaultdict(list)
+    options: dict[tuple[int, int], int] = defaultdict(int)
+    for s, q, o, k, t in rows:
+        options[(q, o)] += 1
+        n, c = sessions[s]
+        if n >= 2:
+            by_question[q].append(((c - k) / (n - 1), k, t))
+    result = {}
+    for q, items in by_question.items():
+        items.sort()
+        kk = math.ceil(GROUP_FRACTION * len(items))
+        d = sum(x[1] for x in items[-kk:]) / kk - sum(x[1] for x in items[:kk]) / kk
+        times = sorted(x[2] for x in items)
+        result[q] = (d, [times[math.ceil(p / 100 * len(times)) - 1] for p in (50, 90, 99)])
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        _fill(engine, args.rows)
+        print(f"{args.rows:,} respuestas")
+
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT quiz_session_id, question_id, respuesta_seleccionada, es_correcta, "
+                "tiempo_respuesta_segundos FROM answers"
+            )).all()
+        loaded = time.perf_counter()
+        python_pass(rows)
+        done = time.perf_counter()
+        print(f"  {'Python (filas + diccionarios)':<34}carga {(loaded - start) * 1000:>8.0f} ms   "
+              f"cálculo {(done - loaded) * 1000:>8.0f} ms")
+        old = done - start
+
+        start = time.perf_counter()
+        answers = load_answers([engine])
+        loaded = time.perf_counter()
+        analyze(answers)
+        done = time.perf_counter()
+        print(f"  {'NumPy (lotes + bincount/lexsort)':<34}carga {(loaded - start) * 1000:>8.0f} ms   "
+              f"cálculo {(done - loaded) * 1000:>8.0f} ms")
+        print(f"  -> {old / (done - start):.1f}x más rápido en total, "
+              f"memoria de las columnas: {answers.nbytes / 1e6:.0f} MB")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
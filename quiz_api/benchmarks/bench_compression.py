@@ -0,0 +1,85 @@
+"""
+Benchmark: bytes enviados vs. CPU al comprimir respuestas JSON típicas de la API
+
+Uso (desde quiz_api/):
+    python -m benchmarks.bench_compression
+"""
+import gzip
+import hashlib
+import json
+import time
+from typing import Any, Callable
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+
+def _questions(n: int) -> list[dict[str, Any]]:
+    categorias = ["Tecnología", "Historia", "Ciencia", "Geografía", "Literatura", "Deporte"]
+    return [
+        {
+            "id": i,
+            "pregunta": f"¿Cuál es la respuesta correcta a la pregunta número {i} sobre {categorias[i % 6]}?",
+            "opciones": [f"Opción A de la pregunta {i}", f"Opción B de la pregunta {i}",
+                         f"Opción C de la pregunta {i}", f"Opción D de la pregunta {i}"],
+            "respuesta_correcta": i % 4,
+            "explicacion": "La explicación detallada de por qué esta es la respuesta correcta.",
+            "categoria": categorias[i % 6],
+            "dificultad": ["fácil", "medio", "difícil"][i % 3],
+            "created_at": "2024-05-01T12:00:00",
+            "is_active": True,
+        }
+        for i in range(n)
+    ]
+
+
+def _answers(n: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": i, "quiz_session_id": 42, "question_id": i * 7, "respuesta_seleccionada": i % 4,
+            "es_correcta": i % 3 != 0, "tiempo_respuesta_segundos": 5 + i % 20,
+            "created_at": "2024-05-01T12:00:00",
+        }
+        for i in range(n)
+    ]
+
+
+PAYLOADS = {
+    "/questions/?limit=100": _questions(100),
+    "/answers/session/{id}": _answers(100),
+    "/questions/?limit=10": _questions(10),
+}
+
+
+def _time(fn: Callable[[], bytes], repeat: int = 50) -> tuple[bytes, float]:
+    out = fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return out, (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    for name, payload in PAYLOADS.items():
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        print(f"\n{name}: {len(body):,} bytes sin comprimir")
+        print(f"  {'codificación':<14}{'bytes':>10}{'ratio':>8}{'ms/resp':>10}")
+        codecs: list[tuple[str, Callable[[], bytes]]] = [
+            (f"gzip-{lvl}", lambda lvl=lvl: gzip.compress(body, compresslevel=lvl, mtime=0)) for lvl in (1, 5, 9)
+        ]
+        if brotli is not None:
+            codecs += [(f"br-{q}", lambda q=q: brotli.compress(body, quality=q)) for q in (1, 4, 11)]
+        for label, fn in codecs:
+            out, ms = _time(fn)
+            print(f"  {label:<14}{len(out):>10,}{len(body) / len(out):>8.1f}{ms:>10.3f}")
+        # Lo que cuesta un acierto en la caché del middleware: hash del cuerpo y búsqueda
+        _, ms = _time(lambda: hashlib.sha1(body).digest())
+        print(f"  {'caché (sha1)':<14}{'':>10}{'':>8}{ms:>10.3f}")
+    if brotli is None:
+        print("\n(brotli no está instalado: solo se mide gzip)")
+
+
+if __name__ == "__main__":
+    main()
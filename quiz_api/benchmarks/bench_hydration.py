@@ -0,0 +1,121 @@
+"""
+Benchmark: cargar 100k preguntas de SQLite, corregir respuestas y serializar
+el listado, comparando la columna JSON anterior (json.loads en cada fila) con
+el formato actual (texto crudo + num_opciones)
+
+Uso (desde quiz_api/):
+    python -m benchmarks.bench_hydration [--rows 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable
+
+from pydantic import TypeAdapter
+from sqlalchemy import JSON, Boolean, Column, DateTime, Integer, String, Text, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+import app.main  # noqa: F401  (registra todos los modelos)
+from app.database import Base
+from app.models.category import categories, difficulties
+from app.models.question import Question, encode_options
+from app.schemas.question import QuestionRead, questions_json
+
+LegacyBase = declarative_base()
+
+
+class LegacyQuestion(LegacyBase):
+    # Mapeo anterior de la misma tabla: opciones como JSON, decodificado al hidratar
+    __tablename__ = "questions"
+
+    id = Column(Integer, primary_key=True)
+    pregunta = Column(String)
+    opciones = Column(JSON)
+    respuesta_correcta = Column(Integer)
+    explicacion = Column(Text)
+    categoria_id = Column(Integer)
+    dificultad_id = Column(Integer)
+    created_at = Column(DateTime)
+    is_active = Column(Boolean)
+
+    @property
+    def categoria(self) -> str | None:
+        return categories.name_of(self.categoria_id)  # type: ignore
+
+    @property
+    def dificultad(self) -> str | None:
+        return difficulties.name_of(self.dificultad_id)  # type: ignore
+
+
+def _fill(engine, rows: int) -> None:  # type: ignore
+    Base.metadata.create_all(bind=engine)
+    now = datetime(2024, 1, 1)
+    opciones = [
+        ["Una base de datos", "Un framework web", "Un lenguaje de programación", "Un editor de código"],
+        ["Oxígeno", "Helio", "Hidrógeno"],
+        ["1987", "1989", "1991", "1993", "1995"],
+    ]
+    with engine.begin() as conn:
+        conn.execute(Question.__table__.insert(), [  # type: ignore
+            {
+                "pregunta": f"Pregunta de prueba número {i}",
+                "opciones": encode_options(opciones[i % 3]),
+                "num_opciones": len(opciones[i % 3]),
+                "respuesta_correcta": 0,
+                "explicacion": "Explicación de ejemplo",
+                "categoria_id": 1 + i % 6,
+                "dificultad_id": 1 + i % 3,
+                "created_at": now,
+                "is_active": True,
+            }
+            for i in range(rows)
+        ])
+
+
+def _measure(label: str, fn: Callable[[], object], rows: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40}{elapsed * 1000:>10.1f} ms{elapsed / rows * 1e6:>10.2f} µs/fila")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        _fill(engine, args.rows)
+        adapter = TypeAdapter(list[QuestionRead])
+
+        def load(model: type) -> list:  # type: ignore
+            with Session(engine) as db:
+                return db.query(model).all()
+
+        print(f"{args.rows:,} preguntas")
+        print("Hidratar (query(...).all()):")
+        old = _measure("anterior (JSON)", lambda: load(LegacyQuestion), args.rows)
+        new = _measure("actual (texto crudo)", lambda: load(Question), args.rows)
+        print(f"  -> {old / new:.2f}x más rápido")
+
+        legacy_rows, rows = load(LegacyQuestion), load(Question)
+        print("Validar el índice de respuesta (cantidad de opciones):")
+        old = _measure("anterior (len(opciones))", lambda: [len(q.opciones) > 2 for q in legacy_rows], args.rows)
+        new = _measure("actual (num_opciones)", lambda: [q.num_opciones > 2 for q in rows], args.rows)
+        print(f"  -> {old / new:.2f}x más rápido")
+
+        print("Hidratar + serializar el listado:")
+        old = _measure("anterior (QuestionRead)", lambda: adapter.dump_json(
+            [QuestionRead.model_validate(q) for q in load(LegacyQuestion)]
+        ), args.rows)
+        new = _measure("actual (questions_json)", lambda: questions_json(load(Question)), args.rows)
+        print(f"  -> {old / new:.2f}x más rápido")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
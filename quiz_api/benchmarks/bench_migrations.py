@@ -0,0 +1,106 @@
+"""
+Benchmark: cuánto esperan las escrituras de la API mientras corre un relleno de
+datos sobre una tabla grande (como questions.num_opciones en una base vieja).
+
+Compara el relleno anterior (todo en una transacción) con MigrationContext.backfill
+(lotes acotados con pausa). Un hilo aparte inserta una fila cada 2 ms, como haría
+register_answer, y mide cuánto tarda cada inserción.
+
+Uso (desde quiz_api/):
+    python -m benchmarks.bench_migrations [--rows 200000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import create_engine, event, text
+
+from app.services.migration_service import MigrationContext
+
+SELECT = "SELECT id, opciones FROM questions WHERE id > :ultimo_id AND num_opciones IS NULL ORDER BY id LIMIT :limite"
+UPDATE = "UPDATE questions SET num_opciones = :n WHERE id = :id"
+
+
+def _make_db(path: str, rows: int) -> None:
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("CREATE TABLE questions (id INTEGER PRIMARY KEY, opciones TEXT NOT NULL, num_opciones INTEGER)")
+    con.execute("CREATE TABLE answers (id INTEGER PRIMARY KEY, question_id INTEGER, created_at REAL)")
+    opciones = json.dumps(["Opción A", "Opción B", "Opción C", "Opción D"], ensure_ascii=False)
+    con.executemany("INSERT INTO questions (opciones) VALUES (?)", ((opciones,) for _ in range(rows)))
+    con.commit()
+    con.close()
+
+
+def _one_transaction(engine) -> None:
+    # Lo que hacía _add_option_counts: leer todo y actualizar dentro de una sola transacción
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, opciones FROM questions")).all()
+        conn.execute(text(UPDATE), [{"id": i, "n": len(json.loads(raw))} for i, raw in rows])
+
+
+def _batched(engine) -> None:
+    MigrationContext(engine, version=1).backfill(
+        "num_opciones", SELECT, UPDATE, lambda row: {"id": row[0], "n": len(json.loads(row[1]))},
+    )
+
+
+def _measure(path: str, backfill: Callable) -> tuple[float, list[float]]:
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _wal(dbapi_connection, connection_record) -> None:
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    latencies: list[float] = []
+    stop = threading.Event()
+
+    def writer() -> None:
+        con = sqlite3.connect(path, timeout=30)
+        while not stop.is_set():
+            start = time.perf_counter()
+            con.execute("INSERT INTO answers (question_id, created_at) VALUES (1, ?)", (time.time(),))
+            con.commit()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.002)
+        con.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    backfill(engine)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    engine.dispose()
+    return elapsed, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"Relleno de num_opciones en {args.rows} filas con escrituras concurrentes")
+    for label, backfill in (("una transacción (anterior)", _one_transaction), ("por lotes con pausa", _batched)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "quiz.db")
+            _make_db(path, args.rows)
+            elapsed, lat = _measure(path, backfill)
+        lat.sort()
+        p99 = lat[int(len(lat) * 0.99)] if lat else 0.0
+        print(
+            f"  {label:<28} relleno {elapsed:>6.2f} s   escrituras: {len(lat):>5}  "
+            f"p50 {statistics.median(lat):>6.2f} ms  p99 {p99:>7.2f} ms  máx {lat[-1]:>8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
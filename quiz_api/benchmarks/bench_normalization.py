@@ -0,0 +1,100 @@
+"""
+Benchmark: validar 100k preguntas (QuestionCreate) con categorías/dificultades
+escritas de distintas formas, comparando la normalización anterior (NFKD en
+cada llamada) con la actual (lookup exacto + caché LRU)
+
+Uso (desde quiz_api/):
+    python -m benchmarks.bench_normalization [--rows 100000]
+"""
+import argparse
+import time
+from typing import Callable
+
+from app.schemas.question import QuestionCreate
+from app.services import quiz_service
+
+
+def _old_normalize_text(s: str) -> str:
+    # Implementación anterior, copiada como referencia
+    import unicodedata
+    if not s:
+        return ""
+    s = s.strip().lower()
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(ch for ch in s if not unicodedata.combining(ch))
+    return s
+
+
+_OLD_CATEGORY_MAP = {_old_normalize_text(c): c for c in quiz_service.CANONICAL_CATEGORIES}
+_OLD_DIFFICULTY_MAP = {_old_normalize_text(d): d for d in quiz_service.CANONICAL_DIFFICULTIES}
+
+
+def old_canonical_category(value: str) -> str:
+    key = _old_normalize_text(value)
+    if key in _OLD_CATEGORY_MAP:
+        return _OLD_CATEGORY_MAP[key]
+    raise ValueError("Categoría inválida")
+
+
+def old_canonical_difficulty(value: str) -> str:
+    key = _old_normalize_text(value)
+    if key in _OLD_DIFFICULTY_MAP:
+        return _OLD_DIFFICULTY_MAP[key]
+    raise ValueError("Dificultad inválida")
+
+
+CATEGORY_SPELLINGS = ["Tecnología", "tecnologia", "Historia", "HISTORIA", "Ciencia", " geografía ", "Literatura", "deporte"]
+DIFFICULTY_SPELLINGS = ["fácil", "facil", "medio", "Medio", "difícil", "DIFICIL"]
+
+
+def _rows(n: int) -> list[dict[str, object]]:
+    return [
+        {
+            "pregunta": f"Pregunta {i}",
+            "opciones": ["a", "b", "c", "d"],
+            "respuesta_correcta": i % 4,
+            "categoria": CATEGORY_SPELLINGS[i % len(CATEGORY_SPELLINGS)],
+            "dificultad": DIFFICULTY_SPELLINGS[i % len(DIFFICULTY_SPELLINGS)],
+        }
+        for i in range(n)
+    ]
+
+
+def _measure(label: str, fn: Callable[[], None], rows: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40}{elapsed * 1000:>10.1f} ms{elapsed / rows * 1e6:>10.2f} µs/fila")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    rows = _rows(args.rows)
+
+    print(f"{args.rows:,} filas")
+    print("Solo canonicalización (categoría + dificultad):")
+    old = _measure("anterior (NFKD por llamada)", lambda: [
+        (old_canonical_category(r["categoria"]), old_canonical_difficulty(r["dificultad"])) for r in rows  # type: ignore
+    ], args.rows)
+    new = _measure("actual (lookup + LRU)", lambda: [
+        (quiz_service.canonical_category(r["categoria"]), quiz_service.canonical_difficulty(r["dificultad"])) for r in rows  # type: ignore
+    ], args.rows)
+    print(f"  -> {old / new:.1f}x más rápido")
+
+    print("Validación completa de QuestionCreate:")
+    original = (quiz_service.canonical_category, quiz_service.canonical_difficulty)
+    import app.schemas.question as schema_module
+    schema_module.canonical_category, schema_module.canonical_difficulty = old_canonical_category, old_canonical_difficulty
+    try:
+        old = _measure("anterior", lambda: [QuestionCreate(**r) for r in rows], args.rows)  # type: ignore
+    finally:
+        schema_module.canonical_category, schema_module.canonical_difficulty = original
+    new = _measure("actual", lambda: [QuestionCreate(**r) for r in rows], args.rows)  # type: ignore
+    print(f"  -> {old / new:.2f}x más rápido")
+
+
+if __name__ == "__main__":
+    main()
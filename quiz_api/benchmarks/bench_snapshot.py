@@ -0,0 +1,109 @@
+"""
+Benchmark: servir preguntas desde la BD (consulta + hidratación + questions_json)
+contra el snapshot mapeado con mmap, para buscar por ID, listar con filtros y
+sortear preguntas
+
+Uso (desde quiz_api/):
+    python -m benchmarks.bench_snapshot [--rows 100000] [--requests 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.main  # noqa: F401  (registra todos los modelos)
+from app.database import Base
+from app.models.question import Question, encode_options
+from app.schemas.question import questions_json
+from app.services.snapshot_service import QuestionSnapshot, build_snapshot
+
+
+def _fill(engine, rows: int) -> None:  # type: ignore
+    Base.metadata.create_all(bind=engine)
+    opciones = ["Una base de datos", "Un framework web", "Un lenguaje de programación", "Un editor de código"]
+    with engine.begin() as conn:
+        conn.execute(Question.__table__.insert(), [  # type: ignore
+            {
+                "pregunta": f"Pregunta de prueba número {i}",
+                "opciones": encode_options(opciones),
+                "num_opciones": len(opciones),
+                "respuesta_correcta": 0,
+                "explicacion": "Explicación de ejemplo",
+                "categoria_id": 1 + i % 6,
+                "dificultad_id": 1 + i % 3,
+                "created_at": datetime(2024, 1, 1),
+                "is_active": True,
+            }
+            for i in range(rows)
+        ])
+
+
+def _measure(label: str, fn: Callable[[], object], requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28}{elapsed / requests * 1e6:>10.1f} µs/request")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        _fill(engine, args.rows)
+        path = os.path.join(tmp, "preguntas.snap")
+        with Session(engine) as db:
+            start = time.perf_counter()
+            build_snapshot(db, path)
+        print(f"{args.rows:,} preguntas; snapshot de {os.path.getsize(path) / 1e6:.1f} MB "
+              f"generado en {(time.perf_counter() - start) * 1000:.0f} ms")
+        snapshot = QuestionSnapshot(path)
+        db = Session(engine)
+
+        def db_get() -> bytes:
+            q = db.query(Question).filter(Question.id == random.randint(1, args.rows)).first()
+            return questions_json([q])  # type: ignore
+
+        def db_list() -> bytes:
+            query = db.query(Question).filter(Question.is_active == True, Question.categoria_id == 3)
+            return questions_json(query.offset(random.randint(0, 1000)).limit(20).all())
+
+        def db_random() -> bytes:
+            ids = [row[0] for row in db.query(Question.id).filter(Question.is_active == True)]
+            chosen = random.sample(ids, 10)
+            found = {q.id: q for q in db.query(Question).filter(Question.id.in_(chosen))}
+            return questions_json(found[i] for i in chosen)
+
+        def snap_list() -> bytes:
+            skip = random.randint(0, 1000)
+            return snapshot.json(snapshot.positions(3, None)[skip:skip + 20])
+
+        cases = [
+            ("GET /questions/{id}", db_get, lambda: snapshot.get(random.randint(1, args.rows))),
+            ("GET /questions/?categoria=", db_list, snap_list),
+            ("GET /questions/random", db_random,
+             lambda: snapshot.json(random.sample(range(len(snapshot)), 10))),
+        ]
+        for label, from_db, from_snapshot in cases:
+            print(f"{label}:")
+            requests = args.requests if from_db is not db_random else max(1, args.requests // 50)
+            old = _measure("BD", from_db, requests)
+            new = _measure("snapshot (mmap)", from_snapshot, requests)
+            print(f"  -> {old / new:.1f}x más rápido")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: tiempo de arranque de la API (import + lifespan) en procesos nuevos,
+con una BD nueva y con una BD ya creada. Para la BD existente también compara
+el arranque anterior (create_all + migraciones + índices + ranking en cada
+arranque) con la verificación de versión del esquema.
+
+Uso (desde quiz_api/):
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+if sys.argv[1] == "anterior":
+    # Lo que hacía el lifespan antes en cada arranque, sin la verificación de versión
+    from app.database import Base, ArchiveBase, engine, archive_engine
+    from app.services.catalog_service import ensure_catalogs
+    from app.services.search_service import ensure_search_index
+    from app.services.schema_service import _create_missing_indexes
+    from app.startup import _warm_leaderboard
+    Base.metadata.create_all(bind=engine)
+    ArchiveBase.metadata.create_all(bind=archive_engine)
+    ensure_catalogs(engine)
+    ensure_search_index(engine)
+    _create_missing_indexes(engine)
+    _warm_leaderboard()  # antes el ranking se cargaba antes de aceptar requests
+    t2 = time.perf_counter()
+else:
+    async def run():
+        async with app.router.lifespan_context(app):
+            return time.perf_counter()
+    t2 = asyncio.run(run())
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "arranque_ms": (t2 - t1) * 1000}))
+"""
+
+
+def _run(db_dir: str, mode: str, extra_env: dict[str, str]) -> dict[str, float]:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_dir}/quiz.db",
+        "ARCHIVE_DATABASE_URL": f"sqlite:///{db_dir}/archive.db",
+        "SEED_ON_STARTUP": "",
+        **extra_env,
+    }
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _CHILD, mode],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _report(label: str, results: list[dict[str, float]]) -> None:
+    imp = statistics.median(r["import_ms"] for r in results)
+    arr = statistics.median(r["arranque_ms"] for r in results)
+    print(f"  {label:<42}import {imp:>8.1f} ms   arranque {arr:>8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Mediana de {args.runs} procesos")
+    with tempfile.TemporaryDirectory() as tmp:
+        nuevas = []
+        for i in range(args.runs):
+            db_dir = os.path.join(tmp, f"nueva{i}")
+            os.makedirs(db_dir)
+            nuevas.append(_run(db_dir, "lifespan", {}))
+        _report("BD nueva (crea el esquema)", nuevas)
+
+        db_dir = os.path.join(tmp, "existente")
+        os.makedirs(db_dir)
+        _run(db_dir, "lifespan", {})
+        _report("BD existente, arranque anterior", [_run(db_dir, "anterior", {}) for _ in range(args.runs)])
+        _report("BD existente, versión de esquema", [_run(db_dir, "lifespan", {}) for _ in range(args.runs)])
+        _report("BD existente, + WARMUP_VALIDATORS", [
+            _run(db_dir, "lifespan", {"WARMUP_VALIDATORS": "1"}) for _ in range(args.runs)
+        ])
+
+
+if __name__ == "__main__":
+    main()
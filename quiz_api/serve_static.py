@@ -1,39 +1,167 @@
 #!/usr/bin/env python3
 """
-Servidor HTTP simple para servir archivos estáticos en el puerto 3000
+Servidor asíncrono para servir el frontend (carpeta static) en el puerto 3000
+
+Al arrancar lee todos los archivos a memoria, los comprime (gzip y, si está
+instalado el paquete `brotli`, también br) y les asigna un nombre con hash de
+contenido (script.<hash>.js). El index.html se reescribe para apuntar a esos
+nombres, así que los assets se pueden cachear para siempre (immutable) y el
+HTML se revalida con su ETag en cada visita.
 """
-import http.server
-import socketserver
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
 from pathlib import Path
-import os
-from typing import Any
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # brotli es opcional
+    brotli = None
 
 PORT = 3000
 DIRECTORY = Path(__file__).parent / "static"
+MIN_COMPRESS_SIZE = 256
+
+CORS_HEADERS = {
+    # Headers CORS para que el frontend pueda hacer peticiones a la API
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+
+@dataclass
+class Asset:
+    body: bytes
+    content_type: str
+    etag: str
+    immutable: bool
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    stem, dot, ext = name.rpartition(".")
+    return f"{stem}.{digest}.{ext}" if dot else f"{name}.{digest}"
+
+
+def _make_asset(data: bytes, name: str, immutable: bool) -> Asset:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    asset = Asset(body=data, content_type=content_type, etag=_content_hash(data), immutable=immutable)
+    if len(data) >= MIN_COMPRESS_SIZE:
+        # Se comprime una sola vez al arrancar, con el nivel máximo
+        compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(data, quality=11)
+        asset.encodings = {enc: body for enc, body in compressed.items() if len(body) < len(data)}
+    return asset
+
+
+def build_assets(directory: Path) -> dict[str, Asset]:
+    """
+    Cargar la carpeta en memoria.
+
+    Returns:
+        Diccionario ruta -> Asset, con entradas para el nombre original y el nombre con hash
+    """
+    files = {
+        p.relative_to(directory).as_posix(): p.read_bytes()
+        for p in sorted(directory.rglob("*")) if p.is_file()
+    }
+    assets: dict[str, Asset] = {}
+    renames: dict[str, str] = {}
+    for name, data in files.items():
+        if name.endswith(".html"):
+            continue
+        hashed = _hashed_name(name, _content_hash(data))
+        renames[name] = hashed
+        assets[hashed] = _make_asset(data, name, immutable=True)
+        assets[name] = _make_asset(data, name, immutable=False)
+
+    for name, data in files.items():
+        if not name.endswith(".html"):
+            continue
+        html = data.decode("utf-8")
+        for original, hashed in renames.items():
+            html = re.sub(rf'((?:href|src)=["\']){re.escape(original)}(["\'])', rf"\g<1>{hashed}\g<2>", html)
+        assets[name] = _make_asset(html.encode("utf-8"), name, immutable=False)
+    return assets
+
+
+def _pick_encoding(accept_encoding: str, asset: Asset) -> Optional[str]:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if part.strip() and not part.strip().endswith("q=0")
+    }
+    for enc in ("br", "gzip"):
+        if enc in accepted and enc in asset.encodings:
+            return enc
+    return None
+
+
+def create_app(directory: Path = DIRECTORY) -> Starlette:
+    assets = build_assets(directory)
+
+    async def serve(request: Request) -> Response:
+        path = request.path_params["path"] or "index.html"
+        if path.endswith("/"):
+            path += "index.html"
+        asset = assets.get(path)
+        if asset is None:
+            return Response("Not Found", status_code=404, headers=CORS_HEADERS)
+
+        encoding = _pick_encoding(request.headers.get("accept-encoding", ""), asset)
+        # ETag fuerte distinto por representación (cada codificación son bytes distintos)
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        headers = {
+            **CORS_HEADERS,
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "public, max-age=31536000, immutable" if asset.immutable else "no-cache",
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+        body = asset.encodings[encoding] if encoding else asset.body
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(status_code=200, headers=headers, media_type=asset.content_type)
+        return Response(body, headers=headers, media_type=asset.content_type)
+
+    return Starlette(routes=[Route("/{path:path}", serve, methods=["GET", "HEAD"])])
 
-class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, *args: Any, **kwargs: Any) -> None:
-        super().__init__(*args, directory=str(DIRECTORY), **kwargs)
-    
-    def end_headers(self) -> None:
-        # Agregar headers CORS para que el frontend pueda hacer peticiones a la API
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        super().end_headers()
 
 if __name__ == "__main__":
-    os.chdir(DIRECTORY)
-    
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
-        print(f"")
-        print(f"║  🌐 URL: http://localhost:3000")
-        print(f"║  📁 Sirviendo desde: {str(DIRECTORY)} ")
-        print(f"║  🔌 API en puerto 8000")
-        print(f"║  Presiona CTRL+C para detener")
-        print(f"")
-        
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print("\n\n✓ Servidor detenido correctamente")
+    import uvicorn
+
+    app = create_app()
+    print(f"")
+    print(f"║  🌐 URL: http://localhost:{PORT}")
+    print(f"║  📁 Sirviendo desde: {str(DIRECTORY)} ")
+    print(f"║  🔌 API en puerto 8000")
+    print(f"║  Presiona CTRL+C para detener")
+    print(f"")
+
+    try:
+        uvicorn.run(app, host="0.0.0.0", port=PORT, log_level="warning")
+    except KeyboardInterrupt:
+        pass
+    print("\n\n✓ Servidor detenido correctamente")
@@ -43,6 +43,10 @@ function goToSection(sectionId) {
 
     document.querySelector(`[data-section="${sectionId}"]`).classList.add('active');
 
+    if (sectionId !== 'estadisticas') {
+        stopStatisticsStream();
+    }
+
     if (sectionId === 'preguntas') {
         loadQuestions();
     } else if (sectionId === 'estadisticas') {
@@ -326,78 +330,137 @@ async function loadQuestions() {
 }
 
 // ==================== Statistics Section ====================
-async function loadStatistics() {
-    try {
-        // Global stats
-        const globalResponse = await fetch(`${API_BASE_URL}/statistics/global`);
-        if (!globalResponse.ok) throw new Error('Error al cargar estadísticas globales');
-        const global = await globalResponse.json();
+// El panel se actualiza con /statistics/stream (SSE): un snapshot al conectar y
+// después solo deltas cuando hay respuestas o sesiones nuevas
+let statsStream = null;
+let statsState = null;
+
+function loadStatistics() {
+    if (!window.EventSource) {
+        loadStatisticsOnce();
+        return;
+    }
+    if (statsStream) return;
 
-        document.getElementById('stat-active-questions').textContent = global.total_preguntas_activas;
-        document.getElementById('stat-completed-sessions').textContent = global.total_sesiones_completadas;
-        document.getElementById('stat-avg-score').textContent = `${global.promedio_aciertos}%`;
+    statsStream = new EventSource(`${API_BASE_URL}/statistics/stream`);
+    statsStream.addEventListener('snapshot', event => {
+        statsState = JSON.parse(event.data);
+        renderStatistics(statsState);
+    });
+    statsStream.addEventListener('delta', event => {
+        if (!statsState) return;
+        applyStatisticsDelta(statsState, JSON.parse(event.data));
+        renderStatistics(statsState);
+    });
+    statsStream.onerror = () => {
+        // EventSource reintenta solo; al reconectar llega un snapshot nuevo
+        console.warn('Stream de estadísticas desconectado, reintentando...');
+    };
+}
 
-        // Difficult questions
-        const difficultResponse = await fetch(`${API_BASE_URL}/statistics/questions/difficult?limit=5`);
-        if (!difficultResponse.ok) throw new Error('Error al cargar preguntas difíciles');
-        const difficult = await difficultResponse.json();
-
-        let difficultHTML = '';
-        if (difficult.length === 0) {
-            difficultHTML = '<p class="loading">Sin datos aún</p>';
-        } else {
-            difficult.forEach(q => {
-                difficultHTML += `
-                    <div class="question-item">
-                        <h4>${q.pregunta}</h4>
-                        <div class="meta">
-                            <span class="meta-item">📊 Tasa de error: ${q.tasa_error}%</span>
-                            <span class="meta-item">📈 Respondida ${q.veces_respondida} veces</span>
-                            <span class="meta-item">❌ ${q.veces_incorrecta} incorrectas</span>
-                        </div>
-                    </div>
-                `;
-            });
-        }
-        document.getElementById('difficult-questions').innerHTML = difficultHTML;
+function stopStatisticsStream() {
+    if (statsStream) {
+        statsStream.close();
+        statsStream = null;
+        statsState = null;
+    }
+}
+
+function applyStatisticsDelta(state, delta) {
+    state.version = delta.version;
+    if (delta.global) Object.assign(state.global, delta.global);
+    if (delta.preguntas_dificiles) state.preguntas_dificiles = delta.preguntas_dificiles;
+    if (delta.categorias) {
+        delta.categorias.forEach(cat => {
+            const index = state.categorias.findIndex(c => c.categoria === cat.categoria);
+            if (index >= 0) {
+                state.categorias[index] = cat;
+            } else {
+                state.categorias.push(cat);
+            }
+        });
+    }
+}
 
-        // Categories stats
-        const categoriesResponse = await fetch(`${API_BASE_URL}/statistics/categories`);
+async function loadStatisticsOnce() {
+    try {
+        const [globalResponse, difficultResponse, categoriesResponse] = await Promise.all([
+            fetch(`${API_BASE_URL}/statistics/global`),
+            fetch(`${API_BASE_URL}/statistics/questions/difficult?limit=5`),
+            fetch(`${API_BASE_URL}/statistics/categories`)
+        ]);
+        if (!globalResponse.ok) throw new Error('Error al cargar estadísticas globales');
+        if (!difficultResponse.ok) throw new Error('Error al cargar preguntas difíciles');
         if (!categoriesResponse.ok) throw new Error('Error al cargar categorías');
-        const categories = await categoriesResponse.json();
-
-        let categoriesHTML = '';
-        if (categories.length === 0) {
-            categoriesHTML = '<p class="loading">Sin datos aún</p>';
-        } else {
-            categories.forEach(cat => {
-                const progressPercent = Math.min(100, Math.max(0, cat.promedio_aciertos));
-                categoriesHTML += `
-                    <div class="category-item">
-                        <h4>${cat.categoria}</h4>
-                        <div class="meta">
-                            <span class="meta-item">📚 ${cat.num_preguntas} preguntas</span>
-                            <span class="meta-item">📊 ${cat.num_respuestas} respuestas</span>
-                            <span class="meta-item">✓ ${cat.aciertos} correctas</span>
-                        </div>
-                        <div style="margin-top: 10px; background: #ecf0f1; height: 8px; border-radius: 4px; overflow: hidden;">
-                            <div style="background: #3498db; height: 100%; width: ${progressPercent}%;"></div>
-                        </div>
-                        <p style="margin-top: 8px; font-weight: 600; color: #3498db;">
-                            ${cat.promedio_aciertos}% de aciertos
-                        </p>
-                    </div>
-                `;
-            });
-        }
-        document.getElementById('categories-stats').innerHTML = categoriesHTML;
 
+        renderStatistics({
+            global: await globalResponse.json(),
+            preguntas_dificiles: await difficultResponse.json(),
+            categorias: await categoriesResponse.json()
+        });
     } catch (error) {
         console.error(error);
         alert('Error: ' + error.message);
     }
 }
 
+function renderStatistics(stats) {
+    // Global stats
+    const global = stats.global;
+    document.getElementById('stat-active-questions').textContent = global.total_preguntas_activas;
+    document.getElementById('stat-completed-sessions').textContent = global.total_sesiones_completadas;
+    document.getElementById('stat-avg-score').textContent = `${global.promedio_aciertos}%`;
+
+    // Difficult questions
+    const difficult = stats.preguntas_dificiles;
+    let difficultHTML = '';
+    if (difficult.length === 0) {
+        difficultHTML = '<p class="loading">Sin datos aún</p>';
+    } else {
+        difficult.forEach(q => {
+            difficultHTML += `
+                <div class="question-item">
+                    <h4>${q.pregunta}</h4>
+                    <div class="meta">
+                        <span class="meta-item">📊 Tasa de error: ${q.tasa_error}%</span>
+                        <span class="meta-item">📈 Respondida ${q.veces_respondida} veces</span>
+                        <span class="meta-item">❌ ${q.veces_incorrecta} incorrectas</span>
+                    </div>
+                </div>
+            `;
+        });
+    }
+    document.getElementById('difficult-questions').innerHTML = difficultHTML;
+
+    // Categories stats
+    const categories = stats.categorias;
+    let categoriesHTML = '';
+    if (categories.length === 0) {
+        categoriesHTML = '<p class="loading">Sin datos aún</p>';
+    } else {
+        categories.forEach(cat => {
+            const progressPercent = Math.min(100, Math.max(0, cat.promedio_aciertos));
+            categoriesHTML += `
+                <div class="category-item">
+                    <h4>${cat.categoria}</h4>
+                    <div class="meta">
+                        <span class="meta-item">📚 ${cat.num_preguntas} preguntas</span>
+                        <span class="meta-item">📊 ${cat.num_respuestas} respuestas</span>
+                        <span class="meta-item">✓ ${cat.aciertos} correctas</span>
+                    </div>
+                    <div style="margin-top: 10px; background: #ecf0f1; height: 8px; border-radius: 4px; overflow: hidden;">
+                        <div style="background: #3498db; height: 100%; width: ${progressPercent}%;"></div>
+                    </div>
+                    <p style="margin-top: 8px; font-weight: 600; color: #3498db;">
+                        ${cat.promedio_aciertos}% de aciertos
+                    </p>
+                </div>
+            `;
+        });
+    }
+    document.getElementById('categories-stats').innerHTML = categoriesHTML;
+}
+
 async function fetchGlobalStats() {
     try {
         const response = await fetch(`${API_BASE_URL}/statistics/global`);
@@ -0,0 +1,87 @@
+"""Tests del conteo de únicos (HyperLogLog, app/services/cardinality_service.py)"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.question import Question
+from app.models.quiz_session import QuizSession
+from app.models.answer import Answer
+from app.models.unique_count import UniqueCountSketch
+from app.services.cardinality_service import (
+    ALL_CATEGORIES, NUM_REGISTERS, STANDARD_ERROR, HyperLogLog, rebuild_unique_counts,
+)
+
+
+def _hll(values):
+    hll = HyperLogLog()
+    for v in values:
+        hll.add(v)
+    return hll
+
+
+def test_vacio():
+    assert HyperLogLog().estimate() == 0
+
+
+def test_pocos_valores_casi_exacto():
+    # Con pocos valores se usa el conteo lineal, que es prácticamente exacto
+    assert _hll(f"usuario-{i}" for i in range(100)).estimate() == pytest.approx(100, abs=2)
+
+
+@pytest.mark.parametrize("n", [1_000, 20_000, 200_000])
+def test_estimacion_dentro_del_error(n):
+    estimate = _hll(str(i) for i in range(n)).estimate()
+    # 4 errores estándar: no debería fallar por azar
+    assert estimate == pytest.approx(n, rel=4 * STANDARD_ERROR)
+
+
+def test_repetidos_no_cuentan():
+    hll = _hll(f"sesion-{i % 50}" for i in range(5000))
+    assert hll.estimate() == pytest.approx(50, abs=1)
+
+
+def test_merge_equivale_a_la_union():
+    a = _hll(str(i) for i in range(0, 3000))
+    b = _hll(str(i) for i in range(2000, 5000))
+    union = _hll(str(i) for i in range(0, 5000))
+    a.merge(b)
+
+    assert a.registers == union.registers
+    # Combinar dos veces lo mismo no cambia nada
+    a.merge(b)
+    assert a.registers == union.registers
+
+
+def test_blob_ida_y_vuelta():
+    hll = _hll(str(i) for i in range(500))
+    blob = hll.to_blob()
+
+    assert len(blob) < NUM_REGISTERS
+    assert HyperLogLog.from_blob(blob).registers == hll.registers
+    assert HyperLogLog.from_blob(None).registers == HyperLogLog().registers
+    assert HyperLogLog.from_blob(b"").estimate() == 0
+
+
+def test_rebuild_usa_la_categoria_registrada_en_la_respuesta(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    ts = datetime(2024, 1, 1, 12)
+    with Session(engine) as db:
+        # La pregunta pasó a la categoría 2 después de que se respondió en la 1
+        question = Question(pregunta="¿Cuánto es 2 + 2?", opciones='["3", "4"]', respuesta_correcta=1,
+                            categoria_id=2, dificultad_id=1, num_opciones=2)
+        session = QuizSession(usuario_nombre="Ana", usuario_key="ana", created_at=ts)
+        db.add_all([question, session])
+        db.flush()
+        db.add(Answer(quiz_session_id=session.id, question_id=question.id, categoria_id=1,
+                      respuesta_seleccionada=1, es_correcta=True, created_at=ts))
+        db.commit()
+
+        rebuild_unique_counts(db)
+
+        categorias = {int(c) for (c,) in db.query(UniqueCountSketch.categoria_id).distinct()}
+    engine.dispose()
+    assert categorias == {1, ALL_CATEGORIES}
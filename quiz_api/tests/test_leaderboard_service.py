@@ -0,0 +1,67 @@
+"""Tests del ranking en memoria (app/services/leaderboard_service.py)"""
+import threading
+from datetime import datetime
+
+from app.services.leaderboard_service import Leaderboard
+
+
+FIN = datetime(2024, 1, 1, 12)
+
+
+def _record(board, session_id, puntuacion, correctas=0):
+    board.record(session_id, f"usuario-{session_id}", puntuacion, correctas, 10, FIN, {"Historia": (10, correctas)})
+
+
+def test_orden_y_posiciones():
+    board = Leaderboard()
+    for session_id, puntuacion, correctas in ((1, 50, 5), (2, 80, 8), (3, 50, 6), (4, 50, 5)):
+        _record(board, session_id, puntuacion, correctas)
+    board.remove(2)
+
+    ranking = board.board()
+    # Desempata por aciertos y después por la sesión más antigua
+    assert [e["session_id"] for e in ranking.top(10)] == [3, 1, 4]
+    assert ranking.top(1, offset=1) == [{"posicion": 2, **ranking.entry(1)}]
+    assert ranking.rank(4) == 3
+    assert ranking.rank(2) is None
+    assert len(board.board(dia="2024-01-01")) == 3
+    assert board.board(categoria="Historia").rank(3) == 1
+
+
+def test_lecturas_concurrentes_con_altas_y_bajas():
+    board = Leaderboard()
+    for session_id in range(200):
+        _record(board, session_id, session_id % 37)
+    errores = []
+    fin = threading.Event()
+
+    def escritor():
+        try:
+            for vuelta in range(300):
+                for session_id in range(vuelta % 10, 200, 10):
+                    board.remove(session_id)
+                    _record(board, session_id, (session_id + vuelta) % 37)
+        except Exception as e:  # pragma: no cover - solo si falla
+            errores.append(e)
+        finally:
+            fin.set()
+
+    def lector():
+        try:
+            while not fin.is_set():
+                for ranking in (board.board(), board.board(categoria="Historia")):
+                    top = ranking.top(100, offset=50)
+                    puntos = [e["puntuacion_total"] for e in top]
+                    assert puntos == sorted(puntos, reverse=True)
+                    ranking.rank(123)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=escritor)] + [threading.Thread(target=lector) for _ in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert len(board.board()) == 200
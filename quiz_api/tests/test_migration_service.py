@@ -0,0 +1,167 @@
+"""Tests de las migraciones numeradas (app/services/migration_service.py)"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.services.migration_service import (
+    Migration, MigrationContext, get_schema_version, run_migrations,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, valor INTEGER, doble INTEGER)"))
+        conn.execute(text("INSERT INTO items (id, valor) VALUES (:id, :id)"), [{"id": i} for i in range(1, 101)])
+    yield engine
+    engine.dispose()
+
+
+SELECT_SQL = "SELECT id, valor FROM items WHERE id > :ultimo_id ORDER BY id LIMIT :limite"
+UPDATE_SQL = "UPDATE items SET doble = :doble WHERE id = :id"
+
+
+def _doubles(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT id, doble FROM items")).all())
+
+
+def _ctx(engine, version=1):
+    # Lotes fijos de 10 y sin pausa, para que los tests sean rápidos y deterministas
+    return MigrationContext(engine, version, batch_size=10, pause_ms=0, max_lock_ms=1e9)
+
+
+def test_backfill_rellena_todas_las_filas(engine):
+    ctx = _ctx(engine)
+    total = ctx.backfill("doble", SELECT_SQL, UPDATE_SQL, lambda row: {"id": row[0], "doble": row[1] * 2})
+
+    assert total == 100
+    assert _doubles(engine) == {i: i * 2 for i in range(1, 101)}
+
+
+def test_backfill_retoma_desde_el_ultimo_lote_guardado(engine):
+    vistos = []
+
+    def falla_en_la_fila_35(row):
+        if row[0] == 35:
+            raise RuntimeError("corte")
+        vistos.append(row[0])
+        return {"id": row[0], "doble": row[1] * 2}
+
+    with pytest.raises(RuntimeError):
+        _ctx(engine).backfill("doble", SELECT_SQL, UPDATE_SQL, falla_en_la_fila_35)
+    # Los tres primeros lotes quedaron escritos y el avance guardado; el cuarto no
+    assert _doubles(engine)[30] == 60
+    assert _doubles(engine)[31] is None
+
+    releidos = []
+
+    def registrar(row):
+        releidos.append(row[0])
+        return {"id": row[0], "doble": row[1] * 2}
+
+    total = _ctx(engine).backfill("doble", SELECT_SQL, UPDATE_SQL, registrar)
+
+    assert total == 70
+    assert releidos == list(range(31, 101))
+    assert _doubles(engine) == {i: i * 2 for i in range(1, 101)}
+
+
+def test_backfill_guarda_el_avance_por_version_y_paso(engine):
+    _ctx(engine).backfill("doble", SELECT_SQL, UPDATE_SQL, lambda row: {"id": row[0], "doble": 1})
+
+    # Otro paso (u otra versión) empieza desde el principio
+    assert _ctx(engine).backfill("otro", SELECT_SQL, UPDATE_SQL, lambda row: None) == 100
+    assert _ctx(engine, version=2).backfill("doble", SELECT_SQL, UPDATE_SQL, lambda row: None) == 100
+    # El mismo paso ya terminó
+    assert _ctx(engine).backfill("doble", SELECT_SQL, UPDATE_SQL, lambda row: None) == 0
+
+
+def test_backfill_saltea_filas_sin_parametros(engine):
+    total = _ctx(engine).backfill(
+        "doble", SELECT_SQL, UPDATE_SQL,
+        lambda row: {"id": row[0], "doble": 0} if row[0] % 2 == 0 else None,
+    )
+
+    assert total == 100
+    doubles = _doubles(engine)
+    assert doubles[2] == 0
+    assert doubles[3] is None
+
+
+def test_backfill_achica_el_lote_si_la_escritura_tarda(engine):
+    ctx = MigrationContext(engine, 1, batch_size=40, pause_ms=0, max_lock_ms=0)
+    limites = []
+    select_sql = "SELECT id, valor, :limite FROM items WHERE id > :ultimo_id ORDER BY id LIMIT :limite"
+
+    ctx.backfill("doble", select_sql, UPDATE_SQL, lambda row: limites.append(row[2]) or {"id": row[0], "doble": 1})
+
+    assert sorted(set(limites), reverse=True) == [40, 20, 10]
+
+
+def test_run_migrations_aplica_en_orden_solo_las_pendientes(engine):
+    orden = []
+    migrations = [Migration(v, f"paso {v}", lambda ctx, v=v: orden.append((v, ctx.version))) for v in (1, 2, 3)]
+
+    assert [m.version for m in run_migrations(engine, migrations[:2], pause_ms=0)] == [1, 2]
+    assert get_schema_version(engine) == 2
+
+    assert [m.version for m in run_migrations(engine, migrations, pause_ms=0)] == [3]
+    assert orden == [(1, 1), (2, 2), (3, 3)]
+    assert get_schema_version(engine) == 3
+    assert run_migrations(engine, migrations, pause_ms=0) == []
+
+
+def test_run_migrations_guarda_la_version_de_las_que_terminaron(engine):
+    def falla(ctx):
+        raise RuntimeError("corte")
+
+    aplicadas = []
+    migrations = [
+        Migration(1, "uno", lambda ctx: aplicadas.append(1)),
+        Migration(2, "falla", falla),
+        Migration(3, "tres", lambda ctx: aplicadas.append(3)),
+    ]
+
+    with pytest.raises(RuntimeError):
+        run_migrations(engine, migrations, pause_ms=0)
+    assert get_schema_version(engine) == 1
+    assert aplicadas == [1]
+
+    migrations[1] = Migration(2, "arreglada", lambda ctx: aplicadas.append(2))
+    run_migrations(engine, migrations, pause_ms=0)
+    assert aplicadas == [1, 2, 3]
+    assert get_schema_version(engine) == 3
+
+
+def test_run_migrations_retoma_el_relleno_y_limpia_el_avance(engine):
+    intentos = []
+
+    def relleno(ctx):
+        def params(row):
+            if row[0] == 55 and not intentos:
+                intentos.append(row[0])
+                raise RuntimeError("corte")
+            return {"id": row[0], "doble": row[1] * 2}
+
+        ctx.backfill("doble", SELECT_SQL, UPDATE_SQL, params)
+
+    migrations = [Migration(1, "relleno", relleno)]
+    with pytest.raises(RuntimeError):
+        run_migrations(engine, migrations, batch_size=10, pause_ms=0, max_lock_ms=1e9)
+    assert get_schema_version(engine) is None
+
+    run_migrations(engine, migrations, batch_size=10, pause_ms=0, max_lock_ms=1e9)
+    assert get_schema_version(engine) == 1
+    assert _doubles(engine) == {i: i * 2 for i in range(1, 101)}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM schema_migration_progress")).scalar() == 0
+
+
+@pytest.mark.parametrize("versions", [(2, 1), (1, 1, 2)])
+def test_run_migrations_rechaza_versiones_desordenadas(engine, versions):
+    migrations = [Migration(v, "x", lambda ctx: None) for v in versions]
+
+    with pytest.raises(ValueError):
+        run_migrations(engine, migrations)
+    assert get_schema_version(engine) is None
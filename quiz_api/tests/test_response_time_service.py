@@ -0,0 +1,85 @@
+"""Tests de los percentiles de tiempo de respuesta (DDSketch, app/services/response_time_service.py)"""
+import random
+
+import pytest
+
+from app.services.response_time_service import (
+    MAX_SECONDS, RELATIVE_ACCURACY, ZERO_INDEX, DDSketch, bucket_index, bucket_value,
+)
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_bucket_value_dentro_del_error_relativo():
+    for segundos in (1, 2, 7, 59, 600, 3600, MAX_SECONDS):
+        assert bucket_value(bucket_index(segundos)) == pytest.approx(segundos, rel=RELATIVE_ACCURACY)
+
+
+def test_bucket_index_cero_y_maximo():
+    assert bucket_index(0) == ZERO_INDEX
+    assert bucket_index(-3) == ZERO_INDEX
+    assert bucket_value(ZERO_INDEX) == 0.0
+    assert bucket_index(MAX_SECONDS * 10) == bucket_index(MAX_SECONDS)
+
+
+@pytest.mark.parametrize("q", [0.0, 0.5, 0.9, 0.99, 1.0])
+def test_quantile_con_error_relativo_acotado(q):
+    rng = random.Random(42)
+    values = [max(1, int(rng.lognormvariate(3, 1))) for _ in range(5000)]
+    sketch = DDSketch()
+    for v in values:
+        sketch.add(v)
+
+    assert sketch.count == len(values)
+    assert sketch.quantile(q) == pytest.approx(_exact_quantile(values, q), rel=RELATIVE_ACCURACY)
+
+
+def test_sketch_vacio():
+    sketch = DDSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.summary() == {"respuestas_con_tiempo": 0, "promedio": None, "p50": None, "p90": None, "p99": None}
+
+
+def test_restar_deja_el_mismo_sketch():
+    sketch = DDSketch()
+    for v in (3, 5, 8, 13):
+        sketch.add(v)
+    sketch.add(13, sign=-1)
+    sketch.add(21)
+    sketch.add(21, sign=-1)
+
+    assert sketch.count == 3
+    assert sketch.summary()["promedio"] == pytest.approx((3 + 5 + 8) / 3, abs=0.01)
+    assert sketch.quantile(1.0) == pytest.approx(8, rel=RELATIVE_ACCURACY)
+
+
+def test_merge_equivale_a_agregar_todo():
+    a, b, todo = DDSketch(), DDSketch(), DDSketch()
+    for i, v in enumerate(range(1, 200)):
+        (a if i % 2 else b).add(v)
+        todo.add(v)
+    a.merge(b)
+
+    assert a.buckets == todo.buckets
+
+
+def test_buckets_negativos_no_cuentan():
+    # Restar un tiempo que nunca se sumó deja un bucket negativo: no debe mover los percentiles
+    sketch = DDSketch()
+    for v in (10, 10, 20):
+        sketch.add(v)
+    sketch.add(1, sign=-1)
+    sketch.add(500, sign=-1)
+
+    assert sketch.count == 3
+    assert sketch.quantile(0.0) == pytest.approx(10, rel=RELATIVE_ACCURACY)
+    assert sketch.quantile(1.0) == pytest.approx(20, rel=RELATIVE_ACCURACY)
+    assert sketch.summary()["promedio"] == pytest.approx(40 / 3, abs=0.01)
+
+    solo_negativos = DDSketch()
+    solo_negativos.add(7, sign=-1)
+    assert solo_negativos.quantile(0.5) is None
+    assert solo_negativos.summary()["promedio"] is None
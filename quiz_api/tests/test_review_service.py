@@ -0,0 +1,138 @@
+"""Tests del repaso espaciado SM-2 (app/services/review_service.py)"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.question import Question
+from app.models.quiz_session import QuizSession
+from app.models.answer import Answer
+from app.models.review_item import ReviewItem
+from app.services.review_service import (
+    DEFAULT_EASE, MIN_EASE, ReviewQueue, ReviewState, answer_quality, next_review, record_review, replay_review,
+)
+
+
+def test_answer_quality():
+    assert answer_quality(False, 3) == 1
+    assert answer_quality(True, 3) == 5
+    assert answer_quality(True, 60) == 4
+    assert answer_quality(True, None) == 4
+
+
+def test_next_review_intervalos_con_aciertos_seguidos():
+    state = ReviewState()
+    intervalos = []
+    for _ in range(4):
+        state = next_review(state, 5)
+        intervalos.append(state.intervalo_dias)
+
+    assert intervalos[:2] == [1.0, 6.0]
+    assert intervalos[2] == pytest.approx(6.0 * (DEFAULT_EASE + 0.3))
+    assert intervalos[3] == pytest.approx(intervalos[2] * (DEFAULT_EASE + 0.4))
+    assert state.repeticiones == 4
+
+
+def test_next_review_un_fallo_reinicia():
+    state = next_review(next_review(next_review(ReviewState(), 4), 4), 4)
+    state = next_review(state, 1)
+
+    assert state.repeticiones == 0
+    assert state.intervalo_dias == 1.0
+    assert state.fallos == 1
+
+
+def test_next_review_facilidad_minima():
+    state = ReviewState()
+    for _ in range(20):
+        state = next_review(state, 0)
+    assert state.facilidad == MIN_EASE
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _question(db):
+    question = Question(pregunta="¿Cuánto es 2 + 2?", opciones='["3", "4"]', respuesta_correcta=1,
+                        categoria_id=1, dificultad_id=1, num_opciones=2)
+    db.add(question)
+    db.flush()
+    return int(question.id)
+
+
+def test_record_review_solo_guarda_preguntas_falladas(db):
+    question_id = _question(db)
+    ts = datetime(2024, 1, 1, 12)
+
+    assert record_review(db, "ana", question_id, True, 5, ts) is None
+    assert db.get(ReviewItem, ("ana", question_id)) is None
+
+    assert record_review(db, "ana", question_id, False, 5, ts) == ts + timedelta(days=1)
+    assert record_review(db, "ana", question_id, True, 5, ts) == ts + timedelta(days=1)
+    assert record_review(db, "ana", question_id, True, 5, ts) == ts + timedelta(days=6)
+
+
+def test_replay_review_recalcula_desde_el_historial(db):
+    question_id = _question(db)
+    sessions = [QuizSession(usuario_nombre="Ana", usuario_key="ana") for _ in range(2)]
+    db.add_all(sessions)
+    db.flush()
+    inicio = datetime(2024, 1, 1, 12)
+    respuestas = [
+        Answer(quiz_session_id=session.id, question_id=question_id, respuesta_seleccionada=0,
+               es_correcta=correcta, tiempo_respuesta_segundos=5, created_at=inicio + timedelta(days=dia))
+        for session, (dia, correcta) in zip(sessions, ((0, False), (2, True)))
+    ]
+    db.add_all(respuestas)
+    db.flush()
+
+    # Fallo y acierto: el acierto la aleja un día
+    assert replay_review(db, None, "ana", question_id) == inicio + timedelta(days=3)
+    assert db.get(ReviewItem, ("ana", question_id)).fallos == 1
+
+    # Si el fallo se corrige a acierto, nunca la falló: sale de la cola
+    respuestas[0].es_correcta = True
+    db.flush()
+    assert replay_review(db, None, "ana", question_id) is None
+    db.flush()
+    assert db.get(ReviewItem, ("ana", question_id)) is None
+
+
+def test_review_queue_vencidas_en_orden(db):
+    base = datetime(2024, 1, 1)
+    db.add_all([
+        ReviewItem(usuario_key="ana", question_id=q, repeticiones=0, intervalo_dias=1, facilidad=2.5, fallos=1,
+                   vence_at=base + timedelta(days=dias))
+        for q, dias in ((1, 3), (2, 1), (3, 2), (4, 10))
+    ])
+    db.flush()
+    queue = ReviewQueue()
+
+    assert queue.overdue(db, "ana", 10, now=base + timedelta(days=5)) == [2, 3, 1]
+    assert queue.overdue(db, "ana", 1, offset=1, now=base + timedelta(days=5)) == [3]
+
+    # Los cambios ya guardados se reflejan en la caché sin volver a leer la BD
+    queue.update("ana", 4, base)
+    queue.remove("ana", 2)
+    assert queue.overdue(db, "ana", 10, now=base + timedelta(days=5)) == [4, 3, 1]
+    assert queue.stats()["preguntas"] == 3
+    assert queue.misses == 1
+
+
+def test_review_queue_descarta_los_usuarios_menos_usados(db):
+    queue = ReviewQueue(max_users=2)
+    for usuario in ("ana", "beto", "ana", "carla"):
+        queue.overdue(db, usuario, 10)
+
+    assert queue.stats()["usuarios"] == 2
+    assert queue.evictions == 1
+    queue.overdue(db, "ana", 10)
+    assert queue.hits == 2
@@ -0,0 +1,96 @@
+"""Tests de la actualización del esquema desde una base existente (app/services/schema_service.py)"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.services.migration_service import get_schema_version, run_migrations
+from app.services.schema_service import (
+    ARCHIVE_MIGRATIONS, ARCHIVE_SCHEMA_VERSION, MIGRATIONS, SCHEMA_VERSION, ensure_schema,
+)
+
+
+# Esquema de quiz.db antes de schema_version (lo que dejaba create_all con los modelos originales)
+BASELINE_SCHEMA = [
+    """CREATE TABLE questions (
+        id INTEGER NOT NULL, pregunta VARCHAR NOT NULL, opciones JSON NOT NULL,
+        respuesta_correcta INTEGER NOT NULL, explicacion TEXT, categoria VARCHAR NOT NULL,
+        dificultad VARCHAR NOT NULL, created_at DATETIME, is_active BOOLEAN, PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX ix_questions_id ON questions (id)",
+    """CREATE TABLE quiz_sessions (
+        id INTEGER NOT NULL, usuario_nombre VARCHAR, fecha_inicio DATETIME, fecha_fin DATETIME,
+        puntuacion_total INTEGER, preguntas_respondidas INTEGER, preguntas_correctas INTEGER,
+        estado VARCHAR, tiempo_total_segundos INTEGER, created_at DATETIME, PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX ix_quiz_sessions_id ON quiz_sessions (id)",
+    """CREATE TABLE answers (
+        id INTEGER NOT NULL, quiz_session_id INTEGER NOT NULL, question_id INTEGER NOT NULL,
+        respuesta_seleccionada INTEGER NOT NULL, es_correcta BOOLEAN, tiempo_respuesta_segundos INTEGER,
+        created_at DATETIME, PRIMARY KEY (id),
+        FOREIGN KEY(quiz_session_id) REFERENCES quiz_sessions (id) ON DELETE CASCADE,
+        FOREIGN KEY(question_id) REFERENCES questions (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX ix_answers_id ON answers (id)",
+]
+
+BASELINE_ROWS = [
+    """INSERT INTO questions VALUES
+        (1, '¿Capital de Francia?', '["París", "Roma", "Lima"]', 0, NULL, 'Geografía', 'fácil', '2024-01-01 10:00:00', 1),
+        (2, '¿Año de la Revolución Francesa?', '["1789", "1810"]', 0, NULL, 'Historia', 'media', '2024-01-01 10:00:00', 1)""",
+    """INSERT INTO quiz_sessions VALUES
+        (1, 'Ana María', '2024-01-02 09:00:00', '2024-01-02 09:05:00', 10, 2, 1, 'completado', 300, '2024-01-02 09:00:00'),
+        (2, NULL, '2024-01-03 09:00:00', NULL, 0, 1, 0, 'en_progreso', NULL, '2024-01-03 09:00:00')""",
+    """INSERT INTO answers VALUES
+        (1, 1, 1, 0, 1, 12, '2024-01-02 09:01:00'),
+        (2, 1, 2, 1, 0, 30, '2024-01-02 09:02:00'),
+        (3, 2, 2, 0, 1, 8, '2024-01-03 09:01:00')""",
+]
+
+
+@pytest.fixture
+def engines(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'quiz.db'}")
+    archive_engine = create_engine(f"sqlite:///{tmp_path / 'quiz_archive.db'}")
+    with engine.begin() as conn:
+        for sql in BASELINE_SCHEMA + BASELINE_ROWS:
+            conn.execute(text(sql))
+    yield engine, archive_engine
+    engine.dispose()
+    archive_engine.dispose()
+
+
+def _scalar(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).scalar()
+
+
+def test_actualiza_una_base_anterior_a_schema_version(engines):
+    engine, archive_engine = engines
+
+    assert ensure_schema(engine, archive_engine) is True
+
+    assert get_schema_version(engine) == SCHEMA_VERSION
+    assert get_schema_version(archive_engine) == ARCHIVE_SCHEMA_VERSION
+    with engine.connect() as conn:
+        indexes = {i["name"] for i in inspect(conn).get_indexes("quiz_sessions")}
+    assert "ix_quiz_sessions_usuario" in indexes
+    assert _scalar(engine, "SELECT usuario_key FROM quiz_sessions WHERE id = 1") == "ana maría"
+    assert _scalar(engine, "SELECT count(*) FROM answers WHERE categoria_id IS NULL") == 0
+    assert _scalar(engine, "SELECT sum(num_respuestas) FROM user_category_stats WHERE usuario_key = 'ana maría'") == 2
+    # Las correcciones y borrados restan de los agregados: tienen que incluir el historial
+    assert _scalar(engine, "SELECT sum(num_respuestas) FROM answer_buckets WHERE bucket = 'day'") == 3
+    assert _scalar(engine, "SELECT sum(suma_tiempo_segundos) FROM answer_buckets WHERE bucket = 'hour'") == 50
+
+    # Con la versión al día no se vuelve a migrar
+    assert ensure_schema(engine, archive_engine) is False
+
+
+
+def test_la_categoria_de_las_respuestas_se_agrega_antes_de_los_agregados_que_la_leen(engines):
+    # Las reconstrucciones (tiempos, únicos, hora/día) leen answers.categoria_id: tiene que
+    # estar completa con las migraciones anteriores, sin que una la agregue por su cuenta
+    engine, archive_engine = engines
+    run_migrations(archive_engine, ARCHIVE_MIGRATIONS)
+    primera = min(m.version for m in MIGRATIONS if m.run.__name__ in ("_response_times", "_unique_counts", "_timeseries"))
+    run_migrations(engine, [m for m in MIGRATIONS if m.version < primera], archive_engine=archive_engine)
+
+    assert _scalar(engine, "SELECT count(*) FROM answers WHERE categoria_id IS NULL") == 0